@@ -3,12 +3,17 @@ from __future__ import annotations
 import json
 import os
 import random
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Literal, Optional
 
 import requests
-from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator  # type: ignore[import-not-found]
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator  # type: ignore[import-not-found]
+
+import keywords
+import prompts
+from json_stream import repair_json_text
 
 
 DIMENSIONS = [
@@ -54,56 +59,171 @@ class InsightItem(BaseModel):
 _InsightListAdapter = TypeAdapter(list[InsightItem])
 
 
+def insight_json_schema() -> dict[str, Any]:
+    """
+    由 InsightItem 字段生成 response_format 用的 JSON Schema（strict 模式要求：
+    根为 object、所有字段列入 required、可选字段用 ["string", "null"]、禁止额外字段）。
+    """
+    props: dict[str, Any] = {}
+    for name, f in InsightItem.model_fields.items():
+        prop: dict[str, Any] = {"type": "string" if f.is_required() else ["string", "null"]}
+        if name == "dimension":
+            prop["enum"] = list(DIMENSIONS)
+        props[name] = prop
+    item = {
+        "type": "object",
+        "properties": props,
+        "required": list(props),
+        "additionalProperties": False,
+    }
+    return {
+        "type": "object",
+        "properties": {"items": {"type": "array", "items": item}},
+        "required": ["items"],
+        "additionalProperties": False,
+    }
+
+
+def _repair_dimension(v: str) -> str:
+    # 模型常输出近似维度名（大小写不同、只写一半如“AI编程”“TTS”），就近归到标准维度
+    key = v.strip().casefold()
+    for d in DIMENSIONS:
+        if d.casefold() == key:
+            return d
+    for d in DIMENSIONS:
+        parts = [p.casefold() for p in d.replace(" ", "/").split("/") if p]
+        if key and (key in d.casefold() or any(p == key or p in key for p in parts)):
+            return d
+    return v.strip()
+
+
+def repair_item(obj: Any) -> Optional[InsightItem]:
+    """单条洞察的本地修复：键名小写、非字符串值转字符串、空串视为缺失、维度名归一；缺必填项则丢弃。"""
+    if not isinstance(obj, dict):
+        return None
+    fixed: dict[str, Any] = {}
+    for k, v in obj.items():
+        if isinstance(v, list):
+            v = "、".join(str(x) for x in v if x is not None)
+        elif v is not None and not isinstance(v, str):
+            v = str(v)
+        if isinstance(v, str) and not v.strip():
+            v = None
+        fixed[str(k).strip().lower()] = v
+    if not fixed.get("dimension") or not fixed.get("tech_node"):
+        return None
+    fixed["dimension"] = _repair_dimension(fixed["dimension"])
+    try:
+        return InsightItem.model_validate(fixed)
+    except ValidationError:
+        return None
+
+
+_METRIC_FIELDS = (
+    "calls",
+    "parse_failures",
+    "repaired",
+    "rerequests",
+    "wasted_calls",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+)
+
+
+_USAGE_FIELDS = ("prompt_tokens", "cached_tokens", "completion_tokens")
+
+
+def usage_counts(usage: dict[str, Any]) -> dict[str, int]:
+    """接口 usage -> {prompt_tokens, cached_tokens, completion_tokens}。"""
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+    }
+
+
+@dataclass
+class LlmMetrics:
+    """
+    LLM 调用质量计数（多线程共享）：
+    - parse_failures：原始输出无法直接解析/校验
+    - repaired：经本地修复后可用（省掉一次重新请求）
+    - rerequests：本地修复失败后重新请求
+    - wasted_calls：最终仍失败的分析（其间所有请求作废）
+    - prompt_tokens / cached_tokens / completion_tokens：接口返回的 usage（cached_tokens 为前缀缓存命中）
+    """
+
+    calls: int = 0
+    parse_failures: int = 0
+    repaired: int = 0
+    rerequests: int = 0
+    wasted_calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **deltas: int) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def drain(self) -> dict[str, int]:
+        """返回当前计数并清零。"""
+        with self._lock:
+            out = {k: getattr(self, k) for k in _METRIC_FIELDS}
+            for k in out:
+                setattr(self, k, 0)
+        return out
+
+
 class InsightBatch(BaseModel):
     """分析结果（多条洞察）。"""
 
     model_config = ConfigDict(extra="ignore")
 
     items: list[InsightItem] = Field(default_factory=list)
+    # 产出这批洞察的提示词模板 hash（prompts.PromptTemplate.hash），随行落库
+    prompt_hash: Optional[str] = None
+    # 输出未能直接解析、由本地修复得到（可能缺条目）：路由据此判定低置信
+    repaired: bool = False
 
-    def to_db_rows(self, *, source_id: str) -> list[dict]:
-        """
-        转为 database.TechInsightRow 所需字段（用 dict，避免 analyzer ↔ database 的硬耦合）。
-        """
-        rows: list[dict] = []
-        for it in self.items:
-            impact_score = infer_impact_score(it.impact_signal, it.evolution_tag)
-            summary = (it.raw_context or "").strip()
-            rows.append(
-                {
-                    "source_id": source_id,
-                    "dimension": it.dimension,
-                    "project_name": it.project_name,
-                    "tech_node": it.tech_node,
-                    "evolution_tag": it.evolution_tag,
-                    "impact_score": impact_score,
-                    "summary": summary,
-                }
-            )
-        return rows
+    def to_db_rows(self, *, source_id: str) -> list:
+        """转为 database.TechInsightRecord（items 已由 pydantic 校验，写库时不再重复校验）。"""
+        return [derive_record(it, source_id=source_id, prompt_hash=self.prompt_hash) for it in self.items]
+
+
+def derive_record(item: InsightItem, *, source_id: str, prompt_hash: str | None = None):
+    """
+    LLM 原始条目 -> database.TechInsightRecord 的唯一映射（派生列：impact_score、summary 等）。
+    原始条目 JSON 一并放进 raw_item，规则变化后 rederive.py 用同一函数重算历史行。
+    在函数内导入 database，避免 analyzer 模块级依赖数据库层。
+    """
+    from database import TechInsightRecord
+
+    return TechInsightRecord(
+        source_id=source_id,
+        dimension=item.dimension,
+        project_name=item.project_name,
+        tech_node=item.tech_node,
+        evolution_tag=item.evolution_tag,
+        impact_score=infer_impact_score(item.impact_signal, item.evolution_tag),
+        summary=(item.raw_context or "").strip(),
+        prompt_hash=prompt_hash,
+        impact_signal=item.impact_signal,
+        raw_item=item.model_dump_json(),
+    )
 
 
 def infer_impact_score(impact_signal: str | None, evolution_tag: str | None) -> int:
     """
     影响力等级 (1-5)，根据“爆火”等关键词推断。
     - 这里用启发式规则，避免要求模型额外输出 impact_score。
+    - 关键词与等级在 keywords.json 的 impact 中维护（keywords.KeywordEngine 一次扫描取最高等级）。
     """
-    s = f"{impact_signal or ''} {evolution_tag or ''}".strip()
-    if not s:
-        return 1
-    s_lower = s.lower()
-
-    strong = ("爆火", "刷屏", "现象级", "彻底改变", "颠覆", "破圈", "最强", "sota", "breakthrough")
-    high = ("大幅提升", "显著提升", "重大更新", "发布", "上线", "重磅", "最强", "hot")
-    mid = ("开源", "新增", "更新", "增强", "优化", "支持", "推出")
-
-    if any(k in s for k in strong) or any(k in s_lower for k in ("viral", "game changer")):
-        return 5
-    if any(k in s for k in high):
-        return 4
-    if any(k in s for k in mid):
-        return 3
-    return 2
+    return keywords.get_engine().impact_score(impact_signal, evolution_tag)
 
 
 class LlmError(RuntimeError):
@@ -123,6 +243,12 @@ class OpenAIAnalyzerConfig:
     max_retries: int = 2
     backoff_initial_s: float = 0.8
     backoff_max_s: float = 10.0
+    # json_schema：发送 response_format（schema 由 InsightItem 生成），输出为 {"items": [...]}
+    response_format: Literal["text", "json_schema"] = "text"
+    # 本地修复仍失败时最多重新请求的次数
+    max_parse_retries: int = 1
+    # 提示词模板（prompts.TEMPLATES 中的名称）
+    prompt_template: str = prompts.DEFAULT_TEMPLATE
 
 
 class OpenAIAnalyzer:
@@ -134,8 +260,13 @@ class OpenAIAnalyzer:
     - 仍保留 from_env 以兼容其他调用方式
     """
 
-    def __init__(self, config: OpenAIAnalyzerConfig):
+    def __init__(self, config: OpenAIAnalyzerConfig, *, metrics: Optional[LlmMetrics] = None):
         self.config = config
+        self.metrics = metrics or LlmMetrics()
+        self.template = prompts.get_template(config.prompt_template)
+        self.prompt_hash = self.template.hash(config.response_format)
+        # 最近一次 analyze() 内所有请求的 usage 之和（每个实例只在一个线程内使用）
+        self.last_usage: dict[str, int] = dict.fromkeys(_USAGE_FIELDS, 0)
         self.session = requests.Session()
 
         self.base_url = config.base_url.rstrip("/")
@@ -154,7 +285,16 @@ class OpenAIAnalyzer:
         return cls(OpenAIAnalyzerConfig(api_key=api_key, base_url=base_url, model=model))
 
     @classmethod
-    def from_config(cls, *, api_key: str | None, base_url: str, model: str) -> "OpenAIAnalyzer":
+    def from_config(
+        cls,
+        *,
+        api_key: str | None,
+        base_url: str,
+        model: str,
+        response_format: Literal["text", "json_schema"] = "text",
+        prompt_template: Optional[str] = None,
+        metrics: Optional[LlmMetrics] = None,
+    ) -> "OpenAIAnalyzer":
         if not api_key or not str(api_key).strip():
             raise LlmError("缺少 OPENAI_API_KEY，无法进行 AI 分析。")
         return cls(
@@ -162,67 +302,65 @@ class OpenAIAnalyzer:
                 api_key=str(api_key).strip(),
                 base_url=base_url,
                 model=model,
-            )
+                response_format=response_format,
+                prompt_template=prompt_template or prompts.DEFAULT_TEMPLATE,
+            ),
+            metrics=metrics,
         )
 
     def analyze(self, *, title: str | None, content_text: str) -> InsightBatch:
-        prompt = self._build_prompt(title=title, content_text=content_text)
-        raw = self._chat(prompt)
-        parsed = self._parse_json_any(raw)
-        items = self._validate_items(parsed)
+        self.last_usage = dict.fromkeys(self.last_usage, 0)
+        items, repaired = self._analyze_with_repair(self._build_messages(title=title, content_text=content_text))
         if not items:
             raise LlmError("LLM 未返回任何洞察条目（空列表）")
-        return InsightBatch(items=items)
-
-    def _build_prompt(self, *, title: str | None, content_text: str) -> str:
-        title_part = (title or "").strip()
-        body = (content_text or "").strip()
-        return (
-            "# Role\n"
-            "你是一位 AI 行业进化史记录专家，擅长从碎片化的快讯中捕捉技术的“进化节点”。\n\n"
-            "# Task\n"
-            "分析输入的新闻/快讯，提炼技术进展。即使信息模糊，也要根据功能描述推断其所属的最相关维度。\n\n"
-            '# Strategy: "Relaxed & Insightful"\n'
-            "1. **多重归类**：如果一个项目既是AI编程又涉及视频生成（如：全自动写脚本做动画），请同时记录在两个维度下。\n"
-            "2. **捕捉 Vibe Coding 信号**：关注那些“动动嘴”、“不会代码也能做”、“全自动生成页面”的描述，这些归入 [AI编程/Vibe Coding]。\n"
-            "3. **推断缺失信息**：未提及机构时记录为“开源/个人项目”。\n\n"
-            "# Dimensions Definition\n"
-            "- LLM: 文本、代码逻辑、长文本理解、模型架构。\n"
-            "- VLM: 视觉理解、OCR、4D/3D感知、物体分割。\n"
-            "- 视频生成: 视频模型、数字人、特效、3D重建。\n"
-            "- 音频/TTS/ASR: 声音克隆、转录、实时对话、情感语音。\n"
-            "- 具身智能: 机器人、自动操作电脑(Desktop Agent)、自动驾驶、物理交互。\n"
-            "- AI编程/Vibe Coding: 自然语言编程、全自动代码生成、Figma2Code、自进化编程助手。\n"
-            "- AI应用: 除去编程外的垂直行业工具（如：教育、表格、医疗助手）。\n\n"
-            "# Output Format (JSON ONLY)\n"
-            "[\n"
-            "  {\n"
-            '    "dimension": "维度名称",\n'
-            '    "project_name": "项目/产品名",\n'
-            '    "tech_node": "核心技术点（描述进化脉络，例如：从代码补全到UI全自动生成）",\n'
-            '    "evolution_tag": "标签（如：开源 / 突破性体验 / 商业落地 / VibeCoding）",\n'
-            '    "impact_signal": "文中提到的热度信息（如：爆火、彻底改变产品开发流程等）",\n'
-            '    "raw_context": "简短原始摘要"\n'
-            "  }\n"
-            "]\n\n"
-            "要求：只输出 JSON 数组，不要输出任何额外文字。\n"
-            f"输入标题：{title_part}\n"
-            f"输入正文：{body}\n"
-        )
+        return InsightBatch(items=items, prompt_hash=self.prompt_hash, repaired=repaired)
 
-    def _chat(self, user_prompt: str) -> str:
-        url = f"{self.base_url}/chat/completions"
+    def _analyze_with_repair(self, messages: list[dict[str, str]]) -> tuple[list[InsightItem], bool]:
+        """
+        解析/校验失败时先本地修复，修复不出任何条目才重新请求（最多 max_parse_retries 次）。
+        返回 (条目, 是否经过本地修复)。
+        """
+        last_err: Optional[BaseException] = None
+        for attempt in range(self.config.max_parse_retries + 1):
+            raw = self._chat(messages)
+            self.metrics.add(calls=1)
+            try:
+                return self._validate_items(self._parse_json_any(raw)), False
+            except (LlmError, ValidationError) as e:
+                last_err = e
+            self.metrics.add(parse_failures=1)
+            repaired = [it for it in map(repair_item, repair_json_text(raw) or []) if it is not None]
+            if repaired:
+                self.metrics.add(repaired=1)
+                return repaired, True
+            if attempt < self.config.max_parse_retries:
+                self.metrics.add(rerequests=1)
+        self.metrics.add(wasted_calls=1)
+        raise LlmError("LLM 输出无法解析（本地修复与重新请求均失败）") from last_err
+
+    def _build_messages(self, *, title: str | None, content_text: str) -> list[dict[str, str]]:
+        # 静态前缀单独放 system（逐字节稳定，便于服务端前缀缓存），变量内容放最后
+        return [
+            {"role": "system", "content": self.template.prefix(self.config.response_format)},
+            {"role": "user", "content": self.template.render_user(title=title, body=content_text)},
+        ]
+
+    def _payload(self, messages: list[dict[str, str]]) -> dict[str, Any]:
         payload: dict[str, Any] = {
             "model": self.config.model,
             "temperature": 0,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "你是一个严格按要求输出 JSON 的信息抽取助手。",
-                },
-                {"role": "user", "content": user_prompt},
-            ],
+            "messages": messages,
         }
+        if self.config.response_format == "json_schema":
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "tech_insights", "strict": True, "schema": insight_json_schema()},
+            }
+        return payload
+
+    def _chat(self, messages: list[dict[str, str]]) -> str:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._payload(messages)
 
         last_err: Optional[BaseException] = None
         for attempt in range(self.config.max_retries + 1):
@@ -241,6 +379,7 @@ class OpenAIAnalyzer:
 
                 resp.raise_for_status()
                 data = resp.json()
+                self._record_usage(data.get("usage"))
                 content = (
                     data.get("choices", [{}])[0]
                     .get("message", {})
@@ -257,6 +396,14 @@ class OpenAIAnalyzer:
 
         raise LlmError("LLM 调用失败") from last_err
 
+    def _record_usage(self, usage: Any) -> None:
+        if not isinstance(usage, dict):
+            return
+        counts = usage_counts(usage)
+        self.metrics.add(**counts)
+        for k, v in counts.items():
+            self.last_usage[k] += v
+
     def _sleep_backoff(self, attempt: int) -> None:
         base = min(
             self.config.backoff_max_s,
@@ -0,0 +1,82 @@
+"""
+查询脚本冷启动基准：用 `python -X importtime` 统计各入口的导入耗时与总耗时。
+
+    python bench_startup.py --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+CASES = {
+    "list-dimensions": ["--list-dimensions"],
+    "timeline": ["--dimension", "LLM", "--limit", "1"],
+    "stats": ["stats", "--months", "1"],
+}
+
+# 启动路径上不应出现的重依赖
+HEAVY_MODULES = ("pydantic", "requests", "cozepy", "numpy")
+
+
+def _parse_importtime(stderr: str) -> tuple[int, dict[str, int]]:
+    """返回 (顶层导入累计微秒, 顶层模块 -> 累计微秒)。"""
+    top: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum_us, name = line.split("|")
+        # 缩进一级的才是顶层导入（更深的缩进是被它们间接导入的模块）
+        if name.startswith(" ") and not name.startswith("  ") and cum_us.strip().isdigit():
+            top[name.strip()] = int(cum_us)
+    return sum(top.values()), top
+
+
+def _run(argv: list[str], db_path: str) -> tuple[float, str]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "query_tech_insights.py", "--db", db_path, *argv],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(f"{' '.join(argv)} 失败：{proc.stderr[-500:]}")
+    return elapsed, proc.stderr
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查询脚本冷启动耗时（-X importtime）")
+    parser.add_argument(
+        "--db",
+        default=os.getenv("DB_PATH", str(SCRIPT_DIR.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="每个入口运行次数（取最小值）")
+    parser.add_argument("--top", type=int, default=5, help="列出最慢的前 N 个顶层导入")
+    args = parser.parse_args()
+
+    for case, argv in CASES.items():
+        best_wall = float("inf")
+        best_import = 0
+        best_top: dict[str, int] = {}
+        for _ in range(max(1, args.runs)):
+            wall, stderr = _run(argv, args.db)
+            if wall < best_wall:
+                best_wall = wall
+                best_import, best_top = _parse_importtime(stderr)
+        heavy = [m for m in HEAVY_MODULES if m in best_top]
+        print(f"[{case}] wall={best_wall * 1000:.1f}ms imports={best_import / 1000:.1f}ms heavy={heavy or '-'}")
+        for name, us in sorted(best_top.items(), key=lambda kv: -kv[1])[: args.top]:
+            print(f"    {us / 1000:7.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+行对象构造的微基准：对比 pydantic 校验路径与内部可信路径（NamedTuple）的单行开销。
+
+    python bench_validation.py --rows 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+import database as db
+
+
+def _bench(label: str, fn, rows: int, repeat: int) -> float:
+    best = min(timeit.repeat(fn, number=1, repeat=repeat))
+    per_row_us = best / rows * 1e6
+    print(f"{label:<44} {per_row_us:8.3f} us/row")
+    return per_row_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pydantic 校验 vs 可信 NamedTuple 的单行开销")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    insight = {
+        "source_id": "7212262720526191930",
+        "dimension": "LLM",
+        "project_name": "GPT-4",
+        "tech_node": "多模态输入",
+        "evolution_tag": "发布",
+        "impact_score": 4,
+        "summary": "OpenAI 发布 GPT-4，支持图像输入。",
+    }
+    source = {
+        "source_id": "7212262720526191930",
+        "title": "见证AI历史｜盘点本周AI大事件",
+        "publish_time": 1679200000,
+        "source_url": "https://www.douyin.com/video/7212262720526191930",
+        "content_text": None,
+        "process_status": "pending",
+        "is_top": 0,
+    }
+    insights = [dict(insight) for _ in range(args.rows)]
+    sources = [dict(source) for _ in range(args.rows)]
+
+    before = _bench(
+        "TechInsightRow.model_validate(dict)",
+        lambda: [db.TechInsightRow.model_validate(d) for d in insights],
+        args.rows,
+        args.repeat,
+    )
+    after = _bench(
+        "TechInsightRecord(**fields)",
+        lambda: [db.TechInsightRecord(**d) for d in insights],
+        args.rows,
+        args.repeat,
+    )
+    print(f"{'':<44} x{before / after:.1f}")
+    before = _bench(
+        "RawSourceMeta.model_validate(dict)",
+        lambda: [db.RawSourceMeta.model_validate(d) for d in sources],
+        args.rows,
+        args.repeat,
+    )
+    after = _bench(
+        "RawSourceRecord(**fields)",
+        lambda: [db.RawSourceRecord(**d) for d in sources],
+        args.rows,
+        args.repeat,
+    )
+    print(f"{'':<44} x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
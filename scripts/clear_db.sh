@@ -5,7 +5,12 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 SKILL_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 
 DB_PATH_DEFAULT="$SKILL_ROOT/assets/data.db"
-DB_PATH_ARG="${1:-$DB_PATH_DEFAULT}"
+# 第一个参数若不是选项则视为 DB 路径；其余参数透传给 clear_db_data.py（--reset / --vacuum / --dimension ...）
+DB_PATH_ARG="$DB_PATH_DEFAULT"
+if [[ -n "${1:-}" && "$1" != --* ]]; then
+  DB_PATH_ARG="$1"
+  shift
+fi
 
 cd "$SCRIPT_DIR"
-python clear_db_data.py --db "$DB_PATH_ARG"
+python clear_db_data.py --db "$DB_PATH_ARG" "$@"
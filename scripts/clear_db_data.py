@@ -1,32 +1,175 @@
 from __future__ import annotations
 
 import argparse
+import datetime as _dt
 import os
 from pathlib import Path
+from typing import Optional
 
 import database as db
 
 
+# 全量清空时的删除顺序：先清子表再清主表
+_CLEAR_TABLES = (
+    "insight_links",
+    "insight_lsh",
+    "insight_minhash",
+    "insight_embeddings",
+    "insight_raw_items",
+    "tech_insights",
+    "analysis_runs",
+    "source_texts",
+    "raw_sources",
+    "compression_dicts",
+    "dimension_project_stats",
+    "dimension_stats",
+    "pipeline_state",
+    "project_aliases",
+    "projects",
+    # 兼容旧表（如果你仍保留旧数据，也一并清掉）
+    "ai_skills",
+    "videos",
+)
+
+# 配置类数据：全量清空与 --reset 都保留（表 -> 保留行的条件）
+_CONFIG_TABLES = {
+    "sources": None,
+    "prompt_templates": None,
+    "boilerplate_phrases": "kind = 'fragment'",
+}
+
+AUTO_VACUUM_MODES = {"none": 0, "full": 1, "incremental": 2}
+
+
 def clear_data(db_path: Path) -> None:
     conn = db.connect(db_path)
     # 确保表存在（不会影响既有表结构）
     db.init_db(conn)
 
-    # 先清子表再清主表，避免外键约束问题
-    conn.execute("DELETE FROM insight_links;")
-    conn.execute("DELETE FROM tech_insights;")
-    conn.execute("DELETE FROM raw_sources;")
-
-    # 兼容旧表（如果你仍保留旧数据，也一并清掉）
-    conn.execute("DELETE FROM ai_skills;")
-    conn.execute("DELETE FROM videos;")
+    # 关闭外键检查后，无 WHERE 的 DELETE 走 SQLite 的 truncate 优化（整表释放页，而不是逐行删除）
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    for table in _CLEAR_TABLES:
+        conn.execute(f"DELETE FROM {table};")
+    # 从历史文案学到的套话分句随文案一起清掉；手动添加的片段（kind = fragment）属于配置，保留
+    conn.execute("DELETE FROM boilerplate_phrases WHERE kind = 'sentence';")
 
     # 重置自增序列（可选但通常更符合“清空”直觉）
-    conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('ai_skills', 'tech_insights', 'insight_links');")
+    conn.execute(
+        "DELETE FROM sqlite_sequence WHERE name IN "
+        "('ai_skills', 'tech_insights', 'insight_links', 'projects', 'compression_dicts', 'analysis_runs');"
+    )
     conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON;")
+    _incremental_vacuum(conn)
+    conn.close()
+
+
+def reset_db(db_path: Path) -> None:
+    """
+    以全新空库原子替换（耗时与库大小无关）：在同目录建临时库、执行迁移，再 os.replace 覆盖。
+    沿用原库的 auto_vacuum 设置，并把配置表（账号登记、手动套话片段、提示词模板）复制到新库。
+    调用时不应有其他进程持有该库的连接。
+    """
+    old = db.connect(db_path)
+    auto_vacuum = int(old.execute("PRAGMA auto_vacuum").fetchone()[0])
+    old.close()
+
+    tmp_path = db_path.with_name(db_path.name + ".reset-tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = db.connect(tmp_path)
+    conn.execute(f"PRAGMA auto_vacuum = {auto_vacuum}")  # 必须在建表前设置
+    db.init_db(conn)
+    _copy_config_tables(conn, db_path)
+    conn.close()
+
+    os.replace(tmp_path, db_path)
+    # 旧库残留的 WAL/SHM 不能与新文件配对
+    for suffix in ("-wal", "-shm", "-journal"):
+        Path(str(db_path) + suffix).unlink(missing_ok=True)
+
+
+def _copy_config_tables(conn, old_path: Path) -> None:
+    """从旧库复制 _CONFIG_TABLES（旧库可能是更早的 schema：只复制两边都有的列）。"""
+    conn.execute("ATTACH DATABASE ? AS old", (str(old_path),))
+    try:
+        for table, where in _CONFIG_TABLES.items():
+            old_cols = {r["name"] for r in conn.execute(f"PRAGMA old.table_info({table})")}
+            cols = [r["name"] for r in conn.execute(f"PRAGMA main.table_info({table})") if r["name"] in old_cols]
+            if not cols:
+                continue
+            col_sql = ", ".join(cols)
+            conn.execute(
+                f"INSERT INTO main.{table} ({col_sql}) SELECT {col_sql} FROM old.{table}"
+                + (f" WHERE {where}" if where else "")
+            )
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE old")
+
+
+def clear_selected(
+    db_path: Path,
+    *,
+    dimension: Optional[str] = None,
+    status: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+) -> int:
+    """
+    选择性清理（走索引、分批提交）：
+    - 指定 dimension：只删该维度（及时间范围内）的洞察，来源与文案保留
+    - 否则按 status / 时间范围删除来源及其文案、洞察
+    返回删除的洞察数或来源数。
+    """
+    conn = db.connect(db_path)
+    db.init_db(conn)
+    if dimension is not None:
+        n = db.delete_tech_insights(conn, dimension=dimension, since_ts=since_ts, until_ts=until_ts)
+    else:
+        n = db.delete_sources(conn, status=status, since_ts=since_ts, until_ts=until_ts)
+    _incremental_vacuum(conn)
+    conn.close()
+    return n
+
+
+def set_auto_vacuum(db_path: Path, mode: str) -> None:
+    """修改 auto_vacuum 模式；已有库需要一次 VACUUM 才会生效。"""
+    conn = db.connect(db_path)
+    conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_MODES[mode]}")
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def vacuum(db_path: Path, into: Optional[Path] = None) -> None:
+    """VACUUM 原库，或 VACUUM INTO 生成压缩后的副本（原库不变）。"""
+    conn = db.connect(db_path)
+    if into is None:
+        conn.execute("VACUUM")
+    else:
+        if into.exists():
+            raise SystemExit(f"目标文件已存在：{into}")
+        conn.execute("VACUUM INTO ?", (str(into),))
     conn.close()
 
 
+def _incremental_vacuum(conn) -> None:
+    # auto_vacuum=INCREMENTAL 时把删除产生的空闲页归还给文件系统
+    if int(conn.execute("PRAGMA auto_vacuum").fetchone()[0]) == AUTO_VACUUM_MODES["incremental"]:
+        # executescript 会把 pragma 执行到底（execute 只 step 一次，只释放一页）
+        conn.executescript("PRAGMA incremental_vacuum;")
+
+
+def _file_size(db_path: Path) -> int:
+    return db_path.stat().st_size if db_path.exists() else 0
+
+
+def _date_to_ts(date_str: str, *, end: bool = False) -> int:
+    dt = _dt.datetime.strptime(date_str.strip(), "%Y-%m-%d")
+    if end:
+        dt = dt.replace(hour=23, minute=59, second=59)
+    return int(dt.timestamp())
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="清空 SQLite 数据（保留表结构）")
     parser.add_argument(
@@ -35,16 +178,75 @@ def main() -> None:
         default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
         help="SQLite 文件路径（默认读取 DB_PATH，否则使用当前目录 data.db）",
     )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="以全新空库原子替换（最快；保留账号登记、手动套话片段与提示词模板；请确保没有其他进程正在使用该库）",
+    )
+    parser.add_argument("--vacuum", action="store_true", help="清理后执行 VACUUM 回收空间")
+    parser.add_argument(
+        "--vacuum-into",
+        default=None,
+        metavar="PATH",
+        help="只把压缩后的副本写到 PATH（VACUUM INTO，不清空、不修改原库）",
+    )
+    parser.add_argument(
+        "--auto-vacuum",
+        choices=tuple(AUTO_VACUUM_MODES),
+        default=None,
+        help="设置 auto_vacuum 模式（incremental：之后每次清理自动归还空闲页）",
+    )
+    sel = parser.add_argument_group("选择性清理（指定任一项时不做全量清空）")
+    g = sel.add_mutually_exclusive_group()
+    g.add_argument("--dimension", default=None, help="只删除该维度的洞察（来源保留）")
+    g.add_argument(
+        "--status",
+        choices=("pending", "text_extracted", "analyzed", "skipped", "error"),
+        default=None,
+        help="删除该处理状态的来源（连同文案与洞察）",
+    )
+    sel.add_argument("--since", default=None, metavar="YYYY-MM-DD", help="发布时间起始（含当日）")
+    sel.add_argument("--until", default=None, metavar="YYYY-MM-DD", help="发布时间结束（含当日）")
     args = parser.parse_args()
 
     db_path = Path(args.db_path)
     if not db_path.exists():
         raise SystemExit(f"数据库文件不存在：{db_path}")
 
-    clear_data(db_path)
-    print(f"已清空数据（表保留）：{db_path}")
+    if args.vacuum_into:
+        vacuum(db_path, Path(args.vacuum_into))
+        print(f"已写出压缩副本：{args.vacuum_into} ({_file_size(Path(args.vacuum_into))} bytes)")
+        return
+
+    size_before = _file_size(db_path)
+    if args.auto_vacuum:
+        set_auto_vacuum(db_path, args.auto_vacuum)
+        print(f"auto_vacuum={args.auto_vacuum}")
+
+    selective = any(x is not None for x in (args.dimension, args.status, args.since, args.until))
+    if args.reset:
+        if selective:
+            raise SystemExit("--reset 不能与选择性清理参数同时使用")
+        reset_db(db_path)
+        print(f"已重置为空库：{db_path}")
+    elif selective:
+        n = clear_selected(
+            db_path,
+            dimension=args.dimension,
+            status=args.status,
+            since_ts=_date_to_ts(args.since) if args.since else None,
+            until_ts=_date_to_ts(args.until, end=True) if args.until else None,
+        )
+        unit = "条洞察" if args.dimension is not None else "个来源"
+        print(f"已删除 {n} {unit}：{db_path}")
+    elif not args.auto_vacuum:
+        clear_data(db_path)
+        print(f"已清空数据（表保留）：{db_path}")
+
+    if args.vacuum:
+        vacuum(db_path)
+    print(f"文件大小：{size_before} -> {_file_size(db_path)} bytes")
 
 
 if __name__ == "__main__":
     main()
-
@@ -3,9 +3,9 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 
 class AppConfig(BaseModel):
@@ -21,11 +21,51 @@ class AppConfig(BaseModel):
         validation_alias="OPENAI_BASE_URL",
     )
     openai_model: str = Field(default="gpt-4o", validation_alias="OPENAI_MODEL")
+    # 提示词模板（prompts.TEMPLATES 中的名称，默认最新登记的版本）
+    prompt_template: Optional[str] = Field(default=None, validation_alias="PROMPT_TEMPLATE")
+    # json_schema：以 response_format 约束输出结构（需接口支持 Structured Outputs）
+    openai_response_format: Literal["text", "json_schema"] = Field(
+        default="text", validation_alias="OPENAI_RESPONSE_FORMAT"
+    )
+    # AI 相关性门槛（唯一一处）：标题 + 正文的 AI 相关词命中数不足 MIN_AI_HITS 的视频跳过，不调用 LLM。
+    # 开启预处理时按清洗后的文案判定一次，路由直接沿用预处理的扫描结果；旧键名仍可用
+    min_ai_hits: int = Field(
+        default=2, validation_alias=AliasChoices("MIN_AI_HITS", "PREPROCESS_MIN_AI_HITS", "ROUTE_MIN_AI_HITS")
+    )
+    # 提取与分析之间的本地预处理（preprocess.py）：删套话、去重复分句、维度关键词预评分
+    preprocess: bool = Field(default=True, validation_alias="PREPROCESS")
+    # 模型分级路由（router.py）：本地启发式判断复杂度（未开预处理时也判断 AI 相关性），
+    # 简单的先交给 OPENAI_CHEAP_MODEL，复杂的或便宜模型失败 / 低置信时用 OPENAI_MODEL
+    routing: bool = Field(default=False, validation_alias="ROUTING")
+    openai_cheap_model: Optional[str] = Field(default=None, validation_alias="OPENAI_CHEAP_MODEL")
+    route_complex_min: int = Field(default=8, validation_alias="ROUTE_COMPLEX_MIN")
+    # 每百万 token 的 [输入, 输出, 缓存命中输入（可省略，默认输入价的一半）] 美元价，用于 analysis_runs.cost_usd，
+    # 如 {"gpt-4o": [2.5, 10, 1.25]}
+    model_prices: dict[str, tuple[float, float] | tuple[float, float, float]] = Field(
+        default_factory=dict, validation_alias="MODEL_PRICES"
+    )
+    # 写库线程（db_writer.py）的组提交间隔：取到第一个写操作后最多等待这么久，合并成一个事务
+    db_commit_interval_ms: int = Field(default=50, validation_alias="DB_COMMIT_INTERVAL_MS")
+    # outbox 日志（outbox.py）：外部接口结果落库前先写入的 JSONL，默认数据库同目录的 <库名>.outbox.jsonl
+    outbox_path: Optional[str] = Field(default=None, validation_alias="OUTBOX_PATH")
     test_mode: bool = Field(default=False, validation_alias="TEST_MODE")
     extract_workers: int = Field(default=5, validation_alias="EXTRACT_WORKERS")
     analyze_workers: int = Field(default=5, validation_alias="ANALYZE_WORKERS")
     extract_limit: int = Field(default=200, validation_alias="EXTRACT_LIMIT")
     window_size: int = Field(default=20, validation_alias="WINDOW_SIZE")
+    # 多账号（sources 表）并发同步的线程数
+    sync_workers: int = Field(default=4, validation_alias="SYNC_WORKERS")
+    # 守护模式（main.py --daemon）：有新视频后按最小间隔轮询，空闲时逐步放大到最大间隔
+    daemon_min_interval_s: float = Field(default=60, validation_alias="DAEMON_MIN_INTERVAL_S")
+    daemon_max_interval_s: float = Field(default=1800, validation_alias="DAEMON_MAX_INTERVAL_S")
+    daemon_backoff_factor: float = Field(default=2.0, validation_alias="DAEMON_BACKOFF_FACTOR")
+    # 脉络链接：tech_node 相似度阈值（0~1）；不填则只按项目名串链
+    link_similar_threshold: Optional[float] = Field(
+        default=None, validation_alias="LINK_SIMILAR_THRESHOLD"
+    )
+    # 语义索引（可选）：阶段 3 之后增量计算 embedding；模型默认 hashing（无需下载）
+    semantic_index: bool = Field(default=False, validation_alias="SEMANTIC_INDEX")
+    semantic_model: Optional[str] = Field(default=None, validation_alias="SEMANTIC_MODEL")
 
 
 def load_config(config_path: str | Path | None = None) -> AppConfig:
@@ -3,27 +3,20 @@ from __future__ import annotations
 import random
 import time
 from dataclasses import dataclass
-from typing import Any, Optional, Tuple
-
-from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing import Any, NamedTuple, Optional, Tuple
 
 import utils
 
 
-class CozeVideoItem(BaseModel):
-    """GetVideoList 返回的单条视频元数据。"""
-
-    model_config = ConfigDict(extra="forbid")
+class CozeVideoItem(NamedTuple):
+    """GetVideoList 返回的单条视频元数据（字段在 get_video_list_page 中逐个规范化，无需再经 pydantic）。"""
 
     aweme_id: str
-    title: Optional[str] = None
+    title: Optional[str]
     create_time: int
     url: str
 
 
-_VideoListAdapter = TypeAdapter(list[CozeVideoItem])
-
-
 class CozeApiError(RuntimeError):
     pass
 
@@ -53,18 +46,21 @@ class CozeClient:
         # 兼容旧调用：只返回第一页的 items
         return self.get_video_list_page(max_cursor=0, count=20).items
 
-    def get_video_list_page(self, *, max_cursor: int = 0, count: int = 20) -> VideoListPage:
+    def get_video_list_page(
+        self, *, max_cursor: int = 0, count: int = 20, input_url: Optional[str] = None
+    ) -> VideoListPage:
         """
         获取一页视频列表（utils.get_video_list 每次默认抓取 count 条，并返回 has_more / max_cursor）。
         - max_cursor: 上一页返回的 max_cursor（初次传 0）
         - count: 每页条数（默认 20）
+        - input_url: 账号主页 URL（默认 utils 内置的“产品君”）
         """
         # utils.get_video_list 已内置 count=20；这里仍显式传入以满足“窗口可配置”
         raw = self._call_utils_with_retry(
-            lambda: utils.get_video_list(max_cursor=max_cursor, count=count)
+            lambda: utils.get_video_list(max_cursor=max_cursor, count=count, input_url=input_url)
         )
         items, has_more, next_cursor = self._extract_video_list_page(raw)
-        normalized: list[dict[str, Any]] = []
+        parsed_items: list[CozeVideoItem] = []
         for it in items:
             aweme_id = it.get("aweme_id") or it.get("item_id")
             url = it.get("url") or it.get("link")
@@ -72,15 +68,14 @@ class CozeClient:
             title = it.get("title") or it.get("caption")
             if not aweme_id or not url or create_time is None:
                 continue
-            normalized.append(
-                {
-                    "aweme_id": str(aweme_id),
-                    "title": title,
-                    "create_time": int(create_time),
-                    "url": str(url),
-                }
+            parsed_items.append(
+                CozeVideoItem(
+                    aweme_id=str(aweme_id),
+                    title=str(title) if title is not None else None,
+                    create_time=int(create_time),
+                    url=str(url),
+                )
             )
-        parsed_items = _VideoListAdapter.validate_python(normalized)
         return VideoListPage(items=parsed_items, has_more=has_more, next_cursor=next_cursor)
 
     def get_video_content(self, url: str) -> str:
@@ -1,16 +1,37 @@
 from __future__ import annotations
 
+import datetime as _dt
+import os
 import sqlite3
-from dataclasses import dataclass
+import sys
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Literal, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Literal, NamedTuple, Optional, Sequence
 
-from pydantic import BaseModel, ConfigDict, Field
+import project_normalizer as pn
 
+if TYPE_CHECKING:
+    from db_models import AiSkillRow, RawSourceMeta, TechInsightRow, VideoMeta
 
-PROCESS_STATUS = Literal["pending", "text_extracted", "analyzed", "error"]
 
+PROCESS_STATUS = Literal["pending", "text_extracted", "analyzed", "skipped", "error"]
 
+# pydantic 模型在 db_models 中，首次访问 db.RawSourceMeta 等时才导入（查询脚本启动无需加载 pydantic）
+_LAZY_MODELS = frozenset({"VideoMeta", "AiSkillRow", "RawSourceMeta", "TechInsightRow"})
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_MODELS:
+        import db_models
+
+        return getattr(db_models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# v1 基线 schema（由 migrations.py 的 v1 执行），即引入 user_version 迁移时的完整结构。
+# 其中 raw_sources.text_len、tech_insights.canonical_project_id / duplicate_of 早于迁移机制加入：
+# 新库由这里的 CREATE TABLE 建出，更早的库由 v1 的 add_column 补齐，两条路径得到同一形状。
+# 此后冻结：v2 起的列 / 表 / 索引只在 migrations.MIGRATIONS 中追加（add_column、IF NOT EXISTS），不写进这里
 SCHEMA_SQL = """
 -- =========================
 -- 新版：原始来源表 raw_sources
@@ -20,14 +41,34 @@ CREATE TABLE IF NOT EXISTS raw_sources (
     title TEXT,                       -- 标题
     publish_time INTEGER,             -- 发布时间戳
     source_url TEXT,                  -- 来源链接
-    content_text TEXT,                -- 原始文案/正文（可为空，后续提取）
+    content_text TEXT,                -- 旧版内联文案（已迁移到 source_texts，新数据恒为 NULL）
     process_status TEXT DEFAULT 'pending', -- pending, text_extracted, analyzed, error
     is_top INTEGER DEFAULT 0,         -- 1为置顶，0为普通
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    text_len INTEGER                  -- 文案字符数（NULL/0 表示尚无文案）
 );
 
 CREATE INDEX IF NOT EXISTS idx_publish_time ON raw_sources(publish_time);
 
+-- =========================
+-- 原始文案：压缩存储，与 raw_sources 的热元数据分离，只在分析阶段按需读取（见 text_store.py）
+-- =========================
+CREATE TABLE IF NOT EXISTS source_texts (
+    source_id TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,              -- zlib / zstd
+    dict_id INTEGER,                  -- zstd 共享字典（compression_dicts.dict_id），可为空
+    raw_bytes INTEGER NOT NULL,       -- 压缩前 UTF-8 字节数
+    data BLOB NOT NULL,
+    FOREIGN KEY (source_id) REFERENCES raw_sources(source_id)
+);
+
+CREATE TABLE IF NOT EXISTS compression_dicts (
+    dict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =========================
 -- 新版：技术进化流表 tech_insights
 -- =========================
@@ -40,12 +81,15 @@ CREATE TABLE IF NOT EXISTS tech_insights (
     evolution_tag TEXT,
     impact_score INTEGER DEFAULT 1,
     summary TEXT,
+    canonical_project_id INTEGER,     -- 归一化后的项目实体（projects.project_id）
+    duplicate_of INTEGER,             -- 近重复时指向保留的那条 insight_id（NULL 表示非重复）
     FOREIGN KEY (source_id) REFERENCES raw_sources(source_id)
 );
 
 -- 为维度和项目创建索引（时间轴排序通过 join raw_sources.publish_time 完成）
 CREATE INDEX IF NOT EXISTS idx_dimension_time ON tech_insights(dimension);
 CREATE INDEX IF NOT EXISTS idx_project ON tech_insights(project_name);
+CREATE INDEX IF NOT EXISTS idx_insight_source ON tech_insights(source_id);
 
 -- （可选）技术节点关系表：用于构建“脉络链接”
 CREATE TABLE IF NOT EXISTS insight_links (
@@ -57,6 +101,95 @@ CREATE TABLE IF NOT EXISTS insight_links (
     FOREIGN KEY (child_insight_id) REFERENCES tech_insights(insight_id)
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_links_parent ON insight_links(parent_insight_id, child_insight_id, relation_type);
+CREATE INDEX IF NOT EXISTS idx_links_child ON insight_links(child_insight_id);
+
+-- =========================
+-- 项目实体：规范名 + 别名（见 project_normalizer.py）
+-- tech_insights.canonical_project_id 指向 projects.project_id
+-- =========================
+CREATE TABLE IF NOT EXISTS projects (
+    project_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    canonical_name TEXT NOT NULL,
+    canonical_key TEXT NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS project_aliases (
+    alias_key TEXT PRIMARY KEY,       -- normalize_project_name 得到的 key
+    project_id INTEGER NOT NULL,
+    alias TEXT,                       -- 首次出现时的原始写法
+    block_key TEXT NOT NULL,          -- 模糊匹配分块
+    FOREIGN KEY (project_id) REFERENCES projects(project_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_alias_block ON project_aliases(block_key);
+CREATE INDEX IF NOT EXISTS idx_alias_project ON project_aliases(project_id);
+
+-- =========================
+-- 近重复检测（见 dedup.py）：MinHash 签名 + LSH 分段索引
+-- =========================
+CREATE TABLE IF NOT EXISTS insight_minhash (
+    insight_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS insight_lsh (
+    band_key INTEGER NOT NULL,        -- 维度 + 第 k 段签名的哈希
+    insight_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, insight_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_lsh_insight ON insight_lsh(insight_id);
+
+-- =========================
+-- 语义索引（可选，见 semantic_index.py）：float16 向量 BLOB
+-- =========================
+CREATE TABLE IF NOT EXISTS insight_embeddings (
+    insight_id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,              -- embedding 模型名（hashing 或 sentence-transformers 模型）
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL              -- L2 归一化后的 float16 向量
+);
+
+CREATE INDEX IF NOT EXISTS idx_embedding_model ON insight_embeddings(model);
+
+-- 流水线状态（键值对），例如脉络链接的增量水位
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =========================
+-- 汇总表：维度 × 时间桶（day/week/month）
+-- 由 insert_tech_insights / delete_tech_insights_for_source 增量维护；
+-- 可用 rebuild_dimension_stats 一次性重建。
+-- bucket 为桶起始日期（本地时间，YYYY-MM-DD；week 以周一为起点）
+-- =========================
+CREATE TABLE IF NOT EXISTS dimension_project_stats (
+    granularity TEXT NOT NULL,        -- day / week / month
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    project_key TEXT NOT NULL,        -- 归一化后的项目名（空项目为 ''）
+    project_name TEXT,                -- 展示用原始项目名（取其一）
+    insight_count INTEGER NOT NULL DEFAULT 0,
+    impact_sum INTEGER NOT NULL DEFAULT 0,
+    impact_max INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, dimension, project_key)
+);
+
+CREATE TABLE IF NOT EXISTS dimension_stats (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    insight_count INTEGER NOT NULL DEFAULT 0,
+    impact_sum INTEGER NOT NULL DEFAULT 0,
+    impact_max INTEGER NOT NULL DEFAULT 0,
+    project_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, dimension)
+);
+
 -- =========================
 -- 旧版表（保留，避免已有 DB 失效；新逻辑不再写入）
 -- =========================
@@ -84,275 +217,1845 @@ CREATE INDEX IF NOT EXISTS idx_time ON videos(create_time);
 CREATE INDEX IF NOT EXISTS idx_dim ON ai_skills(tech_dimension);
 """
 
+# 汇总表中的项目 key：canonical_project_id 的文本形式（无项目为 ''；tech_insights 别名须为 i）
+_PROJECT_KEY_SQL = "COALESCE(CAST(i.canonical_project_id AS TEXT), '')"
+# 汇总表中的项目展示名：优先规范名（projects 别名须为 p）
+_PROJECT_NAME_SQL = "MAX(COALESCE(p.canonical_name, i.project_name))"
+
+LINK_SAME_PROJECT = "same_project"
+LINK_SIMILAR_NODE = "similar_node"
+
+
+class RawSourceRecord(NamedTuple):
+    """
+    内部可信路径：字段与 RawSourceMeta 相同，但不经 pydantic 校验（由已校验的上游直接构造）。
+    外部传入的 dict 仍走 RawSourceMeta。
+    """
+
+    source_id: str
+    title: Optional[str]
+    publish_time: int
+    source_url: str
+    content_text: Optional[str] = None
+    process_status: str = "pending"
+    is_top: int = 0
+    feed_id: Optional[int] = None
+
+
+class FeedSource(NamedTuple):
+    """sources 表中登记的一个抓取入口（账号主页 URL）。"""
+
+    feed_id: int
+    name: str
+    input_url: str
+    poll_interval_s: int
+    rate_limit_per_min: float
+    top_n: int
+    last_polled_at: Optional[int]
+
+
+class BoilerplatePhrase(NamedTuple):
+    """预处理套话词表的一项（fragment：分句包含即删除；sentence：规范化后相同才删除）。"""
+
+    phrase: str
+    kind: str
+    doc_freq: Optional[int]
+
+
+class TechInsightRecord(NamedTuple):
+    """内部可信路径：字段与 TechInsightRow 相同，不经 pydantic 校验。"""
+
+    source_id: str
+    dimension: str
+    project_name: Optional[str] = None
+    tech_node: Optional[str] = None
+    evolution_tag: Optional[str] = None
+    impact_score: int = 1
+    summary: Optional[str] = None
+    prompt_hash: Optional[str] = None
+    # LLM 原始热度描述（impact_score 由它与 evolution_tag 推断，保存下来便于改词表后重算）
+    impact_signal: Optional[str] = None
+    # LLM 原始条目 JSON，写入 insight_raw_items（rederive.py 据此重算派生列）
+    raw_item: Optional[str] = None
+
+
+class ExtractTask(NamedTuple):
+    """阶段 2 工作队列行：只含提取文案所需的列。"""
+
+    source_id: str
+    source_url: str
+
+
+class AnalyzeTask(NamedTuple):
+    """阶段 3 工作队列行：文案不随队列加载，分析前再用 get_source_content 单条读取。"""
+
+    source_id: str
+    title: Optional[str]
+
+
+# 遇到其他连接持有的锁时的等待上限（秒）。库为 WAL 模式（迁移 v11），读写互不阻塞；
+# 写写之间、以及 WAL 检查点时仍可能短暂加锁，读连接也按此等待而不是立即报 SQLITE_BUSY
+BUSY_TIMEOUT_S = 30.0
+
+
+def connect(db_path: str | Path, *, factory: type[sqlite3.Connection] = sqlite3.Connection) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), factory=factory, timeout=BUSY_TIMEOUT_S)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+# 最新 schema 版本（PRAGMA user_version），与 migrations.MIGRATIONS 最后一项一致
+SCHEMA_VERSION = 11
+
+
+def init_db(conn: sqlite3.Connection) -> None:
+    """
+    执行未应用的 schema 迁移（见 migrations.py）。
+    已是最新版本时只读一次 PRAGMA user_version，不执行建表脚本。
+    迁移在库文件旁的锁文件下进行：多个进程同时启动时只有一个执行，其余等它完成后重新检查版本。
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    import migrations
+
+    path = conn.execute("PRAGMA database_list").fetchone()["file"]
+    if not path:  # 内存库
+        migrations.migrate(conn)
+        return
+    with _migration_lock(Path(path)):
+        migrations.migrate(conn)
+
+
+@contextmanager
+def _migration_lock(db_path: Path) -> Iterator[None]:
+    """<库名>.migrate.lock 上的进程间排它锁（POSIX flock / Windows msvcrt）。"""
+    lock_path = db_path.with_name(db_path.name + ".migrate.lock")
+    with open(lock_path, "a+b") as f:
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class SchemaOutdatedError(RuntimeError):
+    """库的 schema 版本落后于代码，且库文件不可写、无法就地迁移。"""
+
+
+def connect_for_query(db_path: str | Path) -> sqlite3.Connection:
+    """
+    查询入口用：schema 已是最新时只读一次 PRAGMA user_version。
+    版本落后时（如仓库自带的旧库）在迁移锁下执行一次迁移，之后的查询不再有额外开销；
+    库文件或所在目录不可写时抛 SchemaOutdatedError，提示手动执行 migrations.py。
+    库不存在时抛 FileNotFoundError（不创建空库）。
+    """
+    db_path = Path(db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"数据库不存在：{db_path}")
+    conn = connect(db_path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return conn
+    if not (os.access(db_path, os.W_OK) and os.access(db_path.parent, os.W_OK)):
+        conn.close()
+        raise SchemaOutdatedError(
+            f"数据库 schema 版本 {version} 落后于当前代码 {SCHEMA_VERSION}，且库文件不可写，"
+            f"请用有写权限的账号执行迁移：python scripts/migrations.py --db {db_path}"
+        )
+    print(f"[db] schema {version} -> {SCHEMA_VERSION}：首次查询执行迁移 ...", file=sys.stderr, flush=True)
+    init_db(conn)
+    return conn
+
+
+# =========================
+# 新版：raw_sources / tech_insights
+# =========================
+
+
+def _feed_filter(feed_id: Optional[int]) -> tuple[str, tuple[Any, ...]]:
+    # feed_id=None 表示不区分账号（单账号模式的旧行为）
+    return ("", ()) if feed_id is None else (" AND feed_id = ?", (int(feed_id),))
+
+
+def get_max_publish_time(conn: sqlite3.Connection, feed_id: Optional[int] = None) -> Optional[int]:
+    where, params = _feed_filter(feed_id)
+    row = conn.execute(
+        f"SELECT MAX(publish_time) AS max_time FROM raw_sources WHERE 1 = 1{where}", params
+    ).fetchone()
+    if not row:
+        return None
+    max_time = row["max_time"]
+    return int(max_time) if max_time is not None else None
+
+
+def source_exists(conn: sqlite3.Connection, source_id: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM raw_sources WHERE source_id = ? LIMIT 1",
+        (source_id,),
+    ).fetchone()
+    return row is not None
+
+
+def upsert_raw_source_meta(
+    conn: sqlite3.Connection, source: RawSourceMeta | RawSourceRecord | dict[str, Any]
+) -> None:
+    """
+    如果 source_id 已存在则更新（含 is_top），否则插入。
+    注意：updated_at 会被刷新为 CURRENT_TIMESTAMP。
+    content_text 非空时写入 source_texts（压缩），为空时保留已有文案。
+    RawSourceRecord / RawSourceMeta 视为已校验，直接写入；其他输入走 pydantic 校验。
+    """
+    if not isinstance(source, RawSourceRecord):
+        from db_models import RawSourceMeta
+
+        if not isinstance(source, RawSourceMeta):
+            source = RawSourceMeta.model_validate(source)
+    conn.execute(
+        """
+        INSERT INTO raw_sources (source_id, title, publish_time, source_url, process_status, is_top, feed_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source_id) DO UPDATE SET
+            title = excluded.title,
+            publish_time = excluded.publish_time,
+            source_url = excluded.source_url,
+            process_status = COALESCE(excluded.process_status, raw_sources.process_status),
+            is_top = excluded.is_top,
+            feed_id = COALESCE(excluded.feed_id, raw_sources.feed_id),
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (
+            source.source_id,
+            source.title,
+            source.publish_time,
+            source.source_url,
+            source.process_status,
+            int(source.is_top),
+            source.feed_id,
+        ),
+    )
+    if source.content_text is not None:
+        _store_source_text(conn, source.source_id, source.content_text)
+    conn.commit()
+
+
+def update_source_is_top(conn: sqlite3.Connection, source_id: str, is_top: int) -> bool:
+    """只在置顶标记确实变化时写入（不刷新未变行的 updated_at），返回是否有改动。"""
+    cur = conn.execute(
+        """
+        UPDATE raw_sources SET is_top = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE source_id = ? AND is_top <> ?
+        """,
+        (int(is_top), source_id, int(is_top)),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def claim_source_for_feed(conn: sqlite3.Connection, source_id: str, feed_id: int) -> bool:
+    """把单账号时代（feed_id 为空）的来源归到某个账号，返回是否有改动。"""
+    cur = conn.execute(
+        "UPDATE raw_sources SET feed_id = ? WHERE source_id = ? AND feed_id IS NULL",
+        (int(feed_id), source_id),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def list_top_source_ids(conn: sqlite3.Connection, feed_id: Optional[int] = None) -> list[str]:
+    where, params = _feed_filter(feed_id)
+    return [
+        r[0] for r in conn.execute(f"SELECT source_id FROM raw_sources WHERE is_top = 1{where}", params)
+    ]
+
+
+def get_max_unpinned_publish_time(
+    conn: sqlite3.Connection, feed_id: Optional[int] = None
+) -> Optional[int]:
+    where, params = _feed_filter(feed_id)
+    row = conn.execute(
+        f"SELECT MAX(publish_time) FROM raw_sources WHERE is_top = 0{where}", params
+    ).fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def update_source_content(
+    conn: sqlite3.Connection,
+    source_id: str,
+    content_text: str,
+    status: PROCESS_STATUS = "text_extracted",
+) -> None:
+    _store_source_text(conn, source_id, content_text)
+    conn.execute(
+        """
+        UPDATE raw_sources
+        SET process_status = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE source_id = ?
+        """,
+        (status, source_id),
+    )
+    conn.commit()
+
+
+def update_source_status(
+    conn: sqlite3.Connection,
+    source_id: str,
+    status: PROCESS_STATUS,
+) -> None:
+    conn.execute(
+        "UPDATE raw_sources SET process_status = ?, updated_at = CURRENT_TIMESTAMP WHERE source_id = ?",
+        (status, source_id),
+    )
+    conn.commit()
+
+
+def clear_is_top_except_sources(
+    conn: sqlite3.Connection, keep_source_ids: Sequence[str], feed_id: Optional[int] = None
+) -> None:
+    keep = [sid for sid in keep_source_ids if sid]
+    where, params = _feed_filter(feed_id)
+    if not keep:
+        conn.execute(
+            f"UPDATE raw_sources SET is_top = 0, updated_at = CURRENT_TIMESTAMP WHERE is_top = 1{where}",
+            params,
+        )
+        conn.commit()
+        return
+
+    placeholders = ",".join(["?"] * len(keep))
+    conn.execute(
+        f"""
+        UPDATE raw_sources
+        SET is_top = 0, updated_at = CURRENT_TIMESTAMP
+        WHERE is_top = 1 AND source_id NOT IN ({placeholders}){where}
+        """,
+        (*keep, *params),
+    )
+    conn.commit()
+
+
+def list_sources_needing_text(
+    conn: sqlite3.Connection,
+    min_publish_time_exclusive: Optional[int] = None,
+    limit: int = 100,
+) -> list[ExtractTask]:
+    """
+    阶段 2：文案提取
+    - 尚无文案（text_len 为空/0）或 process_status = 'pending'
+    - 排除 analyzed/error，避免死循环
+    """
+    sql = """
+    SELECT source_id, source_url FROM raw_sources
+    WHERE (COALESCE(text_len, 0) = 0 OR process_status = 'pending')
+      AND process_status NOT IN ('analyzed', 'skipped', 'error')
+    """
+    params: list[Any] = []
+    if min_publish_time_exclusive is not None:
+        sql += " AND publish_time > ?"
+        params.append(min_publish_time_exclusive)
+    sql += " ORDER BY publish_time DESC LIMIT ?"
+    params.append(limit)
+    return [ExtractTask(*r) for r in conn.execute(sql, params)]
+
+
+def list_sources_needing_analysis(
+    conn: sqlite3.Connection,
+    min_publish_time_exclusive: Optional[int] = None,
+    limit: int = 100,
+) -> list[AnalyzeTask]:
+    """
+    阶段 3：LLM 分析
+    默认分析 text_extracted；可通过 min_publish_time_exclusive 只分析“新增”来源。
+    """
+    sql = """
+    SELECT source_id, title FROM raw_sources
+    WHERE process_status = 'text_extracted'
+    """
+    params: list[Any] = []
+    if min_publish_time_exclusive is not None:
+        sql += " AND publish_time > ?"
+        params.append(min_publish_time_exclusive)
+    sql += " ORDER BY publish_time DESC LIMIT ?"
+    params.append(limit)
+    return [AnalyzeTask(*r) for r in conn.execute(sql, params)]
+
+
+# =========================
+# 原始文案：压缩存储 / 按需读取（编解码见 text_store.py）
+# =========================
+
+_TEXT_DICT_CACHE: dict[int, bytes] = {}
+
+
+def _text_dict(conn: sqlite3.Connection, dict_id: Optional[int]) -> Optional[bytes]:
+    if dict_id is None:
+        return None
+    data = _TEXT_DICT_CACHE.get(dict_id)
+    if data is None:
+        row = conn.execute(
+            "SELECT data FROM compression_dicts WHERE dict_id = ?", (dict_id,)
+        ).fetchone()
+        if row is None:
+            raise LookupError(f"compression_dicts 中缺少 dict_id={dict_id}")
+        data = _TEXT_DICT_CACHE[dict_id] = bytes(row["data"])
+    return data
+
+
+def _latest_text_dict_id(conn: sqlite3.Connection) -> Optional[int]:
+    import text_store
+
+    if not text_store.zstd_available():
+        return None
+    row = conn.execute(
+        "SELECT MAX(dict_id) AS dict_id FROM compression_dicts WHERE codec = ?",
+        (text_store.CODEC_ZSTD,),
+    ).fetchone()
+    return row["dict_id"] if row else None
+
+
+def _store_source_text(
+    conn: sqlite3.Connection,
+    source_id: str,
+    content_text: str,
+    *,
+    dict_id: Optional[int] = -1,
+) -> None:
+    """压缩写入 source_texts 并更新 raw_sources.text_len（不单独提交）。dict_id=-1 表示用最新字典。"""
+    import text_store
+
+    if dict_id == -1:
+        dict_id = _latest_text_dict_id(conn)
+    codec, used_dict, blob = text_store.compress_text(
+        content_text, dict_id=dict_id, dict_data=_text_dict(conn, dict_id)
+    )
+    conn.execute(
+        """
+        INSERT INTO source_texts (source_id, codec, dict_id, raw_bytes, data)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(source_id) DO UPDATE SET
+            codec = excluded.codec,
+            dict_id = excluded.dict_id,
+            raw_bytes = excluded.raw_bytes,
+            data = excluded.data
+        """,
+        (source_id, codec, used_dict, len(content_text.encode("utf-8")), blob),
+    )
+    conn.execute(
+        "UPDATE raw_sources SET content_text = NULL, text_len = ? WHERE source_id = ?",
+        (len(content_text.strip()), source_id),
+    )
+
+
+def get_source_content(conn: sqlite3.Connection, source_id: str) -> Optional[str]:
+    """按需读取并解压某来源的文案；没有文案时返回 None。"""
+    row = conn.execute(
+        "SELECT codec, dict_id, data FROM source_texts WHERE source_id = ?",
+        (source_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    import text_store
+
+    return text_store.decompress_text(
+        row["codec"], bytes(row["data"]), _text_dict(conn, row["dict_id"])
+    )
+
+
+def migrate_inline_content(conn: sqlite3.Connection, *, chunk_size: int = 200) -> int:
+    """把旧版内联在 raw_sources.content_text 的文案分块迁移到 source_texts，返回迁移条数。"""
+    total = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT source_id, content_text FROM raw_sources
+            WHERE content_text IS NOT NULL
+            LIMIT ?
+            """,
+            (int(chunk_size),),
+        ).fetchall()
+        if not rows:
+            break
+        for r in rows:
+            if r["content_text"].strip():
+                _store_source_text(conn, r["source_id"], r["content_text"])
+            else:
+                conn.execute(
+                    "UPDATE raw_sources SET content_text = NULL, text_len = 0 WHERE source_id = ?",
+                    (r["source_id"],),
+                )
+        conn.commit()
+        total += len(rows)
+    return total
+
+
+def iter_source_contents(conn: sqlite3.Connection, *, limit: Optional[int] = None) -> Iterable[str]:
+    """按发布时间倒序逐条解压文案（一次只在内存中保留一条）。"""
+    sql = """
+    SELECT t.source_id FROM source_texts t
+    JOIN raw_sources s ON s.source_id = t.source_id
+    ORDER BY s.publish_time DESC
+    """
+    params: tuple[Any, ...] = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (int(limit),)
+    for r in conn.execute(sql, params).fetchall():
+        text = get_source_content(conn, r["source_id"])
+        if text:
+            yield text
+
+
+def train_text_dictionary(conn: sqlite3.Connection, *, max_samples: int = 5000) -> int:
+    """用最近的文案训练 zstd 共享字典，之后新写入的文案都会使用它；返回 dict_id。"""
+    import text_store
+
+    data = text_store.train_dictionary(list(iter_source_contents(conn, limit=max_samples)))
+    cur = conn.execute(
+        "INSERT INTO compression_dicts (codec, data) VALUES (?, ?)",
+        (text_store.CODEC_ZSTD, data),
+    )
+    conn.commit()
+    return int(cur.lastrowid)
+
+
+def recompress_source_texts(conn: sqlite3.Connection, *, chunk_size: int = 200) -> int:
+    """按当前编码与最新字典重压缩全部文案（分块提交）。"""
+    dict_id = _latest_text_dict_id(conn)
+    total = 0
+    last = ""
+    while True:
+        ids = [
+            r["source_id"]
+            for r in conn.execute(
+                "SELECT source_id FROM source_texts WHERE source_id > ? ORDER BY source_id LIMIT ?",
+                (last, int(chunk_size)),
+            ).fetchall()
+        ]
+        if not ids:
+            break
+        for sid in ids:
+            text = get_source_content(conn, sid)
+            if text is not None:
+                _store_source_text(conn, sid, text, dict_id=dict_id)
+        conn.commit()
+        total += len(ids)
+        last = ids[-1]
+    return total
+
+
+def source_text_stats(conn: sqlite3.Connection) -> dict[str, Any]:
+    row = conn.execute(
+        """
+        SELECT COUNT(*) AS n, COALESCE(SUM(raw_bytes), 0) AS raw_bytes,
+               COALESCE(SUM(LENGTH(data)), 0) AS stored_bytes
+        FROM source_texts
+        """
+    ).fetchone()
+    codecs = {
+        f"{r['codec']}{'+dict' if r['dict_id'] is not None else ''}": r["n"]
+        for r in conn.execute(
+            "SELECT codec, dict_id, COUNT(*) AS n FROM source_texts GROUP BY codec, dict_id"
+        )
+    }
+    return {
+        "rows": row["n"],
+        "raw_bytes": row["raw_bytes"],
+        "stored_bytes": row["stored_bytes"],
+        "codecs": codecs,
+    }
+
+
+# 待删除洞察 id 的临时表：各级联步骤用 IN (SELECT ...) 关联，避免超长参数列表
+_DELETE_IDS_SQL = "SELECT insight_id FROM temp._delete_ids"
+
+
+def _delete_insight_ids(conn: sqlite3.Connection, insight_ids: Sequence[int]) -> None:
+    """
+    删除一批洞察并维护派生数据（不单独提交）：
+    脉络边、近重复索引/分组、语义向量、汇总表桶、同项目链。
+    """
+    if not insight_ids:
+        return
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _delete_ids (insight_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp._delete_ids")
+    conn.executemany(
+        "INSERT OR IGNORE INTO temp._delete_ids (insight_id) VALUES (?)",
+        [(int(x),) for x in insight_ids],
+    )
+    in_batch = f"IN ({_DELETE_IDS_SQL})"
+    touched = _stats_touched_buckets(conn, f"i.insight_id {in_batch}", ())
+    project_ids = [
+        r[0]
+        for r in conn.execute(
+            f"""
+            SELECT DISTINCT canonical_project_id FROM tech_insights
+            WHERE insight_id {in_batch} AND canonical_project_id IS NOT NULL
+            """
+        )
+    ]
+    # 先摘除指向这些洞察的边（外键约束），删除后再把同项目链首尾接上
+    conn.execute(f"DELETE FROM insight_links WHERE parent_insight_id {in_batch}")
+    conn.execute(f"DELETE FROM insight_links WHERE child_insight_id {in_batch}")
+    _forget_duplicates(conn)
+    conn.execute(f"DELETE FROM insight_embeddings WHERE insight_id {in_batch}")
+    conn.execute(f"DELETE FROM insight_raw_items WHERE insight_id {in_batch}")
+    conn.execute(f"DELETE FROM tech_insights WHERE insight_id {in_batch}")
+    for granularity, bucket, dimension in touched:
+        _recompute_stats_bucket(conn, granularity, bucket, dimension)
+    for project_id in project_ids:
+        _sync_project_chain(conn, project_id)
+    conn.execute("DELETE FROM temp._delete_ids")
+
+
+def delete_tech_insights_for_source(conn: sqlite3.Connection, source_id: str) -> None:
+    ids = [
+        r[0]
+        for r in conn.execute(
+            "SELECT insight_id FROM tech_insights WHERE source_id = ?", (source_id,)
+        )
+    ]
+    _delete_insight_ids(conn, ids)
+    conn.commit()
+
+
+def delete_tech_insights(
+    conn: sqlite3.Connection,
+    *,
+    dimension: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    batch_size: int = 500,
+) -> int:
+    """按维度 / 发布时间范围分批删除洞察（每批单独提交），返回删除条数。来源与文案保留。"""
+    sql = """
+    SELECT i.insight_id FROM tech_insights i
+    JOIN raw_sources s ON s.source_id = i.source_id
+    WHERE 1 = 1
+    """
+    params: list[Any] = []
+    if dimension is not None:
+        sql += " AND i.dimension = ?"
+        params.append(dimension)
+    if since_ts is not None:
+        sql += " AND s.publish_time >= ?"
+        params.append(since_ts)
+    if until_ts is not None:
+        sql += " AND s.publish_time <= ?"
+        params.append(until_ts)
+    sql += " LIMIT ?"
+    params.append(int(batch_size))
+
+    total = 0
+    while True:
+        ids = [r[0] for r in conn.execute(sql, params)]
+        if not ids:
+            break
+        _delete_insight_ids(conn, ids)
+        conn.commit()
+        total += len(ids)
+    return total
+
+
+def delete_sources(
+    conn: sqlite3.Connection,
+    *,
+    status: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    batch_size: int = 200,
+) -> int:
+    """按处理状态 / 发布时间范围分批删除来源及其文案、洞察（每批单独提交），返回删除来源数。"""
+    sql = "SELECT source_id FROM raw_sources WHERE 1 = 1"
+    params: list[Any] = []
+    if status is not None:
+        sql += " AND process_status = ?"
+        params.append(status)
+    if since_ts is not None:
+        sql += " AND publish_time >= ?"
+        params.append(since_ts)
+    if until_ts is not None:
+        sql += " AND publish_time <= ?"
+        params.append(until_ts)
+    sql += " LIMIT ?"
+    params.append(int(batch_size))
+
+    total = 0
+    while True:
+        source_ids = [r[0] for r in conn.execute(sql, params)]
+        if not source_ids:
+            break
+        placeholders = ",".join(["?"] * len(source_ids))
+        ids = [
+            r[0]
+            for r in conn.execute(
+                f"SELECT insight_id FROM tech_insights WHERE source_id IN ({placeholders})",
+                source_ids,
+            )
+        ]
+        _delete_insight_ids(conn, ids)
+        conn.execute(f"DELETE FROM analysis_runs WHERE source_id IN ({placeholders})", source_ids)
+        conn.execute(f"DELETE FROM source_texts WHERE source_id IN ({placeholders})", source_ids)
+        conn.execute(f"DELETE FROM raw_sources WHERE source_id IN ({placeholders})", source_ids)
+        conn.commit()
+        total += len(source_ids)
+    return total
+
+
+def _validate_insight_rows(
+    rows: Sequence[TechInsightRecord | TechInsightRow | dict[str, Any]],
+) -> list[TechInsightRecord | TechInsightRow]:
+    if all(isinstance(r, TechInsightRecord) for r in rows):
+        return list(rows)
+    from db_models import TechInsightRow
+
+    return [
+        r if isinstance(r, (TechInsightRecord, TechInsightRow)) else TechInsightRow.model_validate(r)
+        for r in rows
+    ]
+
+
+def _insert_insight_rows(conn: sqlite3.Connection, validated: Sequence[Any]) -> None:
+    """写入已校验的洞察并增量维护汇总表、近重复索引（不单独提交）。"""
+    if not validated:
+        return
+    # AUTOINCREMENT 保证新 insight_id 单调递增：用于圈定本次新增的行
+    prev_max_id = conn.execute(
+        "SELECT COALESCE(MAX(insight_id), 0) FROM tech_insights"
+    ).fetchone()[0]
+    project_ids: dict[str, Optional[int]] = {}
+    for r in validated:
+        name = r.project_name or ""
+        if name not in project_ids:
+            project_ids[name] = resolve_project_id(conn, name)
+    conn.executemany(
+        """
+        INSERT INTO tech_insights
+          (source_id, dimension, project_name, tech_node, evolution_tag, impact_score, summary,
+           canonical_project_id, prompt_hash, impact_signal)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                r.source_id,
+                r.dimension,
+                r.project_name,
+                r.tech_node,
+                r.evolution_tag,
+                int(r.impact_score),
+                r.summary,
+                project_ids[r.project_name or ""],
+                r.prompt_hash,
+                r.impact_signal,
+            )
+            for r in validated
+        ],
+    )
+    if any(r.raw_item is not None for r in validated):
+        # 同一连接、同一事务内按顺序插入，新 id 与 validated 一一对应
+        new_ids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT insight_id FROM tech_insights WHERE insight_id > ? ORDER BY insight_id",
+                (prev_max_id,),
+            )
+        ]
+        conn.executemany(
+            "INSERT INTO insight_raw_items (insight_id, item) VALUES (?, ?)",
+            [(i, r.raw_item) for i, r in zip(new_ids, validated) if r.raw_item is not None],
+        )
+    _apply_stats_insert_delta(conn, "i.insight_id > ?", (prev_max_id,))
+    _dedup_insights_after(conn, prev_max_id)
+
+
+def insert_tech_insights(
+    conn: sqlite3.Connection,
+    rows: Sequence[TechInsightRecord | TechInsightRow | dict[str, Any]],
+) -> None:
+    """TechInsightRecord / TechInsightRow 视为已校验，直接写入；dict 等外部输入走 pydantic 校验。"""
+    _insert_insight_rows(conn, _validate_insight_rows(rows))
+    conn.commit()
+
+
+def _insight_content_key(
+    dimension: Optional[str],
+    project_name: Optional[str],
+    tech_node: Optional[str],
+    evolution_tag: Optional[str],
+    impact_score: Any,
+    summary: Optional[str],
+    impact_signal: Optional[str],
+) -> tuple:
+    """
+    洞察的内容 key：决定汇总表、近重复签名、语义向量与脉络边的列全部相同才视为同一条。
+    prompt_hash / 原始条目不参与比较（换模板但产出相同时保留原 id，只更新这两项）。
+    """
+    return (
+        (dimension or "").strip(),
+        (project_name or "").strip(),
+        (tech_node or "").strip(),
+        (evolution_tag or "").strip(),
+        int(impact_score or 0),
+        (summary or "").strip(),
+        (impact_signal or "").strip(),
+    )
+
+
+def replace_insights(
+    conn: sqlite3.Connection,
+    source_id: str,
+    rows: Sequence[TechInsightRecord | TechInsightRow | dict[str, Any]],
+    status: PROCESS_STATUS = "analyzed",
+) -> dict[str, int]:
+    """
+    在一个事务内把某来源的洞察替换为 rows，并把来源状态置为 status：
+    按内容 key 与已有洞察做多重集合差分，相同的保留原 insight_id（脉络边、签名、向量不动），
+    只删除消失的、插入新出现的。返回 {"kept", "inserted", "deleted"}。
+    """
+    validated = _validate_insight_rows(rows)
+    existing: dict[tuple, list[sqlite3.Row]] = {}
+    for r in conn.execute(
+        """
+        SELECT i.insight_id, i.dimension, i.project_name, i.tech_node, i.evolution_tag,
+               i.impact_score, i.summary, i.impact_signal, i.prompt_hash, ri.item, ri.legacy
+        FROM tech_insights i
+        LEFT JOIN insight_raw_items ri ON ri.insight_id = i.insight_id
+        WHERE i.source_id = ?
+        ORDER BY i.insight_id
+        """,
+        (source_id,),
+    ):
+        key = _insight_content_key(
+            r["dimension"],
+            r["project_name"],
+            r["tech_node"],
+            r["evolution_tag"],
+            r["impact_score"],
+            r["summary"],
+            r["impact_signal"],
+        )
+        existing.setdefault(key, []).append(r)
+
+    to_insert: list[Any] = []
+    hash_updates: list[tuple[Optional[str], int]] = []
+    item_updates: list[tuple[int, str]] = []
+    for r in validated:
+        key = _insight_content_key(
+            r.dimension,
+            r.project_name,
+            r.tech_node,
+            r.evolution_tag,
+            r.impact_score,
+            r.summary,
+            r.impact_signal,
+        )
+        matches = existing.get(key)
+        if not matches:
+            to_insert.append(r)
+            continue
+        old = matches.pop(0)
+        if r.prompt_hash is not None and r.prompt_hash != old["prompt_hash"]:
+            hash_updates.append((r.prompt_hash, old["insight_id"]))
+        if r.raw_item is not None and (r.raw_item != old["item"] or old["legacy"]):
+            item_updates.append((old["insight_id"], r.raw_item))
+    stale = [old["insight_id"] for matches in existing.values() for old in matches]
+
+    _delete_insight_ids(conn, stale)
+    if hash_updates:
+        conn.executemany("UPDATE tech_insights SET prompt_hash = ? WHERE insight_id = ?", hash_updates)
+    if item_updates:
+        conn.executemany(
+            "INSERT OR REPLACE INTO insight_raw_items (insight_id, item, legacy) VALUES (?, ?, 0)",
+            item_updates,
+        )
+    _insert_insight_rows(conn, to_insert)
+    conn.execute(
+        "UPDATE raw_sources SET process_status = ?, updated_at = CURRENT_TIMESTAMP WHERE source_id = ?",
+        (status, source_id),
+    )
+    conn.commit()
+    return {
+        "kept": len(validated) - len(to_insert),
+        "inserted": len(to_insert),
+        "deleted": len(stale),
+    }
+
+
+# =========================
+# 提示词模板版本
+# =========================
+
+
+def register_prompt_template(
+    conn: sqlite3.Connection, prompt_hash: str, name: str, version: int, response_format: str
+) -> None:
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO prompt_templates (prompt_hash, name, version, response_format)
+        VALUES (?, ?, ?, ?)
+        """,
+        (prompt_hash, name, int(version), response_format),
+    )
+    conn.commit()
+
+
+def prompt_hash_stats(conn: sqlite3.Connection) -> list[dict[str, Any]]:
+    """各模板 hash 产出的洞察数 / 来源数（hash 为 NULL 表示模板登记之前的旧结果）。"""
+    return [
+        dict(r)
+        for r in conn.execute(
+            """
+            SELECT i.prompt_hash, t.name, t.version, t.response_format,
+                   COUNT(*) AS insights, COUNT(DISTINCT i.source_id) AS sources
+            FROM tech_insights i
+            LEFT JOIN prompt_templates t ON t.prompt_hash = i.prompt_hash
+            GROUP BY i.prompt_hash
+            ORDER BY insights DESC
+            """
+        )
+    ]
+
+
+def mark_stale_prompt_sources(
+    conn: sqlite3.Connection, current_hash: str, *, limit: Optional[int] = None
+) -> int:
+    """
+    把含有非当前模板（或无模板记录）洞察的已分析来源重置为 text_extracted，
+    下一次分析阶段只重跑这些来源。返回重置数量。
+    """
+    sql = """
+    UPDATE raw_sources
+    SET process_status = 'text_extracted', updated_at = CURRENT_TIMESTAMP
+    WHERE process_status = 'analyzed'
+      AND source_id IN (
+        SELECT DISTINCT source_id FROM tech_insights
+        WHERE prompt_hash IS NULL OR prompt_hash <> ?
+    """
+    params: list[Any] = [current_hash]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    cur = conn.execute(sql + ")", params)
+    conn.commit()
+    return cur.rowcount
+
+
+def insert_analysis_runs(conn: sqlite3.Connection, source_id: str, runs: Sequence[Any]) -> None:
+    """写入 router.TierRun（路由决策、模型、耗时、usage、估算费用），不提交，与状态更新同一事务。"""
+    conn.executemany(
+        """
+        INSERT INTO analysis_runs (
+            source_id, tier, model, reason, ai_hits, complexity, ok,
+            latency_ms, prompt_tokens, cached_tokens, completion_tokens, cost_usd
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                source_id,
+                r.tier,
+                r.model,
+                r.reason,
+                r.ai_hits,
+                r.complexity,
+                int(bool(r.ok)),
+                int(r.latency_ms),
+                int(r.prompt_tokens),
+                int(r.cached_tokens),
+                int(r.completion_tokens),
+                r.cost_usd,
+            )
+            for r in runs
+        ],
+    )
+
+
+def analysis_run_stats(conn: sqlite3.Connection, *, since: Optional[str] = None) -> list[dict[str, Any]]:
+    """按档位 / 模型汇总：调用次数、成功数、来源数、平均 / 最大延迟、token 与费用（since 为 created_at 下界）。"""
+    sql = """
+    SELECT tier, model, COUNT(*) AS runs, SUM(ok) AS ok, COUNT(DISTINCT source_id) AS sources,
+           CAST(AVG(latency_ms) AS INTEGER) AS avg_latency_ms, MAX(latency_ms) AS max_latency_ms,
+           SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+           SUM(cost_usd) AS cost_usd
+    FROM analysis_runs
+    """
+    params: list[Any] = []
+    if since is not None:
+        sql += " WHERE created_at >= ?"
+        params.append(since)
+    sql += " GROUP BY tier, model ORDER BY tier, model"
+    return [dict(r) for r in conn.execute(sql, params)]
+
+
+def list_boilerplate_phrases(conn: sqlite3.Connection) -> list[BoilerplatePhrase]:
+    return [
+        BoilerplatePhrase(r["phrase"], r["kind"], r["doc_freq"])
+        for r in conn.execute(
+            "SELECT phrase, kind, doc_freq FROM boilerplate_phrases ORDER BY kind, doc_freq DESC, phrase"
+        )
+    ]
+
+
+def add_boilerplate_phrase(conn: sqlite3.Connection, phrase: str, *, kind: str = "fragment") -> None:
+    conn.execute(
+        """
+        INSERT INTO boilerplate_phrases (phrase, kind) VALUES (?, ?)
+        ON CONFLICT(phrase) DO UPDATE SET kind = excluded.kind
+        """,
+        (phrase, kind),
+    )
+    conn.commit()
+
+
+def replace_learned_boilerplate(conn: sqlite3.Connection, phrases: dict[str, int]) -> None:
+    """整体替换学到的套话分句（手动添加的 fragment 保留）。"""
+    conn.execute("DELETE FROM boilerplate_phrases WHERE kind = 'sentence'")
+    conn.executemany(
+        "INSERT OR IGNORE INTO boilerplate_phrases (phrase, kind, doc_freq) VALUES (?, 'sentence', ?)",
+        list(phrases.items()),
+    )
+    conn.commit()
+
+
+# =========================
+# dimension_stats 汇总表维护
+# =========================
+
+STATS_GRANULARITIES = ("day", "week", "month")
+
+# 与 Python 侧 stats_bucket_for_ts 保持一致（均为本地时间）
+_STATS_BUCKET_SQL = {
+    "day": "date(s.publish_time, 'unixepoch', 'localtime')",
+    "week": "date(s.publish_time, 'unixepoch', 'localtime', 'weekday 0', '-6 days')",
+    "month": "date(s.publish_time, 'unixepoch', 'localtime', 'start of month')",
+}
+
+
+def stats_bucket_for_ts(ts: int, granularity: str) -> str:
+    """返回时间戳所在桶的起始日期（YYYY-MM-DD，本地时间）。"""
+    d = _dt.datetime.fromtimestamp(int(ts)).date()
+    if granularity == "week":
+        d = d - _dt.timedelta(days=d.weekday())
+    elif granularity == "month":
+        d = d.replace(day=1)
+    elif granularity != "day":
+        raise ValueError(f"不支持的 granularity：{granularity!r}")
+    return d.isoformat()
+
+
+def _stats_bucket_bounds(granularity: str, bucket: str) -> tuple[int, int]:
+    """桶对应的 [start_ts, end_ts) 区间，用于命中 idx_publish_time。"""
+    start = _dt.datetime.strptime(bucket, "%Y-%m-%d")
+    if granularity == "day":
+        end = start + _dt.timedelta(days=1)
+    elif granularity == "week":
+        end = start + _dt.timedelta(days=7)
+    else:
+        end = (start.replace(day=28) + _dt.timedelta(days=4)).replace(day=1)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _stats_touched_buckets(
+    conn: sqlite3.Connection, where_sql: str, params: Sequence[Any]
+) -> list[tuple[str, str, str]]:
+    touched: list[tuple[str, str, str]] = []
+    for g in STATS_GRANULARITIES:
+        rows = conn.execute(
+            f"""
+            SELECT DISTINCT {_STATS_BUCKET_SQL[g]} AS bucket, i.dimension
+            FROM tech_insights i
+            JOIN raw_sources s ON s.source_id = i.source_id
+            WHERE s.publish_time IS NOT NULL AND {where_sql}
+            """,
+            tuple(params),
+        ).fetchall()
+        touched.extend((g, r["bucket"], r["dimension"]) for r in rows)
+    return touched
+
+
+def _refresh_dimension_stats_row(
+    conn: sqlite3.Connection, granularity: str, bucket: str, dimension: str
+) -> None:
+    """由项目级汇总推导维度级汇总（代价为该桶内的项目数）。"""
+    conn.execute(
+        "DELETE FROM dimension_stats WHERE granularity = ? AND bucket = ? AND dimension = ?",
+        (granularity, bucket, dimension),
+    )
+    conn.execute(
+        """
+        INSERT INTO dimension_stats
+          (granularity, bucket, dimension, insight_count, impact_sum, impact_max, project_count)
+        SELECT granularity, bucket, dimension,
+               SUM(insight_count), SUM(impact_sum), MAX(impact_max),
+               SUM(CASE WHEN project_key <> '' THEN 1 ELSE 0 END)
+        FROM dimension_project_stats
+        WHERE granularity = ? AND bucket = ? AND dimension = ?
+        GROUP BY granularity, bucket, dimension
+        """,
+        (granularity, bucket, dimension),
+    )
+
+
+def _apply_stats_insert_delta(
+    conn: sqlite3.Connection, where_sql: str, params: Sequence[Any]
+) -> None:
+    """新增洞察：按增量累加到项目级汇总，再刷新受影响的维度级桶。"""
+    for g in STATS_GRANULARITIES:
+        conn.execute(
+            f"""
+            INSERT INTO dimension_project_stats
+              (granularity, bucket, dimension, project_key, project_name,
+               insight_count, impact_sum, impact_max)
+            SELECT ?, {_STATS_BUCKET_SQL[g]}, i.dimension, {_PROJECT_KEY_SQL},
+                   {_PROJECT_NAME_SQL}, COUNT(*), SUM(i.impact_score), MAX(i.impact_score)
+            FROM tech_insights i
+            JOIN raw_sources s ON s.source_id = i.source_id
+            LEFT JOIN projects p ON p.project_id = i.canonical_project_id
+            WHERE s.publish_time IS NOT NULL AND {where_sql}
+            GROUP BY 2, 3, 4
+            ON CONFLICT(granularity, bucket, dimension, project_key) DO UPDATE SET
+                insight_count = insight_count + excluded.insight_count,
+                impact_sum = impact_sum + excluded.impact_sum,
+                impact_max = MAX(impact_max, excluded.impact_max),
+                project_name = COALESCE(excluded.project_name, project_name)
+            """,
+            (g, *params),
+        )
+    for g, bucket, dimension in _stats_touched_buckets(conn, where_sql, params):
+        _refresh_dimension_stats_row(conn, g, bucket, dimension)
+
+
+def _recompute_stats_bucket(
+    conn: sqlite3.Connection, granularity: str, bucket: str, dimension: str
+) -> None:
+    """删除洞察后按桶重算（max 无法做减法，只重算受影响的桶）。"""
+    start_ts, end_ts = _stats_bucket_bounds(granularity, bucket)
+    conn.execute(
+        """
+        DELETE FROM dimension_project_stats
+        WHERE granularity = ? AND bucket = ? AND dimension = ?
+        """,
+        (granularity, bucket, dimension),
+    )
+    conn.execute(
+        f"""
+        INSERT INTO dimension_project_stats
+          (granularity, bucket, dimension, project_key, project_name,
+           insight_count, impact_sum, impact_max)
+        SELECT ?, ?, i.dimension, {_PROJECT_KEY_SQL},
+               {_PROJECT_NAME_SQL}, COUNT(*), SUM(i.impact_score), MAX(i.impact_score)
+        FROM raw_sources s
+        JOIN tech_insights i ON i.source_id = s.source_id
+        LEFT JOIN projects p ON p.project_id = i.canonical_project_id
+        WHERE s.publish_time >= ? AND s.publish_time < ?
+          AND {_STATS_BUCKET_SQL[granularity]} = ?
+          AND i.dimension = ?
+        GROUP BY 4
+        """,
+        (granularity, bucket, start_ts, end_ts, bucket, dimension),
+    )
+    _refresh_dimension_stats_row(conn, granularity, bucket, dimension)
+
+
+def rebuild_dimension_stats(conn: sqlite3.Connection) -> None:
+    """一次性全量重建 dimension_stats / dimension_project_stats。"""
+    conn.execute("DELETE FROM dimension_project_stats")
+    conn.execute("DELETE FROM dimension_stats")
+    for g in STATS_GRANULARITIES:
+        conn.execute(
+            f"""
+            INSERT INTO dimension_project_stats
+              (granularity, bucket, dimension, project_key, project_name,
+               insight_count, impact_sum, impact_max)
+            SELECT ?, {_STATS_BUCKET_SQL[g]}, i.dimension, {_PROJECT_KEY_SQL},
+                   {_PROJECT_NAME_SQL}, COUNT(*), SUM(i.impact_score), MAX(i.impact_score)
+            FROM tech_insights i
+            JOIN raw_sources s ON s.source_id = i.source_id
+            LEFT JOIN projects p ON p.project_id = i.canonical_project_id
+            WHERE s.publish_time IS NOT NULL
+            GROUP BY 2, 3, 4
+            """,
+            (g,),
+        )
+    conn.execute(
+        """
+        INSERT INTO dimension_stats
+          (granularity, bucket, dimension, insight_count, impact_sum, impact_max, project_count)
+        SELECT granularity, bucket, dimension,
+               SUM(insight_count), SUM(impact_sum), MAX(impact_max),
+               SUM(CASE WHEN project_key <> '' THEN 1 ELSE 0 END)
+        FROM dimension_project_stats
+        GROUP BY granularity, bucket, dimension
+        """
+    )
+    conn.commit()
+
+
+# =========================
+# 项目实体：归一化 / 别名 / 模糊匹配
+# =========================
+
+
+def resolve_project_id(
+    conn: sqlite3.Connection,
+    project_name: Optional[str],
+    *,
+    create: bool = True,
+) -> Optional[int]:
+    """
+    把自由文本项目名解析为 projects.project_id：
+    1) 归一化 key（含别名词典）精确命中 project_aliases 主键
+    2) 同分块内模糊匹配（版本号必须一致），命中则记为新别名
+    3) 都没命中且 create=True 时新建项目
+    不单独提交，由调用方所在事务提交。
+    """
+    key, canonical = pn.normalize_project_name(project_name or "")
+    if not key:
+        return None
+
+    row = conn.execute(
+        "SELECT project_id FROM project_aliases WHERE alias_key = ?", (key,)
+    ).fetchone()
+    if row is not None:
+        return int(row["project_id"])
+
+    block = pn.block_key(key)
+    best_id: Optional[int] = None
+    best_ratio = 0.0
+    for cand in conn.execute(
+        "SELECT alias_key, project_id FROM project_aliases WHERE block_key = ?", (block,)
+    ):
+        ratio = pn.fuzzy_ratio(key, cand["alias_key"])
+        if ratio > best_ratio:
+            best_id, best_ratio = int(cand["project_id"]), ratio
+    if best_id is not None and best_ratio >= pn.FUZZY_MIN_RATIO:
+        if create:
+            _insert_project_alias(conn, key, best_id, project_name, block)
+        return best_id
+
+    if not create:
+        return None
+    cur = conn.execute(
+        "INSERT INTO projects (canonical_name, canonical_key) VALUES (?, ?)",
+        (canonical or (project_name or "").strip(), key),
+    )
+    project_id = int(cur.lastrowid)
+    _insert_project_alias(conn, key, project_id, project_name, block)
+    return project_id
+
+
+def _insert_project_alias(
+    conn: sqlite3.Connection,
+    alias_key: str,
+    project_id: int,
+    alias: Optional[str],
+    block: str,
+) -> None:
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO project_aliases (alias_key, project_id, alias, block_key)
+        VALUES (?, ?, ?, ?)
+        """,
+        (alias_key, project_id, (alias or "").strip(), block),
+    )
 
-class VideoMeta(BaseModel):
-    """写入 videos 表的元数据（不包含分析结果）。"""
 
-    model_config = ConfigDict(extra="forbid")
+def list_project_aliases(conn: sqlite3.Connection, project_id: int) -> list[str]:
+    return [
+        r["alias"]
+        for r in conn.execute(
+            "SELECT alias FROM project_aliases WHERE project_id = ? ORDER BY alias", (project_id,)
+        )
+    ]
 
-    video_id: str = Field(..., description="对应 aweme_id")
-    title: Optional[str] = None
-    create_time: int
-    video_url: str
-    content_text: Optional[str] = None
-    process_status: PROCESS_STATUS = "pending"
-    is_top: int = 0
 
+def backfill_canonical_projects(conn: sqlite3.Connection) -> int:
+    """为尚未归一化的历史洞察补 canonical_project_id，返回更新行数（不单独提交）。"""
+    rows = conn.execute(
+        """
+        SELECT insight_id, project_name FROM tech_insights
+        WHERE canonical_project_id IS NULL
+          AND project_name IS NOT NULL AND TRIM(project_name) <> ''
+        """
+    ).fetchall()
+    if not rows:
+        return 0
+    cache: dict[str, Optional[int]] = {}
+    updates: list[tuple[Optional[int], int]] = []
+    for r in rows:
+        name = r["project_name"]
+        if name not in cache:
+            cache[name] = resolve_project_id(conn, name)
+        if cache[name] is not None:
+            updates.append((cache[name], r["insight_id"]))
+    conn.executemany(
+        "UPDATE tech_insights SET canonical_project_id = ? WHERE insight_id = ?", updates
+    )
+    return len(updates)
 
-class AiSkillRow(BaseModel):
-    model_config = ConfigDict(extra="forbid")
 
-    video_id: str
-    tech_dimension: str
-    key_info: str
-    summary: str
+# =========================
+# 近重复检测：MinHash / LSH（算法见 dedup.py）
+# =========================
 
 
-class RawSourceMeta(BaseModel):
-    """写入 raw_sources 表的元数据（对应阶段 1/2）。"""
+def _index_and_mark_duplicate(conn: sqlite3.Connection, row: sqlite3.Row) -> Optional[int]:
+    """
+    为一条洞察写入签名与 LSH 分段；若与已索引的同维度洞察估计 Jaccard >= DUP_THRESHOLD，
+    把它标记为重复（duplicate_of 指向对方所在组的保留条目），返回该保留条目 id。
+    """
+    import dedup
 
-    model_config = ConfigDict(extra="forbid")
+    sig = dedup.insight_signature(row["tech_node"], row["summary"])
+    if sig is None:
+        return None
+    keys = dedup.band_keys(sig, row["dimension"])
+    placeholders = ",".join(["?"] * len(keys))
+    candidates = conn.execute(
+        f"""
+        SELECT m.insight_id, m.signature, i.duplicate_of
+        FROM (SELECT DISTINCT insight_id FROM insight_lsh WHERE band_key IN ({placeholders})) c
+        JOIN insight_minhash m ON m.insight_id = c.insight_id
+        JOIN tech_insights i ON i.insight_id = c.insight_id
+        """,
+        keys,
+    ).fetchall()
 
-    source_id: str
-    title: Optional[str] = None
-    publish_time: int
-    source_url: str
-    content_text: Optional[str] = None
-    process_status: PROCESS_STATUS = "pending"
-    is_top: int = 0
+    best_root: Optional[int] = None
+    best_sim = 0.0
+    for c in candidates:
+        sim = dedup.estimate_jaccard(sig, dedup.unpack_signature(c["signature"]))
+        if sim > best_sim:
+            best_sim = sim
+            best_root = c["duplicate_of"] if c["duplicate_of"] is not None else c["insight_id"]
 
+    insight_id = row["insight_id"]
+    conn.execute(
+        "INSERT OR REPLACE INTO insight_minhash (insight_id, signature) VALUES (?, ?)",
+        (insight_id, dedup.pack_signature(sig)),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO insight_lsh (band_key, insight_id) VALUES (?, ?)",
+        [(k, insight_id) for k in keys],
+    )
+    if best_root is not None and best_sim >= dedup.DUP_THRESHOLD:
+        conn.execute(
+            "UPDATE tech_insights SET duplicate_of = ? WHERE insight_id = ?",
+            (best_root, insight_id),
+        )
+        return best_root
+    return None
 
-class TechInsightRow(BaseModel):
-    """写入 tech_insights 表的结构化洞察（对应阶段 3）。"""
 
-    model_config = ConfigDict(extra="forbid")
+def _dedup_insights_after(conn: sqlite3.Connection, prev_max_id: int) -> int:
+    rows = conn.execute(
+        """
+        SELECT insight_id, dimension, tech_node, summary FROM tech_insights
+        WHERE insight_id > ? ORDER BY insight_id
+        """,
+        (prev_max_id,),
+    ).fetchall()
+    return sum(1 for r in rows if _index_and_mark_duplicate(conn, r) is not None)
 
-    source_id: str
-    dimension: str
-    project_name: Optional[str] = None
-    tech_node: Optional[str] = None
-    evolution_tag: Optional[str] = None
-    impact_score: int = 1
-    summary: Optional[str] = None
 
+def _forget_duplicates(conn: sqlite3.Connection) -> None:
+    """
+    删除 temp._delete_ids 中的洞察前：移除其签名/分段；若某条是组的保留条目，
+    把组内（不在本次删除范围内的）最早一条提升为新的保留条目，其余改指向它。
+    """
+    conn.execute(f"DELETE FROM insight_lsh WHERE insight_id IN ({_DELETE_IDS_SQL})")
+    conn.execute(f"DELETE FROM insight_minhash WHERE insight_id IN ({_DELETE_IDS_SQL})")
+    roots = [
+        r[0]
+        for r in conn.execute(
+            f"""
+            SELECT DISTINCT duplicate_of FROM tech_insights
+            WHERE duplicate_of IN ({_DELETE_IDS_SQL})
+            """
+        )
+    ]
+    for insight_id in roots:
+        members = [
+            r[0]
+            for r in conn.execute(
+                f"""
+                SELECT insight_id FROM tech_insights
+                WHERE duplicate_of = ? AND insight_id NOT IN ({_DELETE_IDS_SQL})
+                ORDER BY insight_id
+                """,
+                (insight_id,),
+            )
+        ]
+        if not members:
+            continue
+        new_root = members[0]
+        conn.execute(
+            "UPDATE tech_insights SET duplicate_of = NULL WHERE insight_id = ?", (new_root,)
+        )
+        conn.execute(
+            "UPDATE tech_insights SET duplicate_of = ? WHERE duplicate_of = ?",
+            (new_root, insight_id),
+        )
 
-def connect(db_path: str | Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
 
+def dedup_existing_insights(
+    conn: sqlite3.Connection,
+    *,
+    rebuild: bool = False,
+    chunk_size: int = 1000,
+) -> dict[str, int]:
+    """
+    批量回填：按 insight_id 顺序为尚无签名的洞察建索引并标记重复（分块提交）。
+    rebuild=True 时先清空签名、分段与全部 duplicate_of。
+    """
+    if rebuild:
+        conn.execute("DELETE FROM insight_lsh")
+        conn.execute("DELETE FROM insight_minhash")
+        conn.execute("UPDATE tech_insights SET duplicate_of = NULL WHERE duplicate_of IS NOT NULL")
+        conn.commit()
 
-def init_db(conn: sqlite3.Connection) -> None:
-    conn.executescript(SCHEMA_SQL)
-    conn.commit()
+    indexed = 0
+    duplicates = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT i.insight_id, i.dimension, i.tech_node, i.summary
+            FROM tech_insights i
+            LEFT JOIN insight_minhash m ON m.insight_id = i.insight_id
+            WHERE i.insight_id > ? AND m.insight_id IS NULL
+            ORDER BY i.insight_id
+            LIMIT ?
+            """,
+            (last_id, int(chunk_size)),
+        ).fetchall()
+        if not rows:
+            break
+        for r in rows:
+            if _index_and_mark_duplicate(conn, r) is not None:
+                duplicates += 1
+        indexed += len(rows)
+        last_id = rows[-1]["insight_id"]
+        conn.commit()
+    return {"indexed": indexed, "duplicates": duplicates}
 
 
 # =========================
-# 新版：raw_sources / tech_insights
+# sources：多账号抓取登记
 # =========================
 
-
-def get_max_publish_time(conn: sqlite3.Connection) -> Optional[int]:
-    row = conn.execute("SELECT MAX(publish_time) AS max_time FROM raw_sources").fetchone()
-    if not row:
-        return None
-    max_time = row["max_time"]
-    return int(max_time) if max_time is not None else None
-
-
-def source_exists(conn: sqlite3.Connection, source_id: str) -> bool:
-    row = conn.execute(
-        "SELECT 1 FROM raw_sources WHERE source_id = ? LIMIT 1",
-        (source_id,),
-    ).fetchone()
-    return row is not None
+_FEED_COLUMNS = "feed_id, name, input_url, poll_interval_s, rate_limit_per_min, top_n, last_polled_at"
 
 
-def upsert_raw_source_meta(conn: sqlite3.Connection, source: RawSourceMeta) -> None:
-    """
-    如果 source_id 已存在则更新（含 is_top），否则插入。
-    注意：updated_at 会被刷新为 CURRENT_TIMESTAMP。
-    """
-    source = RawSourceMeta.model_validate(source)
+def add_feed(
+    conn: sqlite3.Connection,
+    name: str,
+    input_url: str,
+    *,
+    poll_interval_s: int = 3600,
+    rate_limit_per_min: float = 30,
+    top_n: int = 3,
+) -> int:
+    """登记（或按 name 更新）一个账号入口，返回 feed_id。"""
     conn.execute(
         """
-        INSERT INTO raw_sources (source_id, title, publish_time, source_url, content_text, process_status, is_top)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(source_id) DO UPDATE SET
-            title = excluded.title,
-            publish_time = excluded.publish_time,
-            source_url = excluded.source_url,
-            content_text = COALESCE(excluded.content_text, raw_sources.content_text),
-            process_status = COALESCE(excluded.process_status, raw_sources.process_status),
-            is_top = excluded.is_top,
-            updated_at = CURRENT_TIMESTAMP
+        INSERT INTO sources (name, input_url, poll_interval_s, rate_limit_per_min, top_n)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            input_url = excluded.input_url,
+            poll_interval_s = excluded.poll_interval_s,
+            rate_limit_per_min = excluded.rate_limit_per_min,
+            top_n = excluded.top_n
         """,
-        (
-            source.source_id,
-            source.title,
-            source.publish_time,
-            source.source_url,
-            source.content_text,
-            source.process_status,
-            int(source.is_top),
-        ),
+        (name, input_url, int(poll_interval_s), float(rate_limit_per_min), int(top_n)),
     )
     conn.commit()
+    return int(conn.execute("SELECT feed_id FROM sources WHERE name = ?", (name,)).fetchone()[0])
 
 
-def update_source_is_top(conn: sqlite3.Connection, source_id: str, is_top: int) -> None:
-    conn.execute(
-        "UPDATE raw_sources SET is_top = ?, updated_at = CURRENT_TIMESTAMP WHERE source_id = ?",
-        (int(is_top), source_id),
-    )
+def set_feed_enabled(conn: sqlite3.Connection, name: str, enabled: bool) -> bool:
+    cur = conn.execute("UPDATE sources SET enabled = ? WHERE name = ?", (int(enabled), name))
     conn.commit()
+    return cur.rowcount > 0
+
+
+def list_feeds(conn: sqlite3.Connection, *, enabled_only: bool = True) -> list[FeedSource]:
+    sql = f"SELECT {_FEED_COLUMNS} FROM sources"
+    if enabled_only:
+        sql += " WHERE enabled = 1"
+    return [FeedSource(*r) for r in conn.execute(sql + " ORDER BY feed_id")]
+
+
+def list_due_feeds(conn: sqlite3.Connection, now_ts: int) -> list[FeedSource]:
+    """已启用、且距上次轮询已超过 poll_interval_s 的账号（从未轮询的优先）。"""
+    return [
+        FeedSource(*r)
+        for r in conn.execute(
+            f"""
+            SELECT {_FEED_COLUMNS} FROM sources
+            WHERE enabled = 1
+              AND (last_polled_at IS NULL OR last_polled_at + poll_interval_s <= ?)
+            ORDER BY COALESCE(last_polled_at, 0), feed_id
+            """,
+            (int(now_ts),),
+        )
+    ]
 
 
-def update_source_content(
-    conn: sqlite3.Connection,
-    source_id: str,
-    content_text: str,
-    status: PROCESS_STATUS = "text_extracted",
+def mark_feed_polled(
+    conn: sqlite3.Connection, feed_id: int, polled_at: int, error: Optional[str] = None
 ) -> None:
     conn.execute(
-        """
-        UPDATE raw_sources
-        SET content_text = ?, process_status = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE source_id = ?
-        """,
-        (content_text, status, source_id),
+        "UPDATE sources SET last_polled_at = ?, last_error = ? WHERE feed_id = ?",
+        (int(polled_at), error, int(feed_id)),
     )
     conn.commit()
 
 
-def update_source_status(
-    conn: sqlite3.Connection,
-    source_id: str,
-    status: PROCESS_STATUS,
-) -> None:
-    conn.execute(
-        "UPDATE raw_sources SET process_status = ?, updated_at = CURRENT_TIMESTAMP WHERE source_id = ?",
-        (status, source_id),
-    )
-    conn.commit()
+# =========================
+# pipeline_state 键值状态
+# =========================
 
 
-def clear_is_top_except_sources(conn: sqlite3.Connection, keep_source_ids: Sequence[str]) -> None:
-    keep = [sid for sid in keep_source_ids if sid]
-    if not keep:
-        conn.execute(
-            "UPDATE raw_sources SET is_top = 0, updated_at = CURRENT_TIMESTAMP WHERE is_top = 1"
-        )
-        conn.commit()
-        return
+def get_state(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM pipeline_state WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
 
-    placeholders = ",".join(["?"] * len(keep))
+
+def set_state(conn: sqlite3.Connection, key: str, value: str) -> None:
+    """写入状态（不单独提交，由调用方所在事务提交）。"""
     conn.execute(
-        f"""
-        UPDATE raw_sources
-        SET is_top = 0, updated_at = CURRENT_TIMESTAMP
-        WHERE is_top = 1 AND source_id NOT IN ({placeholders})
+        """
+        INSERT INTO pipeline_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
         """,
-        tuple(keep),
+        (key, value),
+    )
+
+
+def add_state_counters(conn: sqlite3.Connection, prefix: str, deltas: dict[str, int]) -> None:
+    """把计数累加到 pipeline_state（键为 prefix + 名称），并提交。"""
+    conn.executemany(
+        """
+        INSERT INTO pipeline_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            value = CAST(pipeline_state.value AS INTEGER) + CAST(excluded.value AS INTEGER),
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        [(prefix + k, str(int(v))) for k, v in deltas.items() if v],
     )
     conn.commit()
 
 
-def list_sources_needing_text(
-    conn: sqlite3.Connection,
-    min_publish_time_exclusive: Optional[int] = None,
-    limit: int = 100,
-) -> list[sqlite3.Row]:
+# =========================
+# insight_links：技术脉络图
+# =========================
+
+_LINK_WATERMARK_KEY = "links.max_insight_id"
+
+
+def _sync_project_chain(conn: sqlite3.Connection, project_id: int) -> int:
     """
-    阶段 2：文案提取
-    - content_text 为空 或 process_status = 'pending'
-    - 排除 analyzed/error，避免死循环
+    让某个项目的 same_project 链与时间顺序一致：按 (publish_time, insight_id) 排序，
+    相邻两条之间连一条边。只增删有差异的边，返回变更的边数。
     """
-    if min_publish_time_exclusive is None:
-        return conn.execute(
+    ids = [
+        r[0]
+        for r in conn.execute(
+            f"""
+            SELECT i.insight_id
+            FROM tech_insights i
+            LEFT JOIN raw_sources s ON s.source_id = i.source_id
+            WHERE i.canonical_project_id = ?
+            ORDER BY COALESCE(s.publish_time, 0) ASC, i.insight_id ASC
+            """,
+            (project_id,),
+        )
+    ]
+    desired = set(zip(ids, ids[1:]))
+    existing = {
+        (r[1], r[2]): r[0]
+        for r in conn.execute(
+            f"""
+            SELECT l.link_id, l.parent_insight_id, l.child_insight_id
+            FROM tech_insights i
+            JOIN insight_links l ON l.child_insight_id = i.insight_id
+            WHERE i.canonical_project_id = ? AND l.relation_type = ?
+            """,
+            (project_id, LINK_SAME_PROJECT),
+        )
+    }
+    stale = [(link_id,) for edge, link_id in existing.items() if edge not in desired]
+    fresh = [(p, c, LINK_SAME_PROJECT) for p, c in desired if (p, c) not in existing]
+    if stale:
+        conn.executemany("DELETE FROM insight_links WHERE link_id = ?", stale)
+    if fresh:
+        conn.executemany(
             """
-            SELECT * FROM raw_sources
-            WHERE (content_text IS NULL OR TRIM(content_text) = '' OR process_status = 'pending')
-              AND process_status NOT IN ('analyzed', 'error')
-            ORDER BY publish_time DESC
-            LIMIT ?
+            INSERT OR IGNORE INTO insight_links (parent_insight_id, child_insight_id, relation_type)
+            VALUES (?, ?, ?)
             """,
-            (limit,),
-        ).fetchall()
+            fresh,
+        )
+    return len(stale) + len(fresh)
 
-    return conn.execute(
-        """
-        SELECT * FROM raw_sources
-        WHERE (content_text IS NULL OR TRIM(content_text) = '' OR process_status = 'pending')
-          AND process_status NOT IN ('analyzed', 'error')
-          AND publish_time > ?
-        ORDER BY publish_time DESC
-        LIMIT ?
-        """,
-        (min_publish_time_exclusive, limit),
-    ).fetchall()
 
+def _char_bigrams(text: str) -> set[str]:
+    t = "".join((text or "").lower().split())
+    if len(t) < 2:
+        return {t} if t else set()
+    return {t[k : k + 2] for k in range(len(t) - 1)}
 
-def list_sources_needing_analysis(
+
+def _link_similar_nodes(
     conn: sqlite3.Connection,
-    min_publish_time_exclusive: Optional[int] = None,
-    limit: int = 100,
-) -> list[sqlite3.Row]:
+    new_ids: Sequence[int],
+    *,
+    threshold: float,
+    window: int = 200,
+) -> int:
     """
-    阶段 3：LLM 分析
-    默认分析 text_extracted；可通过 min_publish_time_exclusive 只分析“新增”来源。
+    为新洞察在同维度、更早的最近 window 条里找 tech_node 最相似（字符 bigram Jaccard）
+    且属于不同项目的一条，相似度 >= threshold 时连 similar_node 边。
     """
-    if min_publish_time_exclusive is None:
-        return conn.execute(
-            """
-            SELECT * FROM raw_sources
-            WHERE process_status = 'text_extracted'
-            ORDER BY publish_time DESC
+    created = 0
+    for insight_id in new_ids:
+        me = conn.execute(
+            f"""
+            SELECT i.insight_id, i.dimension, i.tech_node, i.canonical_project_id,
+                   COALESCE(s.publish_time, 0) AS publish_time
+            FROM tech_insights i
+            LEFT JOIN raw_sources s ON s.source_id = i.source_id
+            WHERE i.insight_id = ?
+            """,
+            (insight_id,),
+        ).fetchone()
+        if me is None or not (me["tech_node"] or "").strip():
+            continue
+        grams = _char_bigrams(me["tech_node"])
+        candidates = conn.execute(
+            f"""
+            SELECT i.insight_id, i.tech_node
+            FROM tech_insights i
+            JOIN raw_sources s ON s.source_id = i.source_id
+            WHERE i.dimension = ?
+              AND i.canonical_project_id IS NOT ?
+              AND (s.publish_time < ? OR (s.publish_time = ? AND i.insight_id < ?))
+            ORDER BY s.publish_time DESC, i.insight_id DESC
             LIMIT ?
             """,
-            (limit,),
+            (
+                me["dimension"],
+                me["canonical_project_id"],
+                me["publish_time"],
+                me["publish_time"],
+                insight_id,
+                int(window),
+            ),
         ).fetchall()
 
-    return conn.execute(
-        """
-        SELECT * FROM raw_sources
-        WHERE process_status = 'text_extracted'
-          AND publish_time > ?
-        ORDER BY publish_time DESC
-        LIMIT ?
+        best_id: Optional[int] = None
+        best_sim = 0.0
+        for c in candidates:
+            other = _char_bigrams(c["tech_node"])
+            if not other:
+                continue
+            sim = len(grams & other) / len(grams | other)
+            if sim > best_sim:
+                best_id, best_sim = c["insight_id"], sim
+        if best_id is not None and best_sim >= threshold:
+            cur = conn.execute(
+                """
+                INSERT OR IGNORE INTO insight_links (parent_insight_id, child_insight_id, relation_type)
+                VALUES (?, ?, ?)
+                """,
+                (best_id, insight_id, LINK_SIMILAR_NODE),
+            )
+            created += cur.rowcount
+    return created
+
+
+def link_new_insights(
+    conn: sqlite3.Connection,
+    *,
+    similar_threshold: Optional[float] = None,
+) -> dict[str, int]:
+    """
+    脉络链接阶段（增量）：只处理上次水位之后新增的洞察。
+    - 同一归一化 project_name 的洞察按时间串成 same_project 链（补录旧数据会自动插入链中间）
+    - similar_threshold 不为空时，额外按 tech_node 相似度连 similar_node 边
+    """
+    watermark = int(get_state(conn, _LINK_WATERMARK_KEY) or 0)
+    new_rows = conn.execute(
+        f"""
+        SELECT insight_id, canonical_project_id
+        FROM tech_insights
+        WHERE insight_id > ?
+        ORDER BY insight_id
         """,
-        (min_publish_time_exclusive, limit),
+        (watermark,),
     ).fetchall()
+    if not new_rows:
+        return {"new_insights": 0, "projects": 0, "changed_links": 0, "similar_links": 0}
 
+    project_ids = sorted(
+        {r["canonical_project_id"] for r in new_rows if r["canonical_project_id"] is not None}
+    )
+    changed = 0
+    for project_id in project_ids:
+        changed += _sync_project_chain(conn, project_id)
+
+    similar = 0
+    if similar_threshold is not None:
+        similar = _link_similar_nodes(
+            conn,
+            [r["insight_id"] for r in new_rows],
+            threshold=float(similar_threshold),
+        )
 
-def delete_tech_insights_for_source(conn: sqlite3.Connection, source_id: str) -> None:
-    conn.execute("DELETE FROM tech_insights WHERE source_id = ?", (source_id,))
+    set_state(conn, _LINK_WATERMARK_KEY, str(new_rows[-1]["insight_id"]))
     conn.commit()
+    return {
+        "new_insights": len(new_rows),
+        "projects": len(project_ids),
+        "changed_links": changed,
+        "similar_links": similar,
+    }
 
 
-def insert_tech_insights(conn: sqlite3.Connection, rows: Sequence[TechInsightRow]) -> None:
-    validated = [TechInsightRow.model_validate(r) for r in rows]
-    conn.executemany(
+def relink_all_projects(conn: sqlite3.Connection) -> int:
+    """按当前 canonical_project_id 重新校正全部 same_project 链（只改有差异的边）。"""
+    conn.execute(
         """
-        INSERT INTO tech_insights
-          (source_id, dimension, project_name, tech_node, evolution_tag, impact_score, summary)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        DELETE FROM insight_links
+        WHERE relation_type = ?
+          AND child_insight_id IN (
+              SELECT insight_id FROM tech_insights WHERE canonical_project_id IS NULL
+          )
         """,
-        [
-            (
-                r.source_id,
-                r.dimension,
-                r.project_name,
-                r.tech_node,
-                r.evolution_tag,
-                int(r.impact_score),
-                r.summary,
-            )
-            for r in validated
-        ],
+        (LINK_SAME_PROJECT,),
     )
-    conn.commit()
+    changed = 0
+    for (project_id,) in conn.execute(
+        "SELECT DISTINCT canonical_project_id FROM tech_insights WHERE canonical_project_id IS NOT NULL"
+    ).fetchall():
+        changed += _sync_project_chain(conn, project_id)
+    return changed
+
+
+_GRAPH_NODE_COLUMNS = """
+    i.insight_id, i.source_id, i.dimension, i.project_name, i.tech_node,
+    i.evolution_tag, i.impact_score, i.summary, s.publish_time, s.source_url
+"""
+
+
+def _walk_links(
+    conn: sqlite3.Connection,
+    insight_id: int,
+    *,
+    direction: Literal["up", "down"],
+    relation_type: Optional[str],
+    max_depth: int,
+) -> list[sqlite3.Row]:
+    if direction == "up":
+        start_col, next_col = "child_insight_id", "parent_insight_id"
+    else:
+        start_col, next_col = "parent_insight_id", "child_insight_id"
+    rel_sql = "" if relation_type is None else "AND l.relation_type = :rel"
+    return conn.execute(
+        f"""
+        WITH RECURSIVE walk(insight_id, depth, relation_type) AS (
+            SELECT l.{next_col}, 1, l.relation_type
+            FROM insight_links l
+            WHERE l.{start_col} = :start {rel_sql}
+            UNION
+            SELECT l.{next_col}, w.depth + 1, l.relation_type
+            FROM walk w
+            JOIN insight_links l ON l.{start_col} = w.insight_id
+            WHERE w.depth < :max_depth {rel_sql}
+        )
+        SELECT w.depth, w.relation_type, {_GRAPH_NODE_COLUMNS}
+        FROM (
+            SELECT insight_id, MIN(depth) AS depth, MIN(relation_type) AS relation_type
+            FROM walk GROUP BY insight_id
+        ) w
+        JOIN tech_insights i ON i.insight_id = w.insight_id
+        LEFT JOIN raw_sources s ON s.source_id = i.source_id
+        ORDER BY w.depth ASC, i.insight_id ASC
+        """,
+        {"start": int(insight_id), "rel": relation_type, "max_depth": int(max_depth)},
+    ).fetchall()
+
+
+def get_insight_ancestors(
+    conn: sqlite3.Connection,
+    insight_id: int,
+    *,
+    relation_type: Optional[str] = None,
+    max_depth: int = 1000,
+) -> list[sqlite3.Row]:
+    """沿 parent 方向回溯（depth=1 为直接前驱）。"""
+    return _walk_links(
+        conn, insight_id, direction="up", relation_type=relation_type, max_depth=max_depth
+    )
+
+
+def get_insight_descendants(
+    conn: sqlite3.Connection,
+    insight_id: int,
+    *,
+    relation_type: Optional[str] = None,
+    max_depth: int = 1000,
+) -> list[sqlite3.Row]:
+    """沿 child 方向展开（depth=1 为直接后继）。"""
+    return _walk_links(
+        conn, insight_id, direction="down", relation_type=relation_type, max_depth=max_depth
+    )
+
+
+def get_project_chain(conn: sqlite3.Connection, project_name: str) -> list[sqlite3.Row]:
+    """
+    某项目的完整进化链：从链首（无 same_project 父节点）出发，沿 same_project 边递归展开。
+    project_name 可以是任意别名写法。
+    """
+    project_id = resolve_project_id(conn, project_name, create=False)
+    if project_id is None:
+        return []
+    return conn.execute(
+        f"""
+        WITH RECURSIVE chain(insight_id, depth) AS (
+            SELECT i.insight_id, 0
+            FROM tech_insights i
+            WHERE i.canonical_project_id = :pid
+              AND NOT EXISTS (
+                  SELECT 1 FROM insight_links l
+                  WHERE l.child_insight_id = i.insight_id AND l.relation_type = :rel
+              )
+            UNION
+            SELECT l.child_insight_id, c.depth + 1
+            FROM chain c
+            JOIN insight_links l ON l.parent_insight_id = c.insight_id AND l.relation_type = :rel
+        )
+        SELECT c.depth, {_GRAPH_NODE_COLUMNS}
+        FROM chain c
+        JOIN tech_insights i ON i.insight_id = c.insight_id
+        LEFT JOIN raw_sources s ON s.source_id = i.source_id
+        ORDER BY COALESCE(s.publish_time, 0) ASC, i.insight_id ASC
+        """,
+        {"pid": project_id, "rel": LINK_SAME_PROJECT},
+    ).fetchall()
 
 
 def get_max_create_time(conn: sqlite3.Connection) -> Optional[int]:
@@ -376,6 +2079,8 @@ def upsert_video_meta(conn: sqlite3.Connection, video: VideoMeta) -> None:
     如果 video_id 已存在则更新（含 is_top），否则插入。
     注意：updated_at 会被刷新为 CURRENT_TIMESTAMP。
     """
+    from db_models import VideoMeta
+
     video = VideoMeta.model_validate(video)
     conn.execute(
         """
@@ -530,6 +2235,8 @@ def list_videos_needing_analysis(
 
 
 def insert_ai_skill(conn: sqlite3.Connection, row: AiSkillRow) -> None:
+    from db_models import AiSkillRow
+
     row = AiSkillRow.model_validate(row)
     conn.execute(
         """
@@ -548,6 +2255,8 @@ def insert_ai_skills_for_video(
     key_info: str,
     summary: str,
 ) -> None:
+    from db_models import AiSkillRow
+
     rows = [
         AiSkillRow(
             video_id=video_id,
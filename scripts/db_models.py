@@ -0,0 +1,69 @@
+"""
+写库前的 pydantic 校验模型（外部输入边界）。
+
+database 只在校验 dict 等外部输入时才导入本模块，查询脚本启动不加载 pydantic；
+内部已校验的数据走 database.RawSourceRecord / TechInsightRecord。
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from database import PROCESS_STATUS
+
+
+class VideoMeta(BaseModel):
+    """写入 videos 表的元数据（不包含分析结果）。"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    video_id: str = Field(..., description="对应 aweme_id")
+    title: Optional[str] = None
+    create_time: int
+    video_url: str
+    content_text: Optional[str] = None
+    process_status: PROCESS_STATUS = "pending"
+    is_top: int = 0
+
+
+class AiSkillRow(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    video_id: str
+    tech_dimension: str
+    key_info: str
+    summary: str
+
+
+class RawSourceMeta(BaseModel):
+    """写入 raw_sources 表的元数据（对应阶段 1/2）。"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    source_id: str
+    title: Optional[str] = None
+    publish_time: int
+    source_url: str
+    content_text: Optional[str] = None
+    process_status: PROCESS_STATUS = "pending"
+    is_top: int = 0
+    feed_id: Optional[int] = None
+
+
+class TechInsightRow(BaseModel):
+    """写入 tech_insights 表的结构化洞察（对应阶段 3）。"""
+
+    model_config = ConfigDict(extra="forbid")
+
+    source_id: str
+    dimension: str
+    project_name: Optional[str] = None
+    tech_node: Optional[str] = None
+    evolution_tag: Optional[str] = None
+    impact_score: int = 1
+    summary: Optional[str] = None
+    prompt_hash: Optional[str] = None
+    impact_signal: Optional[str] = None
+    raw_item: Optional[str] = None
@@ -0,0 +1,223 @@
+"""
+专用写库线程（组提交）：
+
+- 持有独立连接，消费写操作队列；任意阶段用 submit(fn, *args) 提交，fn 以 fn(conn, *args) 在写线程执行
+- 取到第一个操作后最多再等 interval_ms，把期间到达的操作放进同一个事务（BEGIN IMMEDIATE ... COMMIT）；
+  database.py 中各函数自带的 conn.commit() 在批内被推迟，由写线程统一提交
+- 每个操作包在 SAVEPOINT 中：单个操作失败只回滚它自己，不影响同批其它操作
+- on_commit 在该操作所在的事务提交成功后（写线程内）调用，outbox 用它确认条目已落库
+- flush() 等待此前提交的操作全部落库（阶段之间、重新查询待处理列表之前调用，避免读到旧状态）
+- stats() / queue_depth 提供队列深度、提交次数、提交耗时与落库延迟（提交到 COMMIT 完成）
+"""
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import database as db
+
+
+class _GroupCommitConnection(sqlite3.Connection):
+    """deferred 为 True 时 commit() 为空操作，由 DbWriter 在批末统一提交。"""
+
+    deferred = False
+
+    def commit(self) -> None:
+        if not self.deferred:
+            super().commit()
+
+
+@dataclass(frozen=True)
+class WriterStats:
+    queue_depth: int
+    queue_max: int
+    ops: int
+    failed: int
+    commits: int
+    batch_max: int
+    commit_ms_avg: float
+    commit_ms_max: float
+    lag_ms_avg: float
+    lag_ms_max: float
+
+
+class _Op:
+    __slots__ = ("fn", "args", "kwargs", "on_error", "on_commit", "submitted")
+
+    def __init__(self, fn, args, kwargs, on_error, on_commit) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_error = on_error
+        self.on_commit = on_commit
+        self.submitted = time.monotonic()
+
+
+_STOP = object()
+
+
+class DbWriter:
+    def __init__(self, db_path: str | Path, *, interval_ms: int = 50, max_batch: int = 1000):
+        self.db_path = db_path
+        self.interval_s = max(0, int(interval_ms)) / 1000
+        self.max_batch = max(1, int(max_batch))
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queue_max = 0
+        self._ops = self._failed = self._commits = self._batch_max = 0
+        self._commit_s_sum = self._commit_s_max = 0.0
+        self._lag_s_sum = self._lag_s_max = 0.0
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        on_commit: Optional[Callable[[], None]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """把 fn(conn, *args, **kwargs) 放入写队列；失败时调用 on_error（默认打印），提交后调用 on_commit。"""
+        self._queue.put(_Op(fn, args, kwargs, on_error, on_commit))
+        depth = self._queue.qsize()
+        if depth > self._queue_max:
+            self._queue_max = depth
+
+    def flush(self) -> None:
+        """阻塞到此前提交的写操作全部提交完成；写线程已退出时抛 RuntimeError，而不是永远等待。"""
+        if not self._thread.is_alive():
+            raise RuntimeError("db writer thread is not running")
+        done = threading.Event()
+        self._queue.put(done)
+        while not done.wait(1.0):
+            if not self._thread.is_alive():
+                raise RuntimeError("db writer thread exited before flush completed")
+
+    def close(self) -> None:
+        """落库剩余操作后结束写线程。"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self) -> WriterStats:
+        with self._lock:
+            commits = max(self._commits, 1)
+            ops = max(self._ops, 1)
+            return WriterStats(
+                queue_depth=self.queue_depth,
+                queue_max=self._queue_max,
+                ops=self._ops,
+                failed=self._failed,
+                commits=self._commits,
+                batch_max=self._batch_max,
+                commit_ms_avg=round(self._commit_s_sum / commits * 1000, 2),
+                commit_ms_max=round(self._commit_s_max * 1000, 2),
+                lag_ms_avg=round(self._lag_s_sum / ops * 1000, 2),
+                lag_ms_max=round(self._lag_s_max * 1000, 2),
+            )
+
+    # --- 写线程 ---
+
+    def _run(self) -> None:
+        conn = db.connect(self.db_path, factory=_GroupCommitConnection)
+        stopping = False
+        try:
+            while not stopping:
+                batch, waiters, stopping = self._collect(self._queue.get())
+                if batch:
+                    self._apply(conn, batch)
+                for w in waiters:
+                    w.set()
+        finally:
+            conn.close()
+
+    def _collect(self, first: Any) -> tuple[list[_Op], list[threading.Event], bool]:
+        """从第一个元素开始，收集 interval 内到达的操作；遇到 flush / 停止标记提前结束。"""
+        batch: list[_Op] = []
+        waiters: list[threading.Event] = []
+        deadline = time.monotonic() + self.interval_s
+        item = first
+        while True:
+            if item is _STOP:
+                return batch, waiters, True
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                return batch, waiters, False
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch or remaining <= 0:
+                return batch, waiters, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, waiters, False
+
+    def _apply(self, conn: _GroupCommitConnection, batch: list[_Op]) -> None:
+        failed: list[tuple[_Op, BaseException]] = []
+        conn.deferred = True
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    op.fn(conn, *op.args, **op.kwargs)
+                except Exception as e:  # noqa: BLE001 - 单个操作失败不影响同批其它操作
+                    conn.execute("ROLLBACK TO op")
+                    failed.append((op, e))
+                conn.execute("RELEASE op")
+            conn.deferred = False
+            started = time.monotonic()
+            conn.commit()
+            commit_s = time.monotonic() - started
+        except sqlite3.Error as e:
+            conn.deferred = False
+            if conn.in_transaction:
+                conn.rollback()
+            failed = [(op, e) for op in batch]
+            commit_s = None
+
+        done = time.monotonic()
+        with self._lock:
+            self._ops += len(batch)
+            self._failed += len(failed)
+            self._batch_max = max(self._batch_max, len(batch))
+            if commit_s is not None:
+                self._commits += 1
+                self._commit_s_sum += commit_s
+                self._commit_s_max = max(self._commit_s_max, commit_s)
+            for op in batch:
+                lag = done - op.submitted
+                self._lag_s_sum += lag
+                self._lag_s_max = max(self._lag_s_max, lag)
+        failed_ops = {id(op) for op, _ in failed}
+        for op in batch:
+            if op.on_commit is not None and id(op) not in failed_ops:
+                _run_callback(op, op.on_commit)
+        for op, e in failed:
+            if op.on_error is not None:
+                _run_callback(op, op.on_error, e)
+            else:
+                print(f"[db_writer] error op={_op_name(op)} err={type(e).__name__}: {e}")
+
+
+def _op_name(op: _Op) -> str:
+    return getattr(op.fn, "__name__", repr(op.fn))
+
+
+def _run_callback(op: _Op, callback: Callable[..., None], *args: Any) -> None:
+    """回调异常只打印：不能让它结束写线程（否则之后的 flush / close 都会卡住）。"""
+    try:
+        callback(*args)
+    except Exception as e:  # noqa: BLE001
+        print(f"[db_writer] callback error op={_op_name(op)} err={type(e).__name__}: {e}")
@@ -0,0 +1,132 @@
+"""
+近重复洞察检测（MinHash + LSH）：
+
+- 文本 = tech_node + summary，NFKC + casefold 后切分：
+  中日韩字符串按字符 bigram，字母/数字串按整词，作为 shingle
+- MinHash 签名：NUM_PERM 个 (a*x+b) mod p 置换，存为 uint32 数组（BLOB）
+- LSH：签名切成 BANDS 段，每段连同 dimension 一起哈希成 band_key；
+  只有同一维度、至少一段完全相同的洞察才会成为候选，再用签名估计 Jaccard 精判
+
+写入路径见 database.insert_tech_insights；本文件的 main() 用于对已有数据做批量回填。
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+DUP_THRESHOLD = 0.7
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 固定种子：签名需要跨进程、跨版本稳定
+_rng = random.Random(20240229)
+_PERMS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def shingles(text: str) -> set[str]:
+    """CJK 字符 bigram + 其他文字整词。"""
+    s = unicodedata.normalize("NFKC", text or "").casefold()
+    out: set[str] = set()
+    for run in _WORD_RE.findall(s):
+        pos = 0
+        for m in _CJK_RE.finditer(run):
+            if m.start() > pos:
+                out.add(run[pos : m.start()])
+            cjk = m.group()
+            if len(cjk) == 1:
+                out.add(cjk)
+            else:
+                out.update(cjk[k : k + 2] for k in range(len(cjk) - 1))
+            pos = m.end()
+        if pos < len(run):
+            out.add(run[pos:])
+    return out
+
+
+def _hash32(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def minhash_signature(tokens: Iterable[str]) -> Optional[array]:
+    hashes = [_hash32(t) for t in tokens]
+    if not hashes:
+        return None
+    return array(
+        "I",
+        (
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in _PERMS
+        ),
+    )
+
+
+def insight_signature(tech_node: Optional[str], summary: Optional[str]) -> Optional[array]:
+    return minhash_signature(shingles(f"{tech_node or ''} {summary or ''}"))
+
+
+def band_keys(signature: array, dimension: str) -> list[int]:
+    """每段签名 + 维度 -> 有符号 64 位整数（直接作为 SQLite INTEGER 存储）。"""
+    dim = (dimension or "").encode("utf-8")
+    keys: list[int] = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        h = hashlib.blake2b(dim + bytes([band]) + chunk.tobytes(), digest_size=8)
+        keys.append(int.from_bytes(h.digest(), "little", signed=True))
+    return keys
+
+
+def estimate_jaccard(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def pack_signature(signature: array) -> bytes:
+    return signature.tobytes()
+
+
+def unpack_signature(blob: bytes) -> array:
+    sig = array("I")
+    sig.frombytes(blob)
+    return sig
+
+
+def main() -> None:
+    import database as db
+
+    parser = argparse.ArgumentParser(description="对已有 tech_insights 做近重复检测（MinHash/LSH）回填")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--rebuild", action="store_true", help="清空已有签名与重复标记后全量重算")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    res = db.dedup_existing_insights(conn, rebuild=args.rebuild)
+    conn.close()
+    print(f"[dedup] indexed={res['indexed']} duplicates={res['duplicates']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+多账号抓取登记（sources 表）：
+
+- 每个账号一行：抖音主页 URL、轮询间隔、每分钟请求上限、置顶数
+- main.py 检测到已启用的账号后改为按账号并发同步（sync_engine.sync_feeds），
+  每个账号有独立的增量游标（pipeline_state 中的 sync.<feed_id>.*）
+- 单账号时代的数据 feed_id 为空；把原账号登记后，首次同步会把已有视频归到该账号
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import os
+from pathlib import Path
+
+import database as db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="管理多账号抓取登记（sources 表）")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_add = sub.add_parser("add", help="登记账号（name 已存在时更新）")
+    p_add.add_argument("name", help="账号名（唯一）")
+    p_add.add_argument("input_url", help="抖音账号主页 URL")
+    p_add.add_argument("--poll-interval", type=int, default=3600, help="轮询间隔（秒，默认 3600）")
+    p_add.add_argument("--rate-limit", type=float, default=30, help="每分钟最多请求数（默认 30）")
+    p_add.add_argument("--top-n", type=int, default=3, help="列表前 N 个视为置顶（默认 3）")
+
+    for cmd in ("enable", "disable"):
+        p = sub.add_parser(cmd, help=f"{'启用' if cmd == 'enable' else '停用'}账号")
+        p.add_argument("name")
+
+    sub.add_parser("list", help="列出全部账号")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    if args.command == "add":
+        feed_id = db.add_feed(
+            conn,
+            args.name,
+            args.input_url,
+            poll_interval_s=args.poll_interval,
+            rate_limit_per_min=args.rate_limit,
+            top_n=args.top_n,
+        )
+        print(f"[feeds] {args.name} feed_id={feed_id}")
+    elif args.command in ("enable", "disable"):
+        if not db.set_feed_enabled(conn, args.name, args.command == "enable"):
+            raise SystemExit(f"未找到账号：{args.name}")
+        print(f"[feeds] {args.name} {args.command}d")
+    else:
+        enabled = {f.feed_id for f in db.list_feeds(conn)}
+        for f in db.list_feeds(conn, enabled_only=False):
+            polled = (
+                _dt.datetime.fromtimestamp(f.last_polled_at).isoformat(timespec="seconds")
+                if f.last_polled_at
+                else "-"
+            )
+            state = "on" if f.feed_id in enabled else "off"
+            print(
+                f"{f.feed_id}\t{f.name}\t{state}\tinterval={f.poll_interval_s}s "
+                f"rate={f.rate_limit_per_min}/min top_n={f.top_n} last_polled={polled}\t{f.input_url}"
+            )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+LLM 输出的 JSON 本地修复（非流式解析失败后使用，避免为格式小错重新请求）：
+
+- 起点取第一个“像 JSON”的括号：[ 之后（可隔空白）须是 { 或 ]，{ 之后须是 " 或 }，
+  所以 "Here are results [see below]: [{...}]" 这类说明文字里的括号会被跳过
+- 去掉 ```json 代码块标记与尾逗号后整体解析；{"items": [...]} 取 items，单个对象包成列表
+- 整体解析失败（常见于输出被截断）时逐元素扫描，保留已完整闭合的对象
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Optional
+
+_JSON_START_RE = re.compile(r'\[\s*[{\]]|\{\s*["}]')
+_ITEMS_WRAPPER_RE = re.compile(r'\{\s*"items"\s*:\s*\[')
+_FENCE_RE = re.compile(r"```[a-zA-Z]*")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+def repair_json_text(text: str) -> Optional[list[Any]]:
+    """
+    尽力把 LLM 输出修成元素列表，失败返回 None：
+    1) 去掉代码块标记与 JSON 起点之前的文字、删除尾逗号后整体解析
+    2) 仍失败时逐元素扫描，保留已完整闭合的对象
+    """
+    t = _FENCE_RE.sub("", text or "")
+    m = _JSON_START_RE.search(t)
+    if m is None:
+        return None
+    t = _TRAILING_COMMA_RE.sub(r"\1", t[m.start() :]).strip()
+    try:
+        obj = json.loads(t)
+    except ValueError:
+        obj = None
+    if isinstance(obj, dict) and isinstance(obj.get("items"), list):
+        return obj["items"]
+    if isinstance(obj, list):
+        return obj
+    if isinstance(obj, dict):
+        return [obj]
+    return _salvage_elements(t) or None
+
+
+def _salvage_elements(t: str) -> list[Any]:
+    """
+    逐个取出数组（或 {"items": [ 包裹、裸对象序列 {...},{...}）中已闭合的对象；
+    遇到数组结束、元素间的杂质或无法解析的对象时停止。
+    """
+    w = _ITEMS_WRAPPER_RE.match(t)
+    if w is not None:
+        pos = w.end()
+    else:
+        pos = 1 if t.startswith("[") else 0
+    out: list[Any] = []
+    depth = 0  # 数组内部的嵌套深度（0 表示位于元素之间）
+    in_string = escape = False
+    start = 0
+    for k in range(pos, len(t)):
+        ch = t[k]
+        if depth == 0:
+            if ch == "{":
+                depth, start = 1, k
+            elif ch != "," and not ch.isspace():
+                break
+            continue
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                try:
+                    out.append(json.loads(t[start : k + 1]))
+                except ValueError:
+                    break
+    return out
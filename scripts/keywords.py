@@ -0,0 +1,301 @@
+"""
+关键词引擎：影响力等级与维度候选在一次扫描中得出。
+
+- 词表来自 keywords.json（可用 KEYWORDS_PATH 覆盖）：
+  - impact：等级 -> 关键词（命中多个等级时取最高）
+  - dimensions：维度 -> 关键词（分析前预评分 / 候选维度）
+  - general：不归属具体维度的通用 AI 词（与维度词一起计入 AI 相关词命中数）
+- 所有关键词编译成一个按前缀合并的正则（字典树展开，等价于 Aho-Corasick 的单次线性扫描）；
+  英文词要求前后不是字母（ai 不会命中 said），中文词按子串匹配
+- python keywords.py rescore：词表修改后按 insight_id 分块重算 tech_insights.impact_score，无需调用 LLM
+- python keywords.py compare：用旧版规则（纯子串、只有 viral / game changer 忽略大小写）与当前引擎
+  对库中的 impact_signal + evolution_tag 各算一遍，列出等级变化；改动匹配语义前先跑一遍
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+_END = ""  # 字典树中的终止标记
+
+
+@dataclass(frozen=True)
+class KeywordScan:
+    ai_hits: int = 0
+    impact_level: Optional[int] = None
+    dimension_scores: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def candidate_dimensions(self) -> list[str]:
+        return sorted(self.dimension_scores, key=lambda d: -self.dimension_scores[d])
+
+
+@dataclass(frozen=True)
+class _TermTags:
+    impact: Optional[int] = None
+    dimensions: tuple[str, ...] = ()
+    ai: bool = False
+
+
+def _is_latin(term: str) -> bool:
+    return term[:1].isascii() and term[:1].isalpha()
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """把词表展开成按公共前缀合并的正则（更长的词优先）。"""
+    trie: dict = {}
+    for t in terms:
+        node = trie
+        for ch in t:
+            node = node.setdefault(ch, {})
+        node[_END] = _is_latin(t)
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch != _END]
+        if _END in node:
+            alts.append("(?![a-z])" if node[_END] else "")
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return emit(trie)
+
+
+def _keyword_regex(terms: Iterable[str]) -> Optional[re.Pattern[str]]:
+    terms = list(terms)
+    latin = [t for t in terms if _is_latin(t)]
+    other = [t for t in terms if not _is_latin(t)]
+    parts = []
+    if latin:
+        parts.append("(?<![a-z])" + _trie_pattern(latin))
+    if other:
+        parts.append(_trie_pattern(other))
+    return re.compile("|".join(parts)) if parts else None
+
+
+class KeywordEngine:
+    def __init__(
+        self,
+        *,
+        impact: Mapping[int, Iterable[str]] = (),
+        dimensions: Mapping[str, Iterable[str]] = (),
+        general: Iterable[str] = (),
+    ):
+        tags: dict[str, dict] = {}
+
+        def _tag(term: str) -> dict:
+            return tags.setdefault(term.strip().casefold(), {"impact": None, "dimensions": [], "ai": False})
+
+        for level, terms in dict(impact).items():
+            for t in terms:
+                cur = _tag(t)
+                cur["impact"] = max(int(level), cur["impact"] or 0)
+        for dim, terms in dict(dimensions).items():
+            for t in terms:
+                cur = _tag(t)
+                cur["ai"] = True
+                if dim not in cur["dimensions"]:
+                    cur["dimensions"].append(dim)
+        for t in general:
+            _tag(t)["ai"] = True
+        tags.pop("", None)
+
+        self._tags = {
+            t: _TermTags(v["impact"], tuple(v["dimensions"]), v["ai"]) for t, v in tags.items()
+        }
+        self.dimensions = tuple(dict(dimensions))
+        self.ai_terms = frozenset(t for t, v in self._tags.items() if v.ai)
+        self._regex = _keyword_regex(self._tags)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "KeywordEngine":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(
+            impact={int(k): v for k, v in (data.get("impact") or {}).items()},
+            dimensions=data.get("dimensions") or {},
+            general=data.get("general") or [],
+        )
+
+    def scan(self, text: str) -> KeywordScan:
+        if not text or self._regex is None:
+            return KeywordScan()
+        ai_hits = 0
+        impact: Optional[int] = None
+        dims: Counter[str] = Counter()
+        for m in self._regex.finditer(text.casefold()):
+            tags = self._tags[m.group(0)]
+            if tags.ai:
+                ai_hits += 1
+            if tags.impact is not None and (impact is None or tags.impact > impact):
+                impact = tags.impact
+            dims.update(tags.dimensions)
+        return KeywordScan(ai_hits, impact, dict(dims))
+
+    def impact_score(self, impact_signal: str | None, evolution_tag: str | None) -> int:
+        """影响力等级 (1-5)：没有任何热度 / 标签文字为 1，未命中关键词为 2，否则取命中的最高等级。"""
+        s = f"{impact_signal or ''} {evolution_tag or ''}".strip()
+        if not s:
+            return 1
+        level = self.scan(s).impact_level
+        return level if level is not None else 2
+
+
+def default_keywords_path() -> Path:
+    p = os.getenv("KEYWORDS_PATH")
+    return Path(p) if p else Path(__file__).resolve().parent / "keywords.json"
+
+
+@lru_cache(maxsize=4)
+def _load_engine(path: str) -> KeywordEngine:
+    return KeywordEngine.from_file(path)
+
+
+def get_engine(path: str | Path | None = None) -> KeywordEngine:
+    """按路径缓存的引擎（编译一次，多线程只读共享）。"""
+    return _load_engine(str(path or default_keywords_path()))
+
+
+def rescore_insights(
+    conn: sqlite3.Connection,
+    engine: KeywordEngine,
+    *,
+    chunk_size: int = 5000,
+    include_legacy: bool = False,
+    dry_run: bool = False,
+) -> tuple[int, int]:
+    """
+    按 insight_id 分块重算 impact_score，只更新变化的行，每块一个事务；有变化时重建 dimension_stats。
+    impact_signal 为 NULL 的旧行默认跳过（原始热度描述未保存），include_legacy 时仅按 evolution_tag 重算。
+    返回 (扫描行数, 变化行数)。
+    """
+    import database as db  # analyzer 在模块级导入本模块，数据库层只在批量重算时需要
+
+    where = "" if include_legacy else "AND impact_signal IS NOT NULL"
+    last = 0
+    scanned = changed = 0
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT insight_id, impact_signal, evolution_tag, impact_score FROM tech_insights
+            WHERE insight_id > ? {where}
+            ORDER BY insight_id
+            LIMIT ?
+            """,
+            (last, int(chunk_size)),
+        ).fetchall()
+        if not rows:
+            break
+        last = rows[-1]["insight_id"]
+        scanned += len(rows)
+        updates = [
+            (score, r["insight_id"])
+            for r in rows
+            if (score := engine.impact_score(r["impact_signal"], r["evolution_tag"])) != r["impact_score"]
+        ]
+        changed += len(updates)
+        if updates and not dry_run:
+            conn.executemany("UPDATE tech_insights SET impact_score = ? WHERE insight_id = ?", updates)
+            conn.commit()
+    if changed and not dry_run:
+        db.rebuild_dimension_stats(conn)
+    return scanned, changed
+
+
+def _baseline_impact_score(impact_signal: str | None, evolution_tag: str | None) -> int:
+    """引入 keywords.json 之前 analyzer.infer_impact_score 的规则（冻结，仅供 compare 对照）。"""
+    s = f"{impact_signal or ''} {evolution_tag or ''}".strip()
+    if not s:
+        return 1
+    s_lower = s.lower()
+    strong = ("爆火", "刷屏", "现象级", "彻底改变", "颠覆", "破圈", "最强", "sota", "breakthrough")
+    high = ("大幅提升", "显著提升", "重大更新", "发布", "上线", "重磅", "最强", "hot")
+    mid = ("开源", "新增", "更新", "增强", "优化", "支持", "推出")
+    if any(k in s for k in strong) or any(k in s_lower for k in ("viral", "game changer")):
+        return 5
+    if any(k in s for k in high):
+        return 4
+    if any(k in s for k in mid):
+        return 3
+    return 2
+
+
+def compare_with_baseline(
+    conn: sqlite3.Connection, engine: KeywordEngine, *, examples: int = 3
+) -> tuple[int, Counter[tuple[int, int]], dict[tuple[int, int], list[str]]]:
+    """
+    旧版规则与当前引擎逐行对比（只读）。
+    返回 (扫描行数, (旧等级, 新等级) -> 行数, (旧等级, 新等级) -> 示例文本)。
+    """
+    scanned = 0
+    changes: Counter[tuple[int, int]] = Counter()
+    samples: dict[tuple[int, int], list[str]] = {}
+    for signal, tag in conn.execute("SELECT impact_signal, evolution_tag FROM tech_insights"):
+        scanned += 1
+        pair = (_baseline_impact_score(signal, tag), engine.impact_score(signal, tag))
+        if pair[0] == pair[1]:
+            continue
+        changes[pair] += 1
+        bucket = samples.setdefault(pair, [])
+        if len(bucket) < examples:
+            bucket.append(f"{signal or ''} {tag or ''}".strip())
+    return scanned, changes, samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="关键词引擎：按当前词表重算影响力 / 查看文本命中")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--keywords", default=None, help="词表路径（默认 KEYWORDS_PATH 或 scripts/keywords.json）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_rescore = sub.add_parser("rescore", help="按当前词表重算 tech_insights.impact_score")
+    p_rescore.add_argument("--chunk-size", type=int, default=5000)
+    p_rescore.add_argument(
+        "--include-legacy", action="store_true", help="impact_signal 为空的旧行也按 evolution_tag 重算"
+    )
+    p_rescore.add_argument("--dry-run", action="store_true", help="只统计会变化的行数，不写库")
+    sub.add_parser("compare", help="旧版影响力规则与当前词表逐行对比（只读）")
+    p_scan = sub.add_parser("scan", help="输出一段文本的 AI 相关词命中数、影响力等级与候选维度")
+    p_scan.add_argument("text")
+    args = parser.parse_args()
+
+    engine = get_engine(args.keywords)
+    if args.command == "scan":
+        r = engine.scan(args.text)
+        print(f"ai_hits={r.ai_hits} impact_level={r.impact_level} dimensions={r.candidate_dimensions}")
+        return
+
+    import database as db
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    if args.command == "compare":
+        scanned, changes, samples = compare_with_baseline(conn, engine)
+        conn.close()
+        print(f"[keywords] compare scanned={scanned} changed={sum(changes.values())}")
+        for (old, new), n in changes.most_common():
+            print(f"  {old} -> {new}: {n}  e.g. {samples[(old, new)]}")
+        return
+    scanned, changed = rescore_insights(
+        conn,
+        engine,
+        chunk_size=args.chunk_size,
+        include_legacy=args.include_legacy,
+        dry_run=args.dry_run,
+    )
+    conn.close()
+    print(f"[keywords] rescore scanned={scanned} changed={changed}{' (dry-run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
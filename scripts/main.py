@@ -1,217 +1,582 @@
 from __future__ import annotations
 
+import argparse
 import os
+import signal
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from collections import Counter
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Optional
 
 import database as db
-from analyzer import LlmError, OpenAIAnalyzer
+from analyzer import LlmError, LlmMetrics, OpenAIAnalyzer
 from coze_client import CozeClient, CozeClientConfig
-from config import load_config
-from sync_engine import SyncEngine
+from config import AppConfig, load_config
+from db_writer import DbWriter
+from keywords import KeywordScan
+from outbox import Outbox, apply_entry, default_outbox_path
+from preprocess import Preprocessor
+from router import RoutedAnalysis, TierRun, TieredAnalyzer
+from sync_engine import SyncEngine, SyncResult, sync_feeds
 
 
-def main() -> None:
-    # --- 基础配置（skill 独立：默认 DB 在上级 assets/data.db）---
-    base_dir = Path(__file__).resolve().parent
-    default_db = base_dir.parent / "assets" / "data.db"
-    db_path = Path(os.getenv("DB_PATH", str(default_db)))
-    cfg = load_config()
-    test_mode = bool(cfg.test_mode)
+def _print_sync_result(res: SyncResult, *, prefix: str = "") -> None:
+    print(
+        f"[sync] {prefix}max_time_before={res.max_time_before} "
+        f"top_ids={res.top_ids} "
+        f"inserted_incremental={len(res.inserted_incremental_ids)} "
+        f"inserted_backfill={len(res.inserted_backfill_ids)} "
+        f"updated_existing={res.updated_existing_count} "
+        f"probe_only={res.probe_only}"
+    )
 
-    # --- 初始化数据库 ---
-    conn = db.connect(db_path)
-    db.init_db(conn)
 
-    # --- 初始化客户端/引擎 ---
-    coze = CozeClient(CozeClientConfig())
-    window_size = int(
-        getattr(cfg, "window_size", None) or os.getenv("WINDOW_SIZE", "20")
-    )
-    engine = SyncEngine(
-        conn,
-        coze,
-        window_size=window_size,
-        max_pages=(1 if test_mode else None),
-    )
+class AdaptiveInterval:
+    """
+    守护模式的轮询间隔：有新视频时回到 min_s（作者活跃期间加密轮询），
+    无变化时按 factor 逐步放大到 max_s。
+    """
 
-    # 阶段 1：同步列表（增量 + 置顶）
-    sync_res = engine.sync_video_list()
-    max_time_before = sync_res.max_time_before or 0
-    print(
-        f"[sync] max_time_before={sync_res.max_time_before} "
-        f"top_ids={sync_res.top_ids} "
-        f"inserted_incremental={len(sync_res.inserted_incremental_ids)} "
-        f"inserted_backfill={len(sync_res.inserted_backfill_ids)} "
-        f"updated_existing={sync_res.updated_existing_count}"
-    )
+    def __init__(self, min_s: float, max_s: float, factor: float = 2.0):
+        self.min_s = min_s
+        self.max_s = max(max_s, min_s)
+        self.factor = factor
+        self.current = min_s
 
-    # 阶段 2：文案提取（批处理循环：处理完再进入下一阶段）
-    extract_limit = int(
-        getattr(cfg, "extract_limit", None) or os.getenv("EXTRACT_LIMIT", "200")
-    )
-    extract_workers = max(1, int(getattr(cfg, "extract_workers", 5) or 5))
-    extracted_ok = 0
-    extracted_err = 0
-    while True:
-        to_extract = db.list_sources_needing_text(
-            conn,
-            min_publish_time_exclusive=max_time_before,
-            limit=extract_limit,
-        )
-        if not to_extract:
-            break
+    def update(self, new_items: int) -> float:
+        if new_items > 0:
+            self.current = self.min_s
+        else:
+            self.current = min(self.max_s, self.current * self.factor)
+        return self.current
 
-        print(
-            f"[extract] batch_size={len(to_extract)} limit={extract_limit} "
-            f"(publish_time > {max_time_before}) workers={extract_workers}"
-        )
 
-        # 测试模式：阶段2只提取 1 条
-        if test_mode:
-            to_extract = to_extract[:1]
-
-        # 并发请求外部接口（Coze），但 DB 更新保持在主线程串行执行
-        if extract_workers == 1 or len(to_extract) <= 1:
-            for row in to_extract:
-                sid = row["source_id"]
-                url = row["source_url"]
-                try:
-                    text = coze.get_video_content(url)
-                    db.update_source_content(conn, sid, text, status="text_extracted")
-                    extracted_ok += 1
-                    print(f"[extract] ok source_id={sid} text_len={len(text)}")
-                except Exception as e:  # noqa: BLE001
-                    db.update_source_status(conn, sid, "error")
-                    extracted_err += 1
-                    print(f"[extract] error source_id={sid} err={e}")
+class Pipeline:
+    """
+    同步→提取→分析→链接→语义索引。
+    连接、Coze 客户端、LLM 客户端与线程池在实例内复用：一次性运行调用一次 run_once，
+    守护模式循环调用。stop 被设置后不再提交新任务，但会等在途任务完成并落库。
+    提取 / 分析结果的写库交给 DbWriter（独立连接 + 组提交），主线程只负责调度与读取待处理列表；
+    结果在交给写线程前先写入 outbox 日志，启动时重放上次未落库的部分。
+    """
+
+    def __init__(self, db_path: Path, cfg: AppConfig, *, stop: Optional[threading.Event] = None):
+        self.db_path = db_path
+        self.cfg = cfg
+        self.test_mode = bool(cfg.test_mode)
+        self.stop = stop or threading.Event()
+
+        # --- 初始化数据库 ---
+        self.conn = db.connect(db_path)
+        db.init_db(self.conn)
+        self.writer = DbWriter(db_path, interval_ms=cfg.db_commit_interval_ms)
+        # 上次运行拿到结果但未提交的部分先补写（不再调用外部接口）
+        self.outbox = Outbox(cfg.outbox_path or default_outbox_path(db_path))
+        if self.outbox.pending_count:
+            counts = self.outbox.replay(self.conn)
+            print("[outbox] " + " ".join(f"{k}={v}" for k, v in counts.items()))
+
+        # --- 初始化客户端/引擎 ---
+        self.coze = CozeClient(CozeClientConfig())
+        self.window_size = int(getattr(cfg, "window_size", None) or os.getenv("WINDOW_SIZE", "20"))
+        self.extract_limit = int(getattr(cfg, "extract_limit", None) or os.getenv("EXTRACT_LIMIT", "200"))
+        self.extract_workers = max(1, int(getattr(cfg, "extract_workers", 5) or 5))
+        self.analyze_limit = int(os.getenv("ANALYZE_LIMIT", "200"))
+        self.analyze_workers = max(1, int(getattr(cfg, "analyze_workers", 5) or 5))
+        self._extract_pool: Optional[ThreadPoolExecutor] = None
+        self._analyze_pool: Optional[ThreadPoolExecutor] = None
+
+        self.llm_metrics = LlmMetrics()
+        try:
+            self.analyzer: Optional[TieredAnalyzer] = self._new_analyzer()
+            self.analyzer_error: Optional[LlmError] = None
+        except LlmError as e:
+            self.analyzer = None
+            self.analyzer_error = e
         else:
-            with ThreadPoolExecutor(max_workers=extract_workers) as ex:
-                future_map = {
-                    ex.submit(coze.get_video_content, row["source_url"]): row["source_id"]
-                    for row in to_extract
-                }
-                for fut in as_completed(future_map):
-                    sid = future_map[fut]
-                    try:
-                        text = fut.result()
-                        db.update_source_content(conn, sid, text, status="text_extracted")
-                        extracted_ok += 1
-                        print(f"[extract] ok source_id={sid} text_len={len(text)}")
-                    except Exception as e:  # noqa: BLE001
-                        db.update_source_status(conn, sid, "error")
-                        extracted_err += 1
-                        print(f"[extract] error source_id={sid} err={e}")
+            t = self.analyzer.template
+            db.register_prompt_template(
+                self.conn, self.analyzer.prompt_hash, t.name, t.version, self.cfg.openai_response_format
+            )
 
-    print(f"[extract] done ok={extracted_ok} error={extracted_err}")
+        # 每个线程持有独立的分析器（requests.Session 非严格线程安全）
+        self._tls = threading.local()
+        self._embedder = None
 
-    # 阶段 3：LLM 结构化分析（只分析新增 create_time > max_time_before）
-    try:
-        analyzer = OpenAIAnalyzer.from_config(
-            api_key=cfg.openai_api_key,
-            base_url=cfg.openai_base_url,
-            model=cfg.openai_model,
+    def _new_llm(self, model: str) -> OpenAIAnalyzer:
+        return OpenAIAnalyzer.from_config(
+            api_key=self.cfg.openai_api_key,
+            base_url=self.cfg.openai_base_url,
+            model=model,
+            response_format=self.cfg.openai_response_format,
+            prompt_template=self.cfg.prompt_template,
+            metrics=self.llm_metrics,
         )
-    except LlmError as e:
-        print(f"[analyze] skip: {e}")
-        conn.close()
-        return
-
-    # 阶段 3：LLM 分析（批处理循环：分析完再结束）
-    analyze_limit = int(os.getenv("ANALYZE_LIMIT", "200"))
-    analyze_workers = max(1, int(getattr(cfg, "analyze_workers", 5) or 5))
-    analyzed_ok = 0
-    analyzed_err = 0
-
-    # 每个线程持有独立的 OpenAIAnalyzer（requests.Session 非严格线程安全）
-    _tls = threading.local()
-
-    def _analyze_one(title: str, content_text: str):
-        if not hasattr(_tls, "analyzer"):
-            _tls.analyzer = OpenAIAnalyzer.from_config(
-                api_key=cfg.openai_api_key,
-                base_url=cfg.openai_base_url,
-                model=cfg.openai_model,
-            )
-        return _tls.analyzer.analyze(title=title, content_text=content_text)
-
-    # 先处理所有待分析的视频（包括历史遗留数据）
-    print(f"[analyze] 处理所有待分析的视频（包括历史数据）...")
-    while True:
-        to_analyze = db.list_sources_needing_analysis(
-            conn,
-            min_publish_time_exclusive=None,  # 处理所有待分析的视频
-            limit=analyze_limit,
+
+    def _new_analyzer(self) -> TieredAnalyzer:
+        cfg = self.cfg
+        cheap_model = cfg.openai_cheap_model if cfg.routing else None
+        return TieredAnalyzer(
+            self._new_llm(cfg.openai_model),
+            self._new_llm(cheap_model) if cheap_model else None,
+            enabled=cfg.routing,
+            min_ai_hits=cfg.min_ai_hits,
+            complex_min=cfg.route_complex_min,
+            prices=cfg.model_prices,
+        )
+
+    def close(self) -> None:
+        for pool in (self._extract_pool, self._analyze_pool):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self.writer.close()
+        self.outbox.compact()
+        self.outbox.close()
+        self.conn.close()
+
+    def mark_stale_prompts(self, limit: Optional[int] = None) -> int:
+        """把旧模板产出的来源重置为待分析，返回数量（无 LLM 配置时为 0）。"""
+        if self.analyzer is None:
+            return 0
+        n = db.mark_stale_prompt_sources(self.conn, self.analyzer.prompt_hash, limit=limit)
+        print(
+            f"[analyze] template={self.analyzer.template.name} hash={self.analyzer.prompt_hash} "
+            f"stale_sources_requeued={n}"
         )
-        if not to_analyze:
-            break
+        return n
+
+    def run_once(self) -> int:
+        """跑一轮完整流水线，返回本轮新写入的视频数。"""
+        max_time_before, new_items = self.sync_stage()
+        self.extract_stage(max_time_before)
+        if self.analyzer is None:
+            print(f"[analyze] skip: {self.analyzer_error}")
+        else:
+            self.analyze_stage(max_time_before)
+            self.post_stage()
+        self._print_writer_stats()
+        # 本轮写操作都已 flush：日志只剩写库失败的条目
+        self.outbox.compact()
+        return new_items
 
+    def _print_writer_stats(self) -> None:
+        st = self.writer.stats()
         print(
-            f"[analyze] batch_size={len(to_analyze)} limit={analyze_limit} "
-            f"(publish_time > {max_time_before}) workers={analyze_workers}"
+            f"[db_writer] ops={st.ops} failed={st.failed} commits={st.commits} batch_max={st.batch_max} "
+            f"queue_depth={st.queue_depth} queue_max={st.queue_max} "
+            f"commit_ms avg={st.commit_ms_avg} max={st.commit_ms_max} "
+            f"lag_ms avg={st.lag_ms_avg} max={st.lag_ms_max} outbox_pending={self.outbox.pending_count}"
         )
 
-        # 测试模式：阶段3最多分析 1 条（通常阶段2也只提取 1 条）
-        if test_mode:
-            to_analyze = to_analyze[:1]
-
-        # 并发调用 LLM，但 DB 写入在主线程串行执行
-        if analyze_workers == 1 or len(to_analyze) <= 1:
-            for row in to_analyze:
-                sid = row["source_id"]
-                title = row["title"] or ""
-                content_text = row["content_text"] or ""
-                if not content_text.strip():
-                    db.update_source_status(conn, sid, "error")
-                    analyzed_err += 1
-                    print(f"[analyze] error source_id={sid} empty_content")
+    # 阶段 1：同步列表（增量 + 置顶）
+    def sync_stage(self) -> tuple[int, int]:
+        # sources 中登记了账号时按账号并发同步（只同步到期的）；否则沿用单账号模式
+        if db.list_feeds(self.conn):
+            feed_results = sync_feeds(
+                self.db_path,
+                self.coze,
+                workers=max(1, int(getattr(self.cfg, "sync_workers", 4) or 4)),
+                window_size=self.window_size,
+                max_pages=(1 if self.test_mode else None),
+            )
+            boundaries: list[int] = []
+            new_items = 0
+            for name, res in feed_results.items():
+                if isinstance(res, BaseException):
+                    print(f"[sync] feed={name} error={type(res).__name__}: {res}")
                     continue
+                boundaries.append(res.max_time_before or 0)
+                new_items += len(res.inserted_incremental_ids)
+                _print_sync_result(res, prefix=f"feed={name} ")
+            print(f"[sync] feeds_due={len(feed_results)}")
+            # 各账号边界不同：取最小值，保证每个账号的新视频都进入后续阶段
+            return min(boundaries, default=0), new_items
 
-                try:
-                    res = analyzer.analyze(title=title, content_text=content_text)
-                    db.delete_tech_insights_for_source(conn, sid)
-                    db.insert_tech_insights(conn, res.to_db_rows(source_id=sid))
-                    db.update_source_status(conn, sid, "analyzed")
-                    analyzed_ok += 1
-                    print(f"[analyze] ok source_id={sid} insights={len(res.items)}")
-                except Exception as e:  # noqa: BLE001
-                    db.update_source_status(conn, sid, "error")
-                    analyzed_err += 1
-                    print(f"[analyze] error source_id={sid} err={e}")
-        else:
-            with ThreadPoolExecutor(max_workers=analyze_workers) as ex:
+        engine = SyncEngine(
+            self.conn,
+            self.coze,
+            window_size=self.window_size,
+            max_pages=(1 if self.test_mode else None),
+        )
+        sync_res = engine.sync_video_list()
+        _print_sync_result(sync_res)
+        return sync_res.max_time_before or 0, len(sync_res.inserted_incremental_ids)
+
+    def _write_failed(self, failed: set[str], sid: str, e: BaseException) -> None:
+        """
+        写线程中结果落库失败（在同批 flush 返回前调用）：本轮不再重新领取该来源，
+        避免每次重新查询都再调用一次外部接口；随后标记为 error（结果仍在 outbox 中，下次启动重放）。
+        """
+        failed.add(sid)
+        print(f"[db_writer] error source_id={sid} err={type(e).__name__}: {e}")
+        self.writer.submit(db.update_source_status, sid, "error")
+
+    # 阶段 2：文案提取（批处理循环：处理完再进入下一阶段）
+    def extract_stage(self, max_time_before: int) -> None:
+        conn = self.conn
+        writer = self.writer
+        outbox = self.outbox
+        extracted_ok = 0
+        extracted_err = 0
+        write_failed: set[str] = set()
+
+        def _ok(sid: str, text: str) -> None:
+            nonlocal extracted_ok
+            entry = outbox.record_text(sid, text)
+            writer.submit(
+                apply_entry,
+                entry,
+                on_commit=partial(outbox.ack, entry["id"]),
+                on_error=partial(self._write_failed, write_failed, sid),
+            )
+            extracted_ok += 1
+            print(f"[extract] ok source_id={sid} text_len={len(text)}")
+
+        def _err(sid: str, e: BaseException) -> None:
+            nonlocal extracted_err
+            writer.submit(db.update_source_status, sid, "error")
+            extracted_err += 1
+            print(f"[extract] error source_id={sid} err={e}")
+
+        def _save(sid: str, fut) -> None:
+            try:
+                text = fut.result()
+            except Exception as e:  # noqa: BLE001
+                _err(sid, e)
+            else:
+                _ok(sid, text)
+
+        while not self.stop.is_set():
+            # 上一批的写入全部落库后再查询，避免同一来源被重复提交
+            writer.flush()
+            to_extract = [
+                t
+                for t in db.list_sources_needing_text(
+                    conn,
+                    min_publish_time_exclusive=max_time_before,
+                    limit=self.extract_limit,
+                )
+                if t.source_id not in write_failed
+            ]
+            if not to_extract:
+                break
+
+            print(
+                f"[extract] batch_size={len(to_extract)} limit={self.extract_limit} "
+                f"(publish_time > {max_time_before}) workers={self.extract_workers}"
+            )
+
+            # 测试模式：阶段2只提取 1 条
+            if self.test_mode:
+                to_extract = to_extract[:1]
+
+            # 并发请求外部接口（Coze），DB 更新交给写线程按组提交
+            if self.extract_workers == 1 or len(to_extract) <= 1:
+                for task in to_extract:
+                    if self.stop.is_set():
+                        break
+                    sid, url = task
+                    try:
+                        text = self.coze.get_video_content(url)
+                    except Exception as e:  # noqa: BLE001
+                        _err(sid, e)
+                    else:
+                        _ok(sid, text)
+            else:
+                if self._extract_pool is None:
+                    self._extract_pool = ThreadPoolExecutor(max_workers=self.extract_workers)
                 future_map = {}
-                for row in to_analyze:
-                    sid = row["source_id"]
-                    title = row["title"] or ""
-                    content_text = row["content_text"] or ""
-                    if not content_text.strip():
-                        db.update_source_status(conn, sid, "error")
-                        analyzed_err += 1
-                        print(f"[analyze] error source_id={sid} empty_content")
+                for task in to_extract:
+                    if self.stop.is_set():
+                        break
+                    future_map[self._extract_pool.submit(self.coze.get_video_content, task.source_url)] = (
+                        task.source_id
+                    )
+                    if len(future_map) >= self.extract_workers:
+                        done, _ = wait(future_map, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            _save(future_map.pop(fut), fut)
+                # 收尾：在途请求即使收到停止信号也等待完成并落库
+                for fut in wait(future_map).done:
+                    _save(future_map[fut], fut)
+
+        writer.flush()
+        print(f"[extract] done ok={extracted_ok} error={extracted_err}")
+
+    def _analyze_one(self, title: str, content_text: str, scan: Optional[KeywordScan]) -> RoutedAnalysis:
+        if not hasattr(self._tls, "analyzer"):
+            self._tls.analyzer = self._new_analyzer()
+        return self._tls.analyzer.analyze(title=title, content_text=content_text, scan=scan)
+
+    # 阶段 3：LLM 结构化分析（批处理循环：分析完再结束）
+    def analyze_stage(self, max_time_before: int) -> None:
+        conn = self.conn
+        writer = self.writer
+        outbox = self.outbox
+        analyzed_ok = 0
+        analyzed_skipped = 0
+        analyzed_err = 0
+        write_failed: set[str] = set()
+        tiers: Counter[str] = Counter()
+        pre_counts: Counter[str] = Counter()
+        # 每轮重新加载套话词表（preprocess.py learn / add 之后无需重启守护进程）
+        pre = Preprocessor.load(conn) if self.cfg.preprocess else None
+
+        def _load(task) -> Optional[tuple[str, Optional[KeywordScan]]]:
+            """
+            读取文案并预处理，返回 (文案, 预处理的关键词扫描结果)；
+            文案为空（error）或被判定与 AI 无关（skipped）时返回 None。
+            """
+            nonlocal analyzed_skipped, analyzed_err
+            sid = task.source_id
+            content_text = db.get_source_content(conn, sid) or ""
+            if not content_text.strip():
+                writer.submit(db.update_source_status, sid, "error")
+                analyzed_err += 1
+                print(f"[analyze] error source_id={sid} empty_content")
+                return None
+            if pre is None:
+                return content_text, None
+            p = pre.prepare(task.title, content_text)
+            pre_counts.update(
+                sources=1,
+                chars_in=p.chars_in,
+                chars_out=len(p.text),
+                boilerplate=p.boilerplate,
+                duplicates=p.duplicates,
+            )
+            if p.ai_hits < self.cfg.min_ai_hits or not p.text:
+                reason = f"preprocess:ai_hits<{self.cfg.min_ai_hits}"
+                run = TierRun("skip", None, reason, p.ai_hits, 0, ok=True)
+                writer.submit(db.insert_analysis_runs, sid, [run])
+                writer.submit(db.update_source_status, sid, "skipped")
+                pre_counts.update(skipped=1)
+                tiers.update(["skip"])
+                analyzed_skipped += 1
+                print(f"[preprocess] skipped source_id={sid} ai_hits={p.ai_hits}")
+                return None
+            return p.text
+
+        def _write_analysis(wconn, entry: dict, msg: str) -> None:
+            """在写线程执行：记录调用、差分替换洞察并置为 analyzed。"""
+            diff = apply_entry(wconn, entry)
+            print(f"{msg} kept={diff['kept']} inserted={diff['inserted']} deleted={diff['deleted']}")
+
+        def _save(sid: str, res: RoutedAnalysis) -> None:
+            nonlocal analyzed_ok, analyzed_skipped, analyzed_err
+            tiers.update(r.tier for r in res.runs)
+            last = res.runs[-1]
+            if res.batch is None:
+                # 有结果时调用记录随 outbox 条目一起写入
+                writer.submit(db.insert_analysis_runs, sid, res.runs)
+            if res.decision.tier == "skip":
+                writer.submit(db.update_source_status, sid, "skipped")
+                analyzed_skipped += 1
+                print(f"[analyze] skipped source_id={sid} reason={res.decision.reason}")
+            elif res.batch is None:
+                writer.submit(db.update_source_status, sid, "error")
+                analyzed_err += 1
+                print(f"[analyze] error source_id={sid} tier={last.tier} err={res.error}")
+            else:
+                msg = (
+                    f"[analyze] ok source_id={sid} tier={last.tier} model={last.model} "
+                    f"latency_ms={last.latency_ms} insights={len(res.batch.items)}"
+                )
+                # 已付费的结果先落 outbox 日志，提交后确认
+                entry = outbox.record_analysis(sid, res.runs, res.batch.to_db_rows(source_id=sid))
+                writer.submit(
+                    _write_analysis,
+                    entry,
+                    msg,
+                    on_commit=partial(outbox.ack, entry["id"]),
+                    on_error=partial(self._write_failed, write_failed, sid),
+                )
+                analyzed_ok += 1
+
+        def _save_result(sid: str, fut) -> None:
+            nonlocal analyzed_err
+            try:
+                _save(sid, fut.result())
+            except Exception as e:  # noqa: BLE001
+                writer.submit(db.update_source_status, sid, "error")
+                analyzed_err += 1
+                print(f"[analyze] error source_id={sid} err={e}")
+
+        # 先处理所有待分析的视频（包括历史遗留数据）
+        print(f"[analyze] 处理所有待分析的视频（包括历史数据）...")
+        while not self.stop.is_set():
+            writer.flush()
+            to_analyze = [
+                t
+                for t in db.list_sources_needing_analysis(
+                    conn,
+                    min_publish_time_exclusive=None,  # 处理所有待分析的视频
+                    limit=self.analyze_limit,
+                )
+                if t.source_id not in write_failed
+            ]
+            if not to_analyze:
+                break
+
+            print(
+                f"[analyze] batch_size={len(to_analyze)} limit={self.analyze_limit} "
+                f"(publish_time > {max_time_before}) workers={self.analyze_workers}"
+            )
+
+            # 测试模式：阶段3最多分析 1 条（通常阶段2也只提取 1 条）
+            if self.test_mode:
+                to_analyze = to_analyze[:1]
+
+            # 并发调用 LLM，DB 写入交给写线程按组提交；
+            # 文案在提交前才单条读取，在途任务不超过 analyze_workers 个，内存占用与批大小无关
+            if self.analyze_workers == 1 or len(to_analyze) <= 1:
+                for task in to_analyze:
+                    if self.stop.is_set():
+                        break
+                    sid = task.source_id
+                    loaded = _load(task)
+                    if loaded is None:
                         continue
-                    future_map[ex.submit(_analyze_one, title, content_text)] = sid
 
-                for fut in as_completed(future_map):
-                    sid = future_map[fut]
+                    content_text, scan = loaded
                     try:
-                        res = fut.result()
-                        db.delete_tech_insights_for_source(conn, sid)
-                        db.insert_tech_insights(conn, res.to_db_rows(source_id=sid))
-                        db.update_source_status(conn, sid, "analyzed")
-                        analyzed_ok += 1
-                        print(f"[analyze] ok source_id={sid} insights={len(res.items)}")
+                        _save(
+                            sid,
+                            self.analyzer.analyze(title=task.title or "", content_text=content_text, scan=scan),
+                        )
                     except Exception as e:  # noqa: BLE001
-                        db.update_source_status(conn, sid, "error")
+                        writer.submit(db.update_source_status, sid, "error")
                         analyzed_err += 1
                         print(f"[analyze] error source_id={sid} err={e}")
+            else:
+                if self._analyze_pool is None:
+                    self._analyze_pool = ThreadPoolExecutor(max_workers=self.analyze_workers)
+                future_map = {}
+                for task in to_analyze:
+                    if self.stop.is_set():
+                        break
+                    sid = task.source_id
+                    loaded = _load(task)
+                    if loaded is None:
+                        continue
+                    future_map[self._analyze_pool.submit(self._analyze_one, task.title or "", *loaded)] = sid
+                    if len(future_map) >= self.analyze_workers:
+                        done, _ = wait(future_map, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            _save_result(future_map.pop(fut), fut)
+
+                # 收尾：在途请求即使收到停止信号也等待完成并落库
+                for fut in wait(future_map).done:
+                    _save_result(future_map[fut], fut)
+
+        writer.flush()
+        print(f"[analyze] done ok={analyzed_ok} skipped={analyzed_skipped} error={analyzed_err}")
+        print("[analyze] tiers " + " ".join(f"{k}={tiers[k]}" for k in ("skip", "cheap", "strong")))
+        if pre is not None:
+            pre_metrics = {
+                k: pre_counts[k]
+                for k in ("sources", "skipped", "chars_in", "chars_out", "boilerplate", "duplicates")
+            }
+            db.add_state_counters(conn, "preprocess.", pre_metrics)
+            print("[preprocess] " + " ".join(f"{k}={v}" for k, v in pre_metrics.items()))
 
-    print(f"[analyze] done ok={analyzed_ok} error={analyzed_err}")
+        # LLM 输出质量：本轮计数 + 累计值（pipeline_state 中的 llm.*）
+        metrics = self.llm_metrics.drain()
+        db.add_state_counters(conn, "llm.", metrics)
+        print("[analyze] llm " + " ".join(f"{k}={v}" for k, v in metrics.items()))
+
+    # 阶段 4 / 5：脉络链接与语义索引（只处理新增洞察）
+    def post_stage(self) -> None:
+        link_res = db.link_new_insights(self.conn, similar_threshold=self.cfg.link_similar_threshold)
+        print(
+            f"[link] new_insights={link_res['new_insights']} projects={link_res['projects']} "
+            f"changed_links={link_res['changed_links']} similar_links={link_res['similar_links']}"
+        )
 
-    conn.close()
+        # 阶段 5（可选）：语义索引增量更新（守护模式下 embedder 只加载一次）
+        if self.cfg.semantic_index:
+            try:
+                import semantic_index
+
+                if self._embedder is None:
+                    self._embedder = semantic_index.get_embedder(self.cfg.semantic_model)
+                indexed = semantic_index.index_new_insights(self.conn, self._embedder)
+                print(f"[semantic] model={self._embedder.name} indexed={indexed}")
+            except ImportError as e:
+                print(f"[semantic] skip: {e}")
+
+
+def run_daemon(pipeline: Pipeline, cfg: AppConfig) -> None:
+    """
+    常驻模式：每轮跑完整流水线，然后按自适应间隔等待下一轮。
+    SIGINT / SIGTERM 只设置停止标志：当前阶段不再提交新任务，在途任务落库后退出。
+    """
+    stop = pipeline.stop
+
+    def _on_signal(signum, _frame) -> None:
+        print(f"[daemon] signal={signal.Signals(signum).name} 等待在途任务完成后退出")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _on_signal)
+    signal.signal(signal.SIGTERM, _on_signal)
+
+    interval = AdaptiveInterval(
+        cfg.daemon_min_interval_s, cfg.daemon_max_interval_s, cfg.daemon_backoff_factor
+    )
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            new_items = pipeline.run_once()
+        except Exception as e:  # noqa: BLE001 - 单轮失败不终止守护进程
+            print(f"[daemon] round error={type(e).__name__}: {e}")
+            new_items = 0
+        sleep_s = interval.update(new_items)
+        print(
+            f"[daemon] round new={new_items} took={time.monotonic() - started:.1f}s "
+            f"next_in={sleep_s:.0f}s"
+        )
+        stop.wait(sleep_s)
+    print("[daemon] stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI 前沿信息追踪：同步→提取→分析")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="常驻运行：按自适应间隔循环执行（DAEMON_MIN/MAX_INTERVAL_S），Ctrl-C / SIGTERM 优雅退出",
+    )
+    parser.add_argument(
+        "--reanalyze-stale",
+        nargs="?",
+        type=int,
+        const=0,
+        default=None,
+        metavar="N",
+        help="先把旧提示词模板产出的来源重置为待分析（可限制最多 N 个），再正常运行",
+    )
+    args = parser.parse_args()
+
+    # --- 基础配置（skill 独立：默认 DB 在上级 assets/data.db）---
+    base_dir = Path(__file__).resolve().parent
+    default_db = base_dir.parent / "assets" / "data.db"
+    db_path = Path(os.getenv("DB_PATH", str(default_db)))
+    cfg = load_config()
+
+    pipeline = Pipeline(db_path, cfg)
+    try:
+        if args.reanalyze_stale is not None:
+            pipeline.mark_stale_prompts(args.reanalyze_stale or None)
+        if args.daemon:
+            run_daemon(pipeline, cfg)
+        else:
+            pipeline.run_once()
+    finally:
+        pipeline.close()
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,346 @@
+"""
+Schema 迁移（基于 PRAGMA user_version）：
+
+- MIGRATIONS 按版本号升序执行，每个迁移只运行一次；执行完立即写 user_version 并提交
+- v1 为基线：执行 database.SCHEMA_SQL，并把历史库补齐到该基线（补列、迁移内联文案、回填项目实体等）；
+  SCHEMA_SQL 已含迁移机制之前加入的列（text_len / canonical_project_id / duplicate_of），v1 用 add_column 容忍两种库
+- 之后的结构变更只追加新的迁移，不再修改 SCHEMA_SQL；加列一律用 add_column、建表建索引一律 IF NOT EXISTS，
+  列或表已存在（如手工补过、迁移中断后重跑）时跳过
+- 迁移必须幂等（中断后重跑安全）；大表回填用 backfill_in_chunks 分块提交，
+  进度记在 pipeline_state，写锁每次只持有一个分块的时间
+- 已是最新版本时，database.init_db 只读一次 user_version，不导入本模块
+
+本文件的 main() 用于查看版本 / 手动执行迁移。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+import database as db
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def _set_schema_version(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> bool:
+    """列不存在时 ALTER TABLE ADD COLUMN（只改表头，不重写数据），返回是否新增。"""
+    cols = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if column in cols:
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+
+def create_index(conn: sqlite3.Connection, sql: str) -> None:
+    """
+    单独一个事务建索引（CREATE INDEX IF NOT EXISTS ...）：
+    先提交之前的改动，避免把长时间的建索引和其他写入绑在同一把写锁里。
+    """
+    conn.commit()
+    conn.execute(sql)
+    conn.commit()
+
+
+def backfill_in_chunks(
+    conn: sqlite3.Connection,
+    *,
+    table: str,
+    set_sql: str,
+    where_sql: str = "1",
+    params: Sequence[Any] = (),
+    chunk_size: int = 2000,
+    state_key: str | None = None,
+) -> int:
+    """
+    按 rowid 区间分块执行 UPDATE {table} SET {set_sql} WHERE {where_sql}，每块单独提交。
+    state_key 非空时把已完成的 rowid 上界写入 pipeline_state，中断后从断点继续。
+    返回更新行数。
+    """
+    last = int(db.get_state(conn, state_key) or 0) if state_key else 0
+    max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+    total = 0
+    while last < max_rowid:
+        hi = last + int(chunk_size)
+        cur = conn.execute(
+            f"UPDATE {table} SET {set_sql} WHERE ({where_sql}) AND rowid > ? AND rowid <= ?",
+            (*params, last, hi),
+        )
+        total += cur.rowcount
+        last = hi
+        if state_key:
+            db.set_state(conn, state_key, str(last))
+        conn.commit()
+    return total
+
+
+# =========================
+# 迁移定义
+# =========================
+
+
+def _v1_baseline(conn: sqlite3.Connection) -> None:
+    conn.executescript(db.SCHEMA_SQL)
+
+    # 迁移机制之前的老库：补齐 SCHEMA_SQL 中后来加入的列（新库已在 CREATE TABLE 中，add_column 跳过）
+    add_column(conn, "raw_sources", "text_len", "INTEGER")
+    db.migrate_inline_content(conn)
+
+    for col in ("canonical_project_id", "duplicate_of"):
+        add_column(conn, "tech_insights", col, "INTEGER")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_canonical_project ON tech_insights(canonical_project_id)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicate_of ON tech_insights(duplicate_of)")
+    conn.execute("DROP INDEX IF EXISTS idx_project_key")
+
+    if db.backfill_canonical_projects(conn):
+        # 项目 key 变了：汇总表与同项目链都要按新 key 重建
+        db.rebuild_dimension_stats(conn)
+        db.relink_all_projects(conn)
+    # 已有数据但汇总表为空（老库首次升级）：一次性回填
+    elif (
+        conn.execute("SELECT 1 FROM dimension_stats LIMIT 1").fetchone() is None
+        and conn.execute("SELECT 1 FROM tech_insights LIMIT 1").fetchone() is not None
+    ):
+        db.rebuild_dimension_stats(conn)
+
+
+def _v2_source_status_index(conn: sqlite3.Connection) -> None:
+    # 阶段 2/3 的工作队列按 process_status 过滤、publish_time 排序
+    create_index(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_source_status_time ON raw_sources(process_status, publish_time)",
+    )
+
+
+def _v3_feed_sources(conn: sqlite3.Connection) -> None:
+    # 多账号抓取：sources 登记每个 feed 的入口、轮询间隔与限速；raw_sources.feed_id 为 NULL 表示默认账号
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sources (
+            feed_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            input_url TEXT NOT NULL UNIQUE,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            poll_interval_s INTEGER NOT NULL DEFAULT 3600,
+            rate_limit_per_min REAL NOT NULL DEFAULT 30,
+            top_n INTEGER NOT NULL DEFAULT 3,
+            last_polled_at INTEGER,
+            last_error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    add_column(conn, "raw_sources", "feed_id", "INTEGER REFERENCES sources(feed_id)")
+    create_index(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_source_feed_time ON raw_sources(feed_id, publish_time)",
+    )
+
+
+def _v4_prompt_hash(conn: sqlite3.Connection) -> None:
+    # 每条洞察记录产出它的提示词模板 hash（prompts.py），便于只重跑旧模板的结果
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS prompt_templates (
+            prompt_hash TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            response_format TEXT NOT NULL,
+            first_used_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    add_column(conn, "tech_insights", "prompt_hash", "TEXT")
+    create_index(
+        conn,
+        "CREATE INDEX IF NOT EXISTS idx_insight_prompt ON tech_insights(prompt_hash, source_id)",
+    )
+
+
+def _v5_analysis_runs(conn: sqlite3.Connection) -> None:
+    # 模型分级路由（router.py）：每次模型调用 / skip 决策一行，统计每个来源的成本与各档位延迟
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS analysis_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_id TEXT NOT NULL REFERENCES raw_sources(source_id),
+            tier TEXT NOT NULL,
+            model TEXT,
+            reason TEXT,
+            ai_hits INTEGER,
+            complexity INTEGER,
+            ok INTEGER NOT NULL,
+            latency_ms INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            cached_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    create_index(conn, "CREATE INDEX IF NOT EXISTS idx_run_source ON analysis_runs(source_id)")
+
+
+def _v6_boilerplate_phrases(conn: sqlite3.Connection) -> None:
+    # 预处理（preprocess.py）的套话词表：手动片段 + 从历史文案学到的高频分句
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS boilerplate_phrases (
+            phrase TEXT PRIMARY KEY,
+            kind TEXT NOT NULL DEFAULT 'fragment',
+            doc_freq INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _v7_impact_signal(conn: sqlite3.Connection) -> None:
+    # 保存 LLM 原始热度描述：关键词词表（keywords.json）修改后可直接重算 impact_score
+    add_column(conn, "tech_insights", "impact_signal", "TEXT")
+
+
+def _v8_insight_raw_items(conn: sqlite3.Connection) -> None:
+    # LLM 原始条目（JSON）与热表分离保存；派生列（impact_score、canonical_project_id 等）可随规则重算
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS insight_raw_items (
+            insight_id INTEGER PRIMARY KEY REFERENCES tech_insights(insight_id),
+            item TEXT NOT NULL,
+            legacy INTEGER NOT NULL DEFAULT 0  -- 1 = 由旧列回填（原始 impact_signal 已丢失）
+        )
+        """
+    )
+    # 旧行没有原始输出：用现有列拼出等价条目（raw_context 取 summary），分块提交、可断点续跑
+    state_key = "migrate.v8.raw_items"
+    last = int(db.get_state(conn, state_key) or 0)
+    max_id = conn.execute("SELECT COALESCE(MAX(insight_id), 0) FROM tech_insights").fetchone()[0]
+    while last < max_id:
+        hi = last + 5000
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO insight_raw_items (insight_id, item, legacy)
+            SELECT insight_id, json_object(
+                'dimension', dimension, 'project_name', project_name, 'tech_node', tech_node,
+                'evolution_tag', evolution_tag, 'impact_signal', impact_signal, 'raw_context', summary
+            ), impact_signal IS NULL
+            FROM tech_insights
+            WHERE insight_id > ? AND insight_id <= ?
+            """,
+            (last, hi),
+        )
+        last = hi
+        db.set_state(conn, state_key, str(last))
+        conn.commit()
+
+
+def _v9_rekey_projects(conn: sqlite3.Connection) -> None:
+    # 厂商前缀规则收紧（"Meta AI" / "Google AI" 不再同为 "ai"）：旧 key 已把不同项目合并
+    _rekey_projects(conn)
+
+
+def _v10_rekey_projects_words(conn: sqlite3.Connection) -> None:
+    # 字母数字混写的词不再拆开排序（"o4-mini" 与 "4o-mini" 曾得到同一个 key）
+    _rekey_projects(conn)
+
+
+def _rekey_projects(conn: sqlite3.Connection) -> None:
+    """项目实体全部由 project_name 派生：有别名 key 与当前归一化规则不一致时整体重建（单事务，中断即回滚）。"""
+    import project_normalizer as pn
+
+    stale = any(
+        pn.normalize_project_name(r["alias"])[0] != r["alias_key"]
+        for r in conn.execute("SELECT alias_key, alias FROM project_aliases WHERE TRIM(alias) <> ''")
+    )
+    if not stale:
+        return
+    conn.execute("UPDATE tech_insights SET canonical_project_id = NULL")
+    conn.execute("DELETE FROM project_aliases")
+    conn.execute("DELETE FROM projects")
+    db.backfill_canonical_projects(conn)
+    db.rebuild_dimension_stats(conn)
+    db.relink_all_projects(conn)
+
+
+def _v11_wal(conn: sqlite3.Connection) -> None:
+    # 写库线程组提交期间，查询 / 流水线主连接的读不再被阻塞或报 SQLITE_BUSY；journal_mode 持久保存在库文件中。
+    # 不能在事务中切换（上一步迁移已提交）；内存库保持 memory
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline schema + legacy upgrades", _v1_baseline),
+    Migration(2, "raw_sources(process_status, publish_time) index", _v2_source_status_index),
+    Migration(3, "sources feed registry + raw_sources.feed_id", _v3_feed_sources),
+    Migration(4, "tech_insights.prompt_hash + prompt_templates", _v4_prompt_hash),
+    Migration(5, "analysis_runs (model routing cost / latency)", _v5_analysis_runs),
+    Migration(6, "boilerplate_phrases (pre-LLM transcript cleaning)", _v6_boilerplate_phrases),
+    Migration(7, "tech_insights.impact_signal", _v7_impact_signal),
+    Migration(8, "insight_raw_items (raw LLM items for re-derivation)", _v8_insight_raw_items),
+    Migration(9, "re-key projects after vendor prefix rule fix", _v9_rekey_projects),
+    Migration(10, "re-key projects with word-level name tokens", _v10_rekey_projects_words),
+    Migration(11, "journal_mode = WAL", _v11_wal),
+]
+
+assert [m.version for m in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+assert MIGRATIONS[-1].version == db.SCHEMA_VERSION, "database.SCHEMA_VERSION 需与最新迁移一致"
+
+
+def pending_migrations(conn: sqlite3.Connection) -> list[Migration]:
+    current = schema_version(conn)
+    return [m for m in MIGRATIONS if m.version > current]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """依次执行未应用的迁移，返回迁移后的版本号。"""
+    for m in pending_migrations(conn):
+        m.apply(conn)
+        _set_schema_version(conn, m.version)
+        conn.commit()
+    return schema_version(conn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查看 / 执行 SQLite schema 迁移（PRAGMA user_version）")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--status", action="store_true", help="只显示当前版本与待执行的迁移")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    current = schema_version(conn)
+    pending = pending_migrations(conn)
+    print(f"[migrate] current={current} latest={db.SCHEMA_VERSION}")
+    for m in pending:
+        print(f"[migrate] pending v{m.version}: {m.description}")
+    if not args.status and pending:
+        print(f"[migrate] upgraded to v{migrate(conn)}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+本地 outbox 日志：外部接口（Coze 文案、LLM 分析）的结果一拿到就追加写入 JSONL 并 fsync，再交给写库线程；
+落库提交后追加一行确认（{"ack": id}）。进程在“拿到结果”与“提交”之间崩溃时，下次启动按日志重放，
+不必再次调用外部接口。
+
+- 条目：{"id", "kind": "text", "source_id", "text"}
+        {"id", "kind": "analysis", "source_id", "runs": [TierRun...], "rows": [TechInsightRecord...]}
+- 重放只作用于状态仍停在之前阶段的来源（文案：pending / error；分析：再加上 text_extracted），重放是幂等的
+- 末行写了一半（崩溃时）会被忽略；compact() 只保留未确认的条目，全部确认时清空文件
+- 默认路径为数据库同目录的 <库名>.outbox.jsonl（OUTBOX_PATH 覆盖）
+
+python outbox.py status / replay：查看或手动重放未确认条目。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Optional
+
+import database as db
+
+# 可重放的来源状态：来源已进入之后的阶段时跳过（说明结果已落库，或已被其它运行覆盖）
+_REPLAY_FROM = {
+    "text": ("pending", "error"),
+    "analysis": ("pending", "text_extracted", "error"),
+}
+
+
+def default_outbox_path(db_path: str | Path) -> Path:
+    p = Path(db_path)
+    return p.with_name(f"{p.stem}.outbox.jsonl")
+
+
+def apply_entry(conn: sqlite3.Connection, entry: dict[str, Any]) -> Optional[dict[str, int]]:
+    """把一条日志写入数据库（实时写入与重放共用）；分析条目返回 replace_insights 的差分计数。"""
+    sid = entry["source_id"]
+    if entry["kind"] == "text":
+        db.update_source_content(conn, sid, entry["text"], status="text_extracted")
+        return None
+    from router import TierRun
+
+    db.insert_analysis_runs(conn, sid, [TierRun(**r) for r in entry["runs"]])
+    return db.replace_insights(conn, sid, [db.TechInsightRecord(**r) for r in entry["rows"]], "analyzed")
+
+
+class Outbox:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._pending: dict[int, dict[str, Any]] = {}
+        self._next_id = 1
+        self._truncated = False
+        for entry in self._read():
+            if "ack" in entry:
+                self._pending.pop(entry["ack"], None)
+            else:
+                self._pending[entry["id"]] = entry
+            self._next_id = max(self._next_id, int(entry.get("id") or entry.get("ack") or 0) + 1)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        if self._truncated:
+            # 去掉写了一半的末行，否则后续追加会接在它后面
+            self.compact()
+
+    def _read(self) -> list[dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    self._truncated = True
+                    print(f"[outbox] skip truncated line in {self.path}")
+        return entries
+
+    def _write_line(self, obj: dict[str, Any]) -> None:
+        self._fh.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def pending(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [self._pending[k] for k in sorted(self._pending)]
+
+    def record_text(self, source_id: str, text: str) -> dict[str, Any]:
+        return self._append({"kind": "text", "source_id": source_id, "text": text})
+
+    def record_analysis(self, source_id: str, runs, rows) -> dict[str, Any]:
+        return self._append(
+            {
+                "kind": "analysis",
+                "source_id": source_id,
+                "runs": [asdict(r) for r in runs],
+                "rows": [r._asdict() for r in rows],
+            }
+        )
+
+    def _append(self, entry: dict[str, Any]) -> dict[str, Any]:
+        """写入并 fsync 后才返回：之后任何时刻崩溃，结果都能重放。"""
+        with self._lock:
+            entry = {"id": self._next_id, **entry}
+            self._next_id += 1
+            self._write_line(entry)
+            self._pending[entry["id"]] = entry
+        return entry
+
+    def ack(self, entry_id: int) -> None:
+        """条目已提交到数据库（由写库线程在 COMMIT 之后调用）。"""
+        with self._lock:
+            if self._pending.pop(entry_id, None) is not None:
+                self._fh.write(json.dumps({"ack": entry_id}) + "\n")
+                self._fh.flush()
+
+    def compact(self) -> None:
+        """重写日志，只保留未确认的条目（先写临时文件再原子替换）。"""
+        with self._lock:
+            self._fh.close()
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for k in sorted(self._pending):
+                    f.write(json.dumps(self._pending[k], ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._fh = open(self.path, "a", encoding="utf-8")
+
+    def replay(self, conn: sqlite3.Connection) -> dict[str, int]:
+        """
+        把未确认的条目按写入顺序补写到数据库并提交，然后压缩日志。
+        返回 {"replayed", "stale", "failed"}；失败的条目保留在日志中，下次启动再试。
+        """
+        counts = {"replayed": 0, "stale": 0, "failed": 0}
+        for entry in self.pending():
+            row = conn.execute(
+                "SELECT process_status FROM raw_sources WHERE source_id = ?", (entry["source_id"],)
+            ).fetchone()
+            if row is None or row["process_status"] not in _REPLAY_FROM[entry["kind"]]:
+                counts["stale"] += 1
+                self.ack(entry["id"])
+                continue
+            try:
+                apply_entry(conn, entry)
+                conn.commit()
+            except Exception as e:  # noqa: BLE001 - 单条失败不影响其它条目
+                conn.rollback()
+                counts["failed"] += 1
+                print(f"[outbox] replay error id={entry['id']} source_id={entry['source_id']} err={e}")
+                continue
+            counts["replayed"] += 1
+            self.ack(entry["id"])
+        self.compact()
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="outbox 日志：查看 / 重放未落库的外部接口结果")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--outbox", default=os.getenv("OUTBOX_PATH"), help="日志路径（默认 <库名>.outbox.jsonl）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="列出未确认的条目")
+    sub.add_parser("replay", help="把未确认的条目写入数据库")
+    args = parser.parse_args()
+
+    outbox = Outbox(args.outbox or default_outbox_path(args.db_path))
+    if args.command == "status":
+        for e in outbox.pending():
+            size = len(e["text"]) if e["kind"] == "text" else len(e["rows"])
+            print(f"{e['id']:>6}  {e['kind']:<8} {e['source_id']}  size={size}")
+        print(f"[outbox] path={outbox.path} pending={outbox.pending_count}")
+    else:
+        conn = db.connect(args.db_path)
+        db.init_db(conn)
+        counts = outbox.replay(conn)
+        conn.close()
+        print("[outbox] " + " ".join(f"{k}={v}" for k, v in counts.items()))
+    outbox.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+提取与分析之间的本地预处理（不调用模型，单条文案毫秒级）：
+
+- 按标点切成分句；含口播套话片段（“感谢你看到这里”“点个赞”等）的分句整句删除
+- 套话词表 = 内置种子片段 + boilerplate_phrases 表：
+  - fragment：手动添加的片段（python preprocess.py add ...），分句包含即删除
+  - sentence：从历史文案学到的高频分句（python preprocess.py learn），规范化后完全相同才删除
+- 同一文案内重复出现的分句只保留第一次
+- 按 keywords.json 的维度词表给各维度打关键词分（标题 + 清洗后正文）；AI 相关词命中数不足
+  MIN_AI_HITS 的视频整条跳过（process_status = skipped），不再送入 LLM；扫描结果（Prepared.scan）交给路由复用
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+import database as db
+import keywords
+
+# 口播套话种子片段（分句包含即删除）
+SEED_FRAGMENTS = (
+    "感谢你看到这里",
+    "感谢大家观看",
+    "点个赞",
+    "点赞关注",
+    "点赞收藏",
+    "一键三连",
+    "关注产品君",
+    "记得关注",
+    "我们下期再见",
+    "下期见",
+    "评论区告诉我",
+    "评论区留言",
+)
+
+_CLAUSE_SPLIT_RE = re.compile(r"([，,。！？!?；;：:\n]+)")
+_NORMALIZE_RE = re.compile(r"[\s\W_]+")
+_MIN_DEDUP_LEN = 6  # 规范化后短于此长度的分句（“比如”“一、”）不参与去重
+_LEARN_MIN_LEN = 4
+_LEARN_MAX_LEN = 40
+_LEARN_EDGE_CLAUSES = 3  # 套话集中在开头 / 结尾，只统计首尾各 3 个分句，避免把正文常用语学进来
+
+
+def normalize_clause(clause: str) -> str:
+    return _NORMALIZE_RE.sub("", clause).casefold()
+
+
+@dataclass(frozen=True)
+class Prepared:
+    text: str
+    chars_in: int
+    boilerplate: int
+    duplicates: int
+    ai_hits: int
+    dimension_scores: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def scan(self) -> keywords.KeywordScan:
+        """清洗后文案的关键词扫描结果（router.classify 直接复用，不再扫描一遍）。"""
+        return keywords.KeywordScan(ai_hits=self.ai_hits, dimension_scores=self.dimension_scores)
+
+
+class Preprocessor:
+    def __init__(
+        self,
+        fragments: Iterable[str] = SEED_FRAGMENTS,
+        sentences: Iterable[str] = (),
+        *,
+        engine: Optional[keywords.KeywordEngine] = None,
+    ):
+        self.fragments = tuple(f for f in (normalize_clause(x) for x in fragments) if f)
+        self.sentences = frozenset(sentences)
+        self.engine = engine or keywords.get_engine()
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> "Preprocessor":
+        rows = db.list_boilerplate_phrases(conn)
+        return cls(
+            fragments=[*SEED_FRAGMENTS, *(r.phrase for r in rows if r.kind == "fragment")],
+            sentences=[r.phrase for r in rows if r.kind == "sentence"],
+        )
+
+    def is_boilerplate(self, norm: str) -> bool:
+        return norm in self.sentences or any(f in norm for f in self.fragments)
+
+    def prepare(self, title: str | None, text: str) -> Prepared:
+        parts = _CLAUSE_SPLIT_RE.split(text or "")
+        kept: list[str] = []
+        seen: set[str] = set()
+        boilerplate = duplicates = 0
+        # parts 交替为 分句、分隔符、分句……；分隔符跟随前一个分句保留或删除
+        for k in range(0, len(parts), 2):
+            clause, sep = parts[k], (parts[k + 1] if k + 1 < len(parts) else "")
+            norm = normalize_clause(clause)
+            if not norm:
+                continue
+            if self.is_boilerplate(norm):
+                boilerplate += 1
+                continue
+            if len(norm) >= _MIN_DEDUP_LEN:
+                if norm in seen:
+                    duplicates += 1
+                    continue
+                seen.add(norm)
+            kept.append(clause + sep)
+        cleaned = "".join(kept).strip()
+        scan = self.engine.scan(f"{title or ''}\n{cleaned}")
+        return Prepared(cleaned, len(text or ""), boilerplate, duplicates, scan.ai_hits, scan.dimension_scores)
+
+
+def learn_boilerplate(
+    conn: sqlite3.Connection, *, min_df: int = 5, max_samples: Optional[int] = None
+) -> dict[str, int]:
+    """
+    统计首尾分句出现在多少条文案中（文档频率），>= min_df 且不含 AI 相关词的分句视为套话，
+    覆盖写入 boilerplate_phrases（kind = sentence）。返回 分句 -> 文档频率。
+    """
+    engine = keywords.get_engine()
+    df: Counter[str] = Counter()
+    for text in db.iter_source_contents(conn, limit=max_samples):
+        clauses = [c for c in map(normalize_clause, _CLAUSE_SPLIT_RE.split(text)[::2]) if c]
+        edges = {*clauses[:_LEARN_EDGE_CLAUSES], *clauses[-_LEARN_EDGE_CLAUSES:]}
+        df.update(c for c in edges if _LEARN_MIN_LEN <= len(c) <= _LEARN_MAX_LEN)
+    learned = {c: n for c, n in df.items() if n >= min_df and engine.scan(c).ai_hits == 0}
+    db.replace_learned_boilerplate(conn, learned)
+    return learned
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="文案预处理：套话词表学习 / 维护，预览清洗效果")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_learn = sub.add_parser("learn", help="从已有文案学习高频套话分句")
+    p_learn.add_argument("--min-df", type=int, default=5, help="至少出现在多少条文案中（默认 5）")
+    p_learn.add_argument("--max-samples", type=int, default=None, help="最多统计的文案数（默认全部）")
+    p_add = sub.add_parser("add", help="手动添加套话片段（分句包含即删除）")
+    p_add.add_argument("phrases", nargs="+")
+    sub.add_parser("list", help="列出套话词表")
+    p_show = sub.add_parser("show", help="预览某来源的清洗结果与维度预评分")
+    p_show.add_argument("source_id")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    if args.command == "learn":
+        learned = learn_boilerplate(conn, min_df=args.min_df, max_samples=args.max_samples)
+        print(f"[preprocess] learned_sentences={len(learned)}")
+        for phrase, n in sorted(learned.items(), key=lambda x: -x[1])[:30]:
+            print(f"    {n:>5}  {phrase}")
+    elif args.command == "add":
+        for phrase in args.phrases:
+            db.add_boilerplate_phrase(conn, normalize_clause(phrase), kind="fragment")
+        print(f"[preprocess] added={len(args.phrases)}")
+    elif args.command == "list":
+        print("seed fragments: " + " / ".join(SEED_FRAGMENTS))
+        for r in db.list_boilerplate_phrases(conn):
+            print(f"{r.kind:<8} {r.doc_freq or '-':>5}  {r.phrase}")
+    else:
+        row = conn.execute("SELECT title FROM raw_sources WHERE source_id = ?", (args.source_id,)).fetchone()
+        text = db.get_source_content(conn, args.source_id)
+        if row is None or text is None:
+            raise SystemExit(f"来源不存在或尚无文案：{args.source_id}")
+        p = Preprocessor.load(conn).prepare(row["title"], text)
+        print(
+            f"chars {p.chars_in} -> {len(p.text)} boilerplate={p.boilerplate} duplicates={p.duplicates} "
+            f"ai_hits={p.ai_hits} dimensions={p.dimension_scores}"
+        )
+        print(p.text)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+项目名归一化（纯函数，不依赖数据库）：
+
+- NFKC（全角/半角统一）+ casefold
+- 按空白 / 标点切词（拉丁字母与其他文字相接处也切开），按词排序
+  （"Gemini Pro 1.5" 与 "Gemini 1.5 Pro"、"GPT-4o" 与 "gpt 4o" 得到同一个 key）
+- 字母数字混写的词保持完整，只在 >= 3 个字母的名字后接版本号时拆开（"gemini3" == "gemini 3"，
+  "gpt4o" == "gpt 4o"）；"o4-mini" 与 "4o-mini"、"GPT-4o mini" 与 "GPT o4-mini" 不会混为一谈
+- 版本号末尾的 ".0" 去掉（"Gemini 3.0" == "Gemini 3"）
+- 与字母混写的中文数字转为阿拉伯数字（"gemini三" == "gemini 3"）
+- 去掉开头的厂商前缀（"OpenAI GPT-4" == "GPT-4"），但剩余部分必须足够具体：
+  只剩泛称或型号字母/数字时保留前缀（"Meta AI" != "Google AI"，"OpenAI o1" 不会变成 "o1"），
+  这类写法如需合并请写进别名词典
+- 别名词典（project_aliases.json）把 ASR 误听等无法规则化的写法映射到规范名
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+
+_TOKEN_RE = re.compile(r"(?:[a-z]+|\d+(?:\.\d+)*)+|[^\W\da-z_]+")
+_NAME_VERSION_RE = re.compile(r"([a-z]{3,})(\d.*)")
+_VERSION_RE = re.compile(r"\d+(?:\.\d+)*")
+_CN_DIGITS = str.maketrans("零一二三四五六七八九", "0123456789")
+_CN_DIGIT_CHARS = frozenset("零一二三四五六七八九")
+# 去掉厂商前缀后不足以区分项目的泛称（含规格后缀）
+_GENERIC_TOKENS = frozenset(
+    {
+        "ai", "intelligence", "llm", "model", "models", "app", "api", "chat", "assistant", "agent",
+        "cloud", "lab", "labs", "research", "studio", "platform",
+        "pro", "max", "mini", "plus", "ultra", "lite", "nano", "turbo",
+        "智能", "人工智能", "模型", "大模型", "助手", "云",
+    }
+)
+
+FUZZY_MIN_RATIO = 0.8
+FUZZY_MIN_LENGTH = 4
+
+
+def _default_alias_path() -> Path:
+    p = os.getenv("PROJECT_ALIASES_PATH")
+    return Path(p) if p else Path(__file__).resolve().parent / "project_aliases.json"
+
+
+@lru_cache(maxsize=4)
+def _load_alias_file(path: str) -> tuple[frozenset[str], dict[str, str]]:
+    p = Path(path)
+    if not p.exists():
+        return frozenset(), {}
+    data = json.loads(p.read_text(encoding="utf-8"))
+    prefixes = frozenset(str(x).casefold() for x in data.get("vendor_prefixes", []))
+    # 先用“无词典”的规则得到 key，再建立 别名 key -> 规范名 的映射
+    aliases: dict[str, str] = {}
+    for canonical, alias_list in (data.get("aliases") or {}).items():
+        for name in [canonical, *alias_list]:
+            key = _rule_key(name, prefixes)
+            if key:
+                aliases[key] = canonical
+    return prefixes, aliases
+
+
+def _rule_key(name: str, vendor_prefixes: frozenset[str]) -> str:
+    s = unicodedata.normalize("NFKC", name or "").casefold()
+    tokens = _TOKEN_RE.findall(s)
+    if not tokens:
+        return ""
+
+    has_latin = re.search(r"[a-z]", s) is not None
+    out: list[str] = []
+    for t in tokens:
+        if has_latin and set(t) <= _CN_DIGIT_CHARS:
+            t = t.translate(_CN_DIGITS)
+        m = _NAME_VERSION_RE.fullmatch(t)
+        if m:
+            out.append(m.group(1))
+            t = m.group(2)
+        if _VERSION_RE.fullmatch(t):
+            while t.endswith(".0"):
+                t = t[:-2]
+        out.append(t)
+
+    if len(out) > 1 and out[0] in vendor_prefixes and _is_specific(out[1:]):
+        out = out[1:]
+    return " ".join(sorted(out))
+
+
+def _is_specific(tokens: list[str]) -> bool:
+    """至少含一个非泛称的名字 token（拉丁 >= 3 个字母，其他文字 >= 2 个字），才能脱离厂商前缀单独成名。"""
+    return any(
+        not t[0].isdigit()
+        and t not in _GENERIC_TOKENS
+        and len(t) >= (3 if t.isascii() else 2)
+        for t in tokens
+    )
+
+
+@lru_cache(maxsize=65536)
+def normalize_project_name(name: str, alias_path: Optional[str] = None) -> tuple[str, Optional[str]]:
+    """
+    返回 (key, canonical_name)：
+    - key：用于精确匹配的归一化 key（空项目名返回 ""）
+    - canonical_name：命中别名词典时的规范名，否则 None
+
+    回归用例（python -m doctest project_normalizer.py）：
+
+    >>> key = lambda n: normalize_project_name(n)[0]
+    >>> key("o4-mini"), key("4o-mini")
+    ('mini o4', '4o mini')
+    >>> key("GPT-4o mini"), key("GPT o4-mini")
+    ('4o gpt mini', 'gpt mini o4')
+    >>> key("GPT-4o") == key("gpt 4o") == key("gpt4o")
+    True
+    >>> key("Gemini 1.5 Pro") == key("Gemini Pro 1.5") == key("gemini1.5 pro")
+    True
+    >>> key("Gemini 3.0") == key("gemini3") == key("Gemini三")
+    True
+    >>> key("OpenAI GPT-4") == key("GPT-4")
+    True
+    >>> key("Meta AI"), key("Google AI"), key("OpenAI o1")
+    ('ai meta', 'ai google', 'o1 openai')
+    """
+    prefixes, aliases = _load_alias_file(alias_path or str(_default_alias_path()))
+    key = _rule_key(name, prefixes)
+    canonical = aliases.get(key)
+    if canonical is not None:
+        key = _rule_key(canonical, prefixes)
+    return key, canonical
+
+
+def block_key(key: str) -> str:
+    """模糊匹配的分块 key：最长的非数字 token 的前 2 个字符（没有则用整个 key）。"""
+    words = [t for t in key.split(" ") if t and not t[0].isdigit()]
+    if not words:
+        return key[:2]
+    return max(words, key=len)[:2]
+
+
+def digit_signature(key: str) -> tuple[str, ...]:
+    return tuple(t for t in key.split(" ") if t and t[0].isdigit())
+
+
+def fuzzy_ratio(a: str, b: str) -> float:
+    """
+    两个 key 的相似度（0~1），只接受“空格差异”或“单个 token 内的拼写差异”：
+    - 版本号不同（"gpt 4" vs "gpt 5"）直接视为不相似
+    - 去掉空格后相同（"eleven labs" vs "elevenlabs"）视为相同
+    - 否则 token 数必须一致且只有一个 token 不同；该 token 首尾字符一致、长度 >= 4
+      （"grok" vs "grock" 可以；"cloud" vs "cloudy"、"gpt 4 api" vs "gpt 4o api" 不行）
+    - 非拉丁 token 只接受等长替换
+    """
+    if digit_signature(a) != digit_signature(b):
+        return 0.0
+    if a.replace(" ", "") == b.replace(" ", ""):
+        return 1.0
+    ta, tb = a.split(" "), b.split(" ")
+    if len(ta) != len(tb):
+        return 0.0
+    only_a = Counter(ta) - Counter(tb)
+    only_b = Counter(tb) - Counter(ta)
+    if sum(only_a.values()) != 1 or sum(only_b.values()) != 1:
+        return 0.0
+    x, y = next(iter(only_a)), next(iter(only_b))
+    if min(len(x), len(y)) < FUZZY_MIN_LENGTH or x[0] != y[0] or x[-1] != y[-1]:
+        return 0.0
+    # 中文等非拉丁 token 只接受等长替换（"仿人机器人" vs "仿生机器人"），避免泛称互相吞并
+    if not x[0].isascii() and len(x) != len(y):
+        return 0.0
+    return SequenceMatcher(None, x, y).ratio()
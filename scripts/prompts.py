@@ -0,0 +1,96 @@
+"""
+LLM 提示词模板登记（按版本管理）：
+
+- 每个模板拆成“静态前缀”（角色、维度定义、输出格式、要求）与“变量部分”（标题、正文）
+- 请求布局：静态前缀整体放在 system 消息，变量部分单独作为最后一条 user 消息，
+  前缀逐字节稳定，服务端 prompt caching 可以跨视频复用
+- prompt_hash = 静态前缀 + 变量模板的 sha256 前 16 位，随每条 tech_insights 落库；
+  改了措辞就是新 hash，可只重跑旧模板产出的来源（main.py --reanalyze-stale）
+
+修改已有模板的措辞时请新增版本（如 insight_v2），不要原地改写旧版本。
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Literal
+
+ResponseFormat = Literal["text", "json_schema"]
+
+
+_INSIGHT_V1_INSTRUCTIONS = (
+    "你是一个严格按要求输出 JSON 的信息抽取助手。\n\n"
+    "# Role\n"
+    "你是一位 AI 行业进化史记录专家，擅长从碎片化的快讯中捕捉技术的“进化节点”。\n\n"
+    "# Task\n"
+    "分析输入的新闻/快讯，提炼技术进展。即使信息模糊，也要根据功能描述推断其所属的最相关维度。\n\n"
+    '# Strategy: "Relaxed & Insightful"\n'
+    "1. **多重归类**：如果一个项目既是AI编程又涉及视频生成（如：全自动写脚本做动画），请同时记录在两个维度下。\n"
+    "2. **捕捉 Vibe Coding 信号**：关注那些“动动嘴”、“不会代码也能做”、“全自动生成页面”的描述，这些归入 [AI编程/Vibe Coding]。\n"
+    "3. **推断缺失信息**：未提及机构时记录为“开源/个人项目”。\n\n"
+    "# Dimensions Definition\n"
+    "- LLM: 文本、代码逻辑、长文本理解、模型架构。\n"
+    "- VLM: 视觉理解、OCR、4D/3D感知、物体分割。\n"
+    "- 视频生成: 视频模型、数字人、特效、3D重建。\n"
+    "- 音频/TTS/ASR: 声音克隆、转录、实时对话、情感语音。\n"
+    "- 具身智能: 机器人、自动操作电脑(Desktop Agent)、自动驾驶、物理交互。\n"
+    "- AI编程/Vibe Coding: 自然语言编程、全自动代码生成、Figma2Code、自进化编程助手。\n"
+    "- AI应用: 除去编程外的垂直行业工具（如：教育、表格、医疗助手）。\n\n"
+    "# Output Format (JSON ONLY)\n"
+    "[\n"
+    "  {\n"
+    '    "dimension": "维度名称",\n'
+    '    "project_name": "项目/产品名",\n'
+    '    "tech_node": "核心技术点（描述进化脉络，例如：从代码补全到UI全自动生成）",\n'
+    '    "evolution_tag": "标签（如：开源 / 突破性体验 / 商业落地 / VibeCoding）",\n'
+    '    "impact_signal": "文中提到的热度信息（如：爆火、彻底改变产品开发流程等）",\n'
+    '    "raw_context": "简短原始摘要"\n'
+    "  }\n"
+    "]\n"
+)
+
+_REQUIREMENTS: dict[str, str] = {
+    "text": "要求：只输出 JSON 数组，不要输出任何额外文字。",
+    "json_schema": '要求：按给定 schema 输出 {"items": [上述对象...]}。',
+}
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    instructions: str
+    user_template: str = "输入标题：{title}\n输入正文：{body}\n"
+
+    def prefix(self, response_format: ResponseFormat = "text") -> str:
+        """静态前缀（system 消息），同一模板 + 输出模式下逐字节不变。"""
+        return f"{self.instructions}\n{_REQUIREMENTS[response_format]}\n"
+
+    def render_user(self, *, title: str | None, body: str | None) -> str:
+        return self.user_template.format(title=(title or "").strip(), body=(body or "").strip())
+
+    def hash(self, response_format: ResponseFormat = "text") -> str:
+        h = hashlib.sha256()
+        h.update(self.prefix(response_format).encode("utf-8"))
+        h.update(b"\0")
+        h.update(self.user_template.encode("utf-8"))
+        return h.hexdigest()[:16]
+
+
+TEMPLATES: dict[str, PromptTemplate] = {
+    t.name: t
+    for t in (
+        PromptTemplate(name="insight_v1", version=1, instructions=_INSIGHT_V1_INSTRUCTIONS),
+    )
+}
+
+DEFAULT_TEMPLATE = "insight_v1"
+
+
+def get_template(name: str | None = None) -> PromptTemplate:
+    key = name or DEFAULT_TEMPLATE
+    try:
+        return TEMPLATES[key]
+    except KeyError:
+        raise KeyError(f"未知的提示词模板：{key}（可选：{', '.join(TEMPLATES)}）") from None
@@ -33,16 +33,17 @@ def fetch_dimension_timeline(
     limit: Optional[int] = None,
     since_ts: Optional[int] = None,
     until_ts: Optional[int] = None,
+    include_duplicates: bool = False,
 ) -> list[dict[str, Any]]:
     """
     指定技术维度，并按时间顺序（从旧到新）拉取数据，展示技术脉络。
+    默认隐藏被标记为近重复（duplicate_of 非空）的条目。
 
     返回字段：
     - publish_time, source_url
     - project_name, tech_node, evolution_tag, impact_score, summary
     """
-    conn = db.connect(db_path)
-    db.init_db(conn)  # 确保表存在
+    conn = db.connect_for_query(db_path)
 
     sql = """
     SELECT
@@ -58,6 +59,8 @@ def fetch_dimension_timeline(
     WHERE i.dimension = ?
     """
     params: list[Any] = [dimension]
+    if not include_duplicates:
+        sql += " AND i.duplicate_of IS NULL"
     if since_ts is not None:
         sql += " AND s.publish_time >= ?"
         params.append(since_ts)
@@ -75,6 +78,214 @@ def fetch_dimension_timeline(
     return [dict(r) for r in rows]
 
 
+def fetch_project_timeline(
+    *,
+    db_path: str | Path,
+    project: str,
+    limit: Optional[int] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    include_duplicates: bool = False,
+) -> tuple[list[str], list[dict[str, Any]]]:
+    """
+    按项目（任意别名写法）拉取时间轴：先归一化到 canonical_project_id，再走 idx_canonical_project。
+    返回 (该项目的全部别名, 记录列表)。
+    """
+    conn = db.connect_for_query(db_path)
+    project_id = db.resolve_project_id(conn, project, create=False)
+    if project_id is None:
+        conn.close()
+        return [], []
+
+    sql = """
+    SELECT
+        s.publish_time,
+        s.source_url,
+        i.dimension,
+        i.project_name,
+        i.tech_node,
+        i.evolution_tag,
+        i.impact_score,
+        i.summary
+    FROM tech_insights i
+    JOIN raw_sources s ON i.source_id = s.source_id
+    WHERE i.canonical_project_id = ?
+    """
+    params: list[Any] = [project_id]
+    if not include_duplicates:
+        sql += " AND i.duplicate_of IS NULL"
+    if since_ts is not None:
+        sql += " AND s.publish_time >= ?"
+        params.append(since_ts)
+    if until_ts is not None:
+        sql += " AND s.publish_time <= ?"
+        params.append(until_ts)
+    sql += " ORDER BY s.publish_time ASC, i.insight_id ASC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+
+    rows = conn.execute(sql, params).fetchall()
+    aliases = db.list_project_aliases(conn, project_id)
+    conn.close()
+    return aliases, [dict(r) for r in rows]
+
+
+def fetch_semantic_matches(
+    *,
+    db_path: str | Path,
+    query: str,
+    model: Optional[str] = None,
+    limit: int = 10,
+    dimension: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    include_duplicates: bool = False,
+) -> list[dict[str, Any]]:
+    """
+    语义检索：用本地 embedding 模型（不联网）对 query 编码，在 insight_embeddings 中取余弦 top-k。
+    需先开启 SEMANTIC_INDEX 跑过 main.py，且 model 与建索引时一致。
+    """
+    import semantic_index
+
+    embedder = semantic_index.get_embedder(model, offline=True)
+    conn = db.connect_for_query(db_path)
+    items = semantic_index.search(
+        conn,
+        embedder,
+        query,
+        top_k=limit,
+        dimension=dimension,
+        since_ts=since_ts,
+        until_ts=until_ts,
+        include_duplicates=include_duplicates,
+    )
+    conn.close()
+    return items
+
+
+def fetch_dimension_stats(
+    *,
+    db_path: str | Path,
+    granularity: str = "week",
+    dimension: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+) -> list[dict[str, Any]]:
+    """
+    读取 dimension_stats 汇总表：每个维度在每个时间桶内的条数、平均/最高影响力、项目数。
+    只扫描汇总表主键范围，代价与桶数成正比，不扫描 tech_insights。
+    全量重建汇总表是维护操作：python rederive.py --rebuild-stats
+    """
+    conn = db.connect_for_query(db_path)
+
+    sql = """
+    SELECT bucket, dimension, insight_count, impact_sum, impact_max, project_count
+    FROM dimension_stats
+    WHERE granularity = ?
+    """
+    params: list[Any] = [granularity]
+    if dimension is not None:
+        sql += " AND dimension = ?"
+        params.append(dimension)
+    if since_ts is not None:
+        sql += " AND bucket >= ?"
+        params.append(db.stats_bucket_for_ts(since_ts, granularity))
+    if until_ts is not None:
+        sql += " AND bucket <= ?"
+        params.append(db.stats_bucket_for_ts(until_ts, granularity))
+    sql += " ORDER BY bucket ASC, dimension ASC"
+
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+
+    out: list[dict[str, Any]] = []
+    for r in rows:
+        d = dict(r)
+        d["impact_avg"] = d["impact_sum"] / d["insight_count"] if d["insight_count"] else 0.0
+        out.append(d)
+    return out
+
+
+def fetch_top_projects(
+    *,
+    db_path: str | Path,
+    granularity: str = "month",
+    dimension: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    limit: int = 10,
+) -> list[dict[str, Any]]:
+    """
+    按 impact_score 总和排序的项目榜单（来自 dimension_project_stats）。
+    - 不传时间范围时默认取当前所在的桶（例如“本月”）
+    """
+    if since_ts is None and until_ts is None:
+        since_ts = until_ts = int(_dt.datetime.now().timestamp())
+
+    conn = db.connect_for_query(db_path)
+
+    sql = """
+    SELECT
+        project_key,
+        MAX(project_name) AS project_name,
+        SUM(insight_count) AS insight_count,
+        SUM(impact_sum) AS impact_sum,
+        MAX(impact_max) AS impact_max,
+        COUNT(DISTINCT dimension) AS dimension_count
+    FROM dimension_project_stats
+    WHERE granularity = ? AND project_key <> ''
+    """
+    params: list[Any] = [granularity]
+    if dimension is not None:
+        sql += " AND dimension = ?"
+        params.append(dimension)
+    if since_ts is not None:
+        sql += " AND bucket >= ?"
+        params.append(db.stats_bucket_for_ts(since_ts, granularity))
+    if until_ts is not None:
+        sql += " AND bucket <= ?"
+        params.append(db.stats_bucket_for_ts(until_ts, granularity))
+    sql += " GROUP BY project_key ORDER BY impact_sum DESC, insight_count DESC LIMIT ?"
+    params.append(int(limit))
+
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def fetch_insight_graph(
+    *,
+    db_path: str | Path,
+    ancestors_of: Optional[int] = None,
+    descendants_of: Optional[int] = None,
+    project: Optional[str] = None,
+    relation_type: Optional[str] = None,
+    max_depth: int = 1000,
+) -> list[dict[str, Any]]:
+    """
+    技术脉络图查询（insight_links，递归 CTE）：
+    - ancestors_of：某条洞察的全部前驱
+    - descendants_of：某条洞察的全部后继
+    - project：某项目的完整进化链（按时间从旧到新）
+    """
+    conn = db.connect_for_query(db_path)
+    if ancestors_of is not None:
+        rows = db.get_insight_ancestors(
+            conn, ancestors_of, relation_type=relation_type, max_depth=max_depth
+        )
+    elif descendants_of is not None:
+        rows = db.get_insight_descendants(
+            conn, descendants_of, relation_type=relation_type, max_depth=max_depth
+        )
+    elif project is not None:
+        rows = db.get_project_chain(conn, project)
+    else:
+        rows = []
+    conn.close()
+    return [dict(r) for r in rows]
+
+
 def _fmt_ts(ts: int | None) -> str:
     if not ts:
         return "-"
@@ -96,57 +307,35 @@ def _date_to_end_ts(date_str: str) -> int:
     return int(dt.replace(hour=23, minute=59, second=59, microsecond=999999).timestamp())
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="查询 tech_insights 技术脉络（按维度时间轴）")
-    parser.add_argument(
-        "--db",
-        default=str(Path(__file__).resolve().parent.parent / "assets" / "data.db"),
-        help="SQLite 文件路径（默认当前目录 data.db）",
-    )
-    parser.add_argument(
-        "--list-dimensions",
-        action="store_true",
-        help="输出支持的技术维度列表",
-    )
-    parser.add_argument(
-        "--dimension",
-        default=None,
-        help="要查询的维度名称（例如：AI编程/Vibe Coding）",
-    )
-    parser.add_argument("--limit", type=int, default=None, help="最多返回多少条（默认不限制）")
+def _add_time_range_args(parser: argparse.ArgumentParser, default: Any = None) -> None:
+    """子命令传 default=argparse.SUPPRESS：未在子命令后给出时沿用主命令上的值，而不是被 None 覆盖。"""
     parser.add_argument(
         "--months",
         type=int,
-        default=None,
+        default=default,
         help="仅查询最近 N 个月内的记录（与 --since/--until 同时存在时优先）",
     )
     parser.add_argument(
         "--days",
         type=int,
-        default=None,
+        default=default,
         help="仅查询最近 N 天内的记录（与 --since/--until 同时存在时优先）",
     )
     parser.add_argument(
         "--since",
-        default=None,
+        default=default,
         metavar="YYYY-MM-DD",
         help="起始日期（闭区间，含当日 00:00:00）",
     )
     parser.add_argument(
         "--until",
-        default=None,
+        default=default,
         metavar="YYYY-MM-DD",
         help="结束日期（闭区间，含当日 23:59:59）",
     )
-    args = parser.parse_args()
-
-    if args.list_dimensions:
-        print("\n".join(get_supported_dimensions()))
-        return
 
-    if not args.dimension:
-        raise SystemExit("请提供 --dimension，或使用 --list-dimensions 查看可用维度。")
 
+def _resolve_time_range(args: argparse.Namespace) -> tuple[Optional[int], Optional[int]]:
     since_ts: Optional[int] = None
     until_ts: Optional[int] = None
     now = _dt.datetime.now()
@@ -161,20 +350,79 @@ def main() -> None:
             since_ts = _date_to_start_ts(args.since)
         if args.until is not None:
             until_ts = _date_to_end_ts(args.until)
+    return since_ts, until_ts
 
-    items = fetch_dimension_timeline(
+
+def _print_stats(args: argparse.Namespace) -> None:
+    since_ts, until_ts = _resolve_time_range(args)
+    items = fetch_dimension_stats(
         db_path=args.db,
+        granularity=args.granularity,
         dimension=args.dimension,
-        limit=args.limit,
         since_ts=since_ts,
         until_ts=until_ts,
     )
     if not items:
-        print(f"未找到维度={args.dimension!r} 的记录。")
+        print("未找到汇总记录。")
+        return
+
+    print("bucket     | dimension            | count | avg  | max | projects")
+    for it in items:
+        print(
+            f"{it['bucket']} | {it['dimension']:<20} | {it['insight_count']:>5} | "
+            f"{it['impact_avg']:.2f} | {it['impact_max']:>3} | {it['project_count']}"
+        )
+
+
+def _print_top_projects(args: argparse.Namespace) -> None:
+    since_ts, until_ts = _resolve_time_range(args)
+    items = fetch_top_projects(
+        db_path=args.db,
+        granularity=args.granularity,
+        dimension=args.dimension,
+        since_ts=since_ts,
+        until_ts=until_ts,
+        limit=10 if args.limit is None else args.limit,
+    )
+    if not items:
+        print("未找到项目记录。")
         return
 
+    for idx, it in enumerate(items, start=1):
+        print(
+            f"{idx:03d} | {it['project_name'] or it['project_key']} | "
+            f"sum={it['impact_sum']} count={it['insight_count']} max={it['impact_max']} "
+            f"dimensions={it['dimension_count']}"
+        )
+
+
+def _print_graph(args: argparse.Namespace) -> None:
+    items = fetch_insight_graph(
+        db_path=args.db,
+        ancestors_of=args.ancestors,
+        descendants_of=args.descendants,
+        project=args.project,
+        relation_type=args.relation,
+        max_depth=args.max_depth,
+    )
+    if not items:
+        print("未找到脉络记录（可先运行 main.py 完成链接阶段）。")
+        return
+
+    for it in items:
+        rel = it.get("relation_type") or "-"
+        print(
+            f"depth={it['depth']:>3} | #{it['insight_id']} | {_fmt_ts(it.get('publish_time'))} | "
+            f"{it.get('dimension')} | {it.get('project_name') or '-'} | {rel}"
+        )
+        print(f"      tech_node: {it.get('tech_node') or '-'}")
+
+
+def _print_timeline(items: list[dict[str, Any]]) -> None:
     for idx, it in enumerate(items, start=1):
         print(f"{idx:03d} | {_fmt_ts(it.get('publish_time'))} | {it.get('project_name') or '-'}")
+        if it.get("dimension"):
+            print(f"      dimension: {it.get('dimension')}")
         print(f"      tech_node: {it.get('tech_node') or '-'}")
         print(f"      tag/score: {(it.get('evolution_tag') or '-')} / {it.get('impact_score') or 1}")
         if it.get("summary"):
@@ -184,6 +432,182 @@ def main() -> None:
         print()
 
 
+def _print_project(args: argparse.Namespace) -> None:
+    since_ts, until_ts = _resolve_time_range(args)
+    aliases, items = fetch_project_timeline(
+        db_path=args.db,
+        project=args.name,
+        limit=args.limit,
+        since_ts=since_ts,
+        until_ts=until_ts,
+        include_duplicates=args.include_duplicates,
+    )
+    if not items:
+        print(f"未找到项目={args.name!r} 的记录。")
+        return
+
+    print(f"aliases: {' / '.join(aliases)}")
+    print()
+    _print_timeline(items)
+
+
+def _print_semantic(args: argparse.Namespace) -> None:
+    model = args.semantic_model
+    if model is None:
+        try:
+            from config import load_config
+
+            model = load_config().semantic_model
+        except FileNotFoundError:
+            model = None
+
+    since_ts, until_ts = _resolve_time_range(args)
+    items = fetch_semantic_matches(
+        db_path=args.db,
+        query=args.semantic,
+        model=model,
+        limit=args.limit or 10,
+        dimension=args.dimension,
+        since_ts=since_ts,
+        until_ts=until_ts,
+        include_duplicates=args.include_duplicates,
+    )
+    if not items:
+        print("未找到语义匹配（是否已开启 SEMANTIC_INDEX 并运行过 main.py？）。")
+        return
+
+    for idx, it in enumerate(items, start=1):
+        print(f"{idx:03d} | score={it['score']:.3f} | {_fmt_ts(it.get('publish_time'))} | {it.get('project_name') or '-'}")
+        print(f"      dimension: {it.get('dimension')}")
+        print(f"      tech_node: {it.get('tech_node') or '-'}")
+        if it.get("summary"):
+            print(f"      summary  : {it.get('summary')}")
+        if it.get("source_url"):
+            print(f"      url      : {it.get('source_url')}")
+        print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查询 tech_insights 技术脉络（按维度时间轴）")
+    parser.add_argument(
+        "--db",
+        default=str(Path(__file__).resolve().parent.parent / "assets" / "data.db"),
+        help="SQLite 文件路径（默认当前目录 data.db）",
+    )
+    parser.add_argument(
+        "--list-dimensions",
+        action="store_true",
+        help="输出支持的技术维度列表",
+    )
+    parser.add_argument(
+        "--dimension",
+        default=None,
+        help="要查询的维度名称（例如：AI编程/Vibe Coding）",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="最多返回多少条（默认不限制）")
+    parser.add_argument(
+        "--include-duplicates",
+        action="store_true",
+        help="同时输出被标记为近重复的条目（默认隐藏）",
+    )
+    parser.add_argument(
+        "--semantic",
+        default=None,
+        metavar="QUERY",
+        help="语义检索（例如：\"最近一个季度 agentic coding 有什么进展\"），可与 --dimension/时间范围组合",
+    )
+    parser.add_argument(
+        "--semantic-model",
+        default=None,
+        help="embedding 模型（默认读取 config.json 的 SEMANTIC_MODEL，未配置则为 hashing）",
+    )
+    _add_time_range_args(parser)
+
+    sub = parser.add_subparsers(dest="command")
+
+    # 子命令里与主命令同名的参数用 SUPPRESS：只有写在子命令后面时才覆盖主命令上的值
+    keep = argparse.SUPPRESS
+    p_stats = sub.add_parser("stats", help="按维度 × 时间桶输出汇总（条数/平均与最高影响力/项目数）")
+    p_stats.add_argument("--granularity", choices=db.STATS_GRANULARITIES, default="week")
+    p_stats.add_argument("--dimension", default=keep, help="只看某个维度（默认全部）")
+    _add_time_range_args(p_stats, default=keep)
+
+    p_top = sub.add_parser("top-projects", help="按 impact_score 总和输出项目榜单（默认当前桶）")
+    p_top.add_argument("--granularity", choices=db.STATS_GRANULARITIES, default="month")
+    p_top.add_argument("--dimension", default=keep, help="只看某个维度（默认全部）")
+    p_top.add_argument("--limit", type=int, default=keep, help="榜单长度（默认 10）")
+    _add_time_range_args(p_top, default=keep)
+
+    p_project = sub.add_parser("project", help="按项目（支持别名/不同写法）输出时间轴")
+    p_project.add_argument("name", help="项目名（例如：Gemini 3 / gemini3）")
+    p_project.add_argument("--limit", type=int, default=keep, help="最多返回多少条（默认不限制）")
+    p_project.add_argument(
+        "--include-duplicates",
+        action="store_true",
+        default=keep,
+        help="同时输出被标记为近重复的条目（默认隐藏）",
+    )
+    _add_time_range_args(p_project, default=keep)
+
+    p_graph = sub.add_parser("graph", help="技术脉络图：前驱/后继/项目完整链")
+    g = p_graph.add_mutually_exclusive_group(required=True)
+    g.add_argument("--ancestors", type=int, metavar="INSIGHT_ID", help="列出某条洞察的全部前驱")
+    g.add_argument("--descendants", type=int, metavar="INSIGHT_ID", help="列出某条洞察的全部后继")
+    g.add_argument("--project", default=None, help="列出某项目的完整进化链")
+    p_graph.add_argument(
+        "--relation",
+        choices=(db.LINK_SAME_PROJECT, db.LINK_SIMILAR_NODE),
+        default=None,
+        help="只沿某种关系展开（默认全部）",
+    )
+    p_graph.add_argument("--max-depth", type=int, default=1000, help="最大递归深度")
+
+    args = parser.parse_args()
+
+    if args.command == "project":
+        _print_project(args)
+        return
+    if args.command == "graph":
+        _print_graph(args)
+        return
+    if args.command == "stats":
+        _print_stats(args)
+        return
+    if args.command == "top-projects":
+        _print_top_projects(args)
+        return
+
+    if args.list_dimensions:
+        print("\n".join(get_supported_dimensions()))
+        return
+
+    if args.semantic:
+        _print_semantic(args)
+        return
+
+    if not args.dimension:
+        raise SystemExit("请提供 --dimension，或使用 --list-dimensions 查看可用维度。")
+
+    since_ts, until_ts = _resolve_time_range(args)
+
+    items = fetch_dimension_timeline(
+        db_path=args.db,
+        dimension=args.dimension,
+        limit=args.limit,
+        since_ts=since_ts,
+        until_ts=until_ts,
+        include_duplicates=args.include_duplicates,
+    )
+    if not items:
+        print(f"未找到维度={args.dimension!r} 的记录。")
+        return
+
+    _print_timeline(items)
+
+
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except (FileNotFoundError, db.SchemaOutdatedError) as e:
+        raise SystemExit(str(e)) from e
 
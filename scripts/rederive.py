@@ -0,0 +1,203 @@
+"""
+按 insight_raw_items 中保存的 LLM 原始条目重算 tech_insights 的派生列（不调用 LLM）：
+
+- 派生规则只有一处：analyzer.derive_record（impact_score 词表、summary 清洗等）+ resolve_project_id（项目归一化）
+- 按 insight_id 分块读取（内存只占一个分块），只对有变化的行 executemany UPDATE，每块一个事务；
+  断点记在 pipeline_state（rederive.last_insight_id），中断后重跑从断点继续，--restart 从头开始
+- tech_node / summary / dimension 不重算：它们是近重复签名（LSH 分段含维度）与语义向量的输入，改动应走重新分析
+- 由旧列回填的条目（legacy = 1，原始热度描述已丢失）默认保留原 impact_score，--include-legacy 时仅按 evolution_tag 重算
+- 全部完成后：有行变化则重建 dimension_stats，canonical_project_id 有变化则重新校正 same_project 链；
+  “有变化”记在 pipeline_state（rederive.stats_dirty / rederive.projects_dirty），与分块同事务提交，
+  中断后续跑时之前分块的变化也会触发重建
+
+用法：python rederive.py [--chunk-size 10000] [--dry-run] [--restart] [--include-legacy]
+      python rederive.py --rebuild-stats   只全量重建 dimension_stats 汇总表
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from pydantic import ValidationError
+
+import database as db
+from analyzer import InsightItem, derive_record
+
+STATE_KEY = "rederive.last_insight_id"
+STATS_DIRTY_KEY = "rederive.stats_dirty"
+PROJECTS_DIRTY_KEY = "rederive.projects_dirty"
+
+# 被重算的列（顺序与 UPDATE 语句一致）
+_DERIVED_COLUMNS = (
+    "project_name",
+    "evolution_tag",
+    "impact_score",
+    "impact_signal",
+    "canonical_project_id",
+)
+_UPDATE_SQL = (
+    "UPDATE tech_insights SET "
+    + ", ".join(f"{c} = ?" for c in _DERIVED_COLUMNS)
+    + " WHERE insight_id = ?"
+)
+_SELECT_COLUMNS = ", ".join(f"i.{c}" for c in _DERIVED_COLUMNS)
+
+
+@dataclass
+class RederiveStats:
+    scanned: int = 0
+    changed: int = 0
+    invalid: int = 0
+    projects_changed: int = 0
+    last_insight_id: int = 0
+
+
+def _derive_chunk(
+    conn: sqlite3.Connection,
+    rows: list[sqlite3.Row],
+    stats: RederiveStats,
+    *,
+    dry_run: bool,
+    include_legacy: bool,
+) -> list[tuple]:
+    """返回本分块需要写回的 UPDATE 参数；项目名解析结果在分块内缓存。"""
+    project_ids: dict[Optional[str], Optional[int]] = {}
+    updates: list[tuple] = []
+    for r in rows:
+        try:
+            item = InsightItem.model_validate_json(r["item"])
+        except ValidationError:
+            stats.invalid += 1
+            continue
+        rec = derive_record(item, source_id=r["source_id"])
+        name = rec.project_name
+        if name not in project_ids:
+            project_ids[name] = db.resolve_project_id(conn, name, create=not dry_run)
+        new = (
+            rec.project_name,
+            rec.evolution_tag,
+            r["impact_score"] if r["legacy"] and not include_legacy else rec.impact_score,
+            rec.impact_signal,
+            project_ids[name],
+        )
+        if new != tuple(r[c] for c in _DERIVED_COLUMNS):
+            updates.append((*new, r["insight_id"]))
+            if new[-1] != r["canonical_project_id"]:
+                stats.projects_changed += 1
+    return updates
+
+
+def rederive_insights(
+    conn: sqlite3.Connection,
+    *,
+    chunk_size: int = 10000,
+    dry_run: bool = False,
+    restart: bool = False,
+    include_legacy: bool = False,
+    progress: bool = True,
+) -> RederiveStats:
+    """
+    从断点开始按 insight_id 分块重算派生列，每块写回后与断点一起提交；dry_run 只统计不写库。
+    返回本次运行的统计（断点之前已完成的分块不计入）。
+    """
+    start = 0 if (restart or dry_run) else int(db.get_state(conn, STATE_KEY) or 0)
+    max_id = conn.execute("SELECT COALESCE(MAX(insight_id), 0) FROM tech_insights").fetchone()[0]
+    stats = RederiveStats(last_insight_id=start)
+    started = time.monotonic()
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT i.insight_id, i.source_id, {_SELECT_COLUMNS}, r.item, r.legacy
+            FROM tech_insights i
+            JOIN insight_raw_items r ON r.insight_id = i.insight_id
+            WHERE i.insight_id > ?
+            ORDER BY i.insight_id
+            LIMIT ?
+            """,
+            (stats.last_insight_id, int(chunk_size)),
+        ).fetchall()
+        if not rows:
+            break
+        updates = _derive_chunk(conn, rows, stats, dry_run=dry_run, include_legacy=include_legacy)
+        stats.scanned += len(rows)
+        stats.changed += len(updates)
+        stats.last_insight_id = rows[-1]["insight_id"]
+        if not dry_run:
+            if updates:
+                conn.executemany(_UPDATE_SQL, updates)
+                db.set_state(conn, STATS_DIRTY_KEY, "1")
+            if stats.projects_changed:
+                db.set_state(conn, PROJECTS_DIRTY_KEY, "1")
+            db.set_state(conn, STATE_KEY, str(stats.last_insight_id))
+            conn.commit()
+        if progress:
+            rate = stats.scanned / max(time.monotonic() - started, 1e-6)
+            print(
+                f"[rederive] {stats.last_insight_id}/{max_id} scanned={stats.scanned} "
+                f"changed={stats.changed} invalid={stats.invalid} rate={rate:.0f}/s",
+                flush=True,
+            )
+
+    if dry_run:
+        return stats
+    # 按持久化的标记判断：包含中断前已提交的分块
+    if db.get_state(conn, STATS_DIRTY_KEY) == "1":
+        db.rebuild_dimension_stats(conn)
+    if db.get_state(conn, PROJECTS_DIRTY_KEY) == "1":
+        db.relink_all_projects(conn)
+    # 完整跑完后清除断点与标记，下次从头开始
+    db.set_state(conn, STATS_DIRTY_KEY, "0")
+    db.set_state(conn, PROJECTS_DIRTY_KEY, "0")
+    db.set_state(conn, STATE_KEY, "0")
+    conn.commit()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="按保存的 LLM 原始条目重算 tech_insights 派生列")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000, help="每个事务处理的洞察数（默认 10000）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计会变化的行数，不写库")
+    parser.add_argument("--restart", action="store_true", help="忽略断点，从第一条洞察开始")
+    parser.add_argument(
+        "--include-legacy", action="store_true", help="由旧列回填的条目也按 evolution_tag 重算 impact_score"
+    )
+    parser.add_argument("--rebuild-stats", action="store_true", help="只全量重建 dimension_stats 汇总表后退出")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    if args.rebuild_stats:
+        db.rebuild_dimension_stats(conn)
+        conn.commit()
+        conn.close()
+        print("[rederive] dimension_stats rebuilt")
+        return
+    stats = rederive_insights(
+        conn,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+        restart=args.restart,
+        include_legacy=args.include_legacy,
+    )
+    conn.close()
+    print(
+        f"[rederive] done scanned={stats.scanned} changed={stats.changed} "
+        f"projects_changed={stats.projects_changed} invalid={stats.invalid}"
+        f"{' (dry-run)' if args.dry_run else ''}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+分析阶段的模型分级路由：
+
+- 本地启发式分类（无需调用模型）：AI 相关词命中数（keywords.json 词表）判断相关性，
+  按出现的英文实体（GPT-5、Qwen3 等）种类数、涉及的维度数与正文长度估算复杂度
+- skip：几乎不含 AI 相关词（广告、闲聊），不调用 LLM，来源标记为 skipped
+- cheap：相关但简单的文案先交给便宜模型（OPENAI_CHEAP_MODEL）
+- strong：复杂文案直接用主模型（OPENAI_MODEL）；便宜模型失败、未产出条目或结果低置信时升级到主模型
+- 低置信（low_confidence）：输出靠本地修复才得到、条目数明显少于复杂度、或过半条目缺 project_name / impact_signal；
+  主模型也失败时退回便宜模型的结果
+- 每一次模型调用（以及 skip 决策）都产出一条 TierRun，由 main.py 写入 analysis_runs，
+  用于统计每个来源的成本与各档位的延迟
+
+未开启 ROUTING 时所有文案都走 strong，仍记录 analysis_runs。
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Literal, Mapping, Optional, Sequence
+
+import keywords
+from analyzer import InsightBatch, LlmError, OpenAIAnalyzer
+
+Tier = Literal["skip", "cheap", "strong"]
+
+# 复杂度：不同英文实体（产品 / 模型名）越多，单条文案涉及的项目越多
+_ENTITY_RE = re.compile(r"[A-Za-z][A-Za-z0-9.\-]*[A-Za-z0-9]")
+_COMPLEXITY_CHARS_PER_POINT = 1500
+# 低置信：每这么多复杂度分至少应有一条洞察
+_COMPLEXITY_PER_ITEM = 3
+# 未配置缓存命中价时，cached_tokens 按输入价的这个比例计费（OpenAI 前缀缓存的最低折扣）
+_DEFAULT_CACHED_PRICE_RATIO = 0.5
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    tier: Tier
+    reason: str
+    ai_hits: int
+    complexity: int
+
+
+@dataclass(frozen=True)
+class TierRun:
+    """一次模型调用（或 skip 决策）的记录，对应 analysis_runs 的一行。"""
+
+    tier: Tier
+    model: Optional[str]
+    reason: str
+    ai_hits: int
+    complexity: int
+    ok: bool
+    latency_ms: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class RoutedAnalysis:
+    decision: RouteDecision
+    batch: Optional[InsightBatch]
+    runs: tuple[TierRun, ...]
+    error: Optional[LlmError] = None
+
+
+def classify(
+    title: str | None, content_text: str, scan: Optional[keywords.KeywordScan] = None
+) -> tuple[int, int]:
+    """返回 (AI 相关词命中数, 复杂度)；scan 为预处理阶段已算好的关键词扫描结果时直接复用。"""
+    text = f"{title or ''}\n{content_text or ''}"
+    engine = keywords.get_engine()
+    if scan is None:
+        scan = engine.scan(text)
+    entities = {m.casefold() for m in _ENTITY_RE.findall(text)} - engine.ai_terms
+    complexity = (
+        len(entities)
+        + max(0, len(scan.dimension_scores) - 1)
+        + len(content_text or "") // _COMPLEXITY_CHARS_PER_POINT
+    )
+    return scan.ai_hits, complexity
+
+
+def route(
+    title: str | None,
+    content_text: str,
+    *,
+    min_ai_hits: int,
+    complex_min: int,
+    has_cheap: bool,
+    scan: Optional[keywords.KeywordScan] = None,
+) -> RouteDecision:
+    ai_hits, complexity = classify(title, content_text, scan)
+    if ai_hits < min_ai_hits:
+        return RouteDecision("skip", f"ai_hits<{min_ai_hits}", ai_hits, complexity)
+    if not has_cheap:
+        return RouteDecision("strong", "no_cheap_model", ai_hits, complexity)
+    if complexity >= complex_min:
+        return RouteDecision("strong", f"complexity>={complex_min}", ai_hits, complexity)
+    return RouteDecision("cheap", "simple", ai_hits, complexity)
+
+
+def low_confidence(batch: InsightBatch, complexity: int) -> Optional[str]:
+    """便宜模型的结果是否可信；不可信时返回原因（写进升级调用的 reason）。"""
+    if batch.repaired:
+        return "repaired"
+    if len(batch.items) < max(1, complexity // _COMPLEXITY_PER_ITEM):
+        return "few_items"
+    missing = sum(1 for it in batch.items if not it.project_name or not it.impact_signal)
+    if missing * 2 > len(batch.items):
+        return "missing_fields"
+    return None
+
+
+def estimate_cost(
+    prices: Mapping[str, Sequence[float]],
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+) -> Optional[float]:
+    """
+    按 MODEL_PRICES（每百万 token 的 [输入, 输出, 缓存命中输入] 美元价）估算费用；未配置价格时返回 None。
+    prompt_tokens 含 cached_tokens，命中部分按缓存价计费（未配置时为输入价的一半）。
+    """
+    price = prices.get(model or "")
+    if not price:
+        return None
+    cached_price = float(price[2]) if len(price) > 2 else float(price[0]) * _DEFAULT_CACHED_PRICE_RATIO
+    cached = min(cached_tokens, prompt_tokens)
+    return (
+        (prompt_tokens - cached) * float(price[0]) + cached * cached_price + completion_tokens * float(price[1])
+    ) / 1_000_000
+
+
+class TieredAnalyzer:
+    """
+    按 route() 的决策选择模型；接口与 OpenAIAnalyzer.analyze 一致，但不抛 LlmError，
+    而是把失败放在 RoutedAnalysis.error 中，便于调用方同时记录已发生的调用成本。
+    """
+
+    def __init__(
+        self,
+        strong: OpenAIAnalyzer,
+        cheap: Optional[OpenAIAnalyzer] = None,
+        *,
+        enabled: bool = True,
+        min_ai_hits: int = 2,
+        complex_min: int = 8,
+        prices: Optional[Mapping[str, Sequence[float]]] = None,
+    ):
+        self.strong = strong
+        self.cheap = cheap
+        self.enabled = enabled
+        self.min_ai_hits = min_ai_hits
+        self.complex_min = complex_min
+        self.prices = dict(prices or {})
+        # 两档共用同一提示词模板，落库的 prompt_hash 与模型无关
+        self.template = strong.template
+        self.prompt_hash = strong.prompt_hash
+
+    def decide(
+        self, title: str | None, content_text: str, scan: Optional[keywords.KeywordScan] = None
+    ) -> RouteDecision:
+        if not self.enabled:
+            return RouteDecision("strong", "routing_off", scan.ai_hits if scan else 0, 0)
+        return route(
+            title,
+            content_text,
+            min_ai_hits=self.min_ai_hits,
+            complex_min=self.complex_min,
+            has_cheap=self.cheap is not None,
+            scan=scan,
+        )
+
+    def analyze(
+        self, *, title: str | None, content_text: str, scan: Optional[keywords.KeywordScan] = None
+    ) -> RoutedAnalysis:
+        """scan：预处理阶段的关键词扫描结果（已按同一门槛过滤过 AI 相关性），传入时不再重复扫描。"""
+        d = self.decide(title, content_text, scan)
+        if d.tier == "skip":
+            run = TierRun("skip", None, d.reason, d.ai_hits, d.complexity, ok=True)
+            return RoutedAnalysis(d, None, (run,))
+
+        runs: list[TierRun] = []
+        fallback: Optional[InsightBatch] = None
+        if d.tier == "cheap" and self.cheap is not None:
+            batch, err = self._run(self.cheap, "cheap", d.reason, d, runs, title, content_text)
+            if batch is None:
+                reason = f"escalate:{type(err).__name__}"
+            else:
+                why = low_confidence(batch, d.complexity)
+                if why is None:
+                    return RoutedAnalysis(d, batch, tuple(runs))
+                fallback, reason = batch, f"escalate:low_confidence:{why}"
+        else:
+            reason = d.reason
+        batch, err = self._run(self.strong, "strong", reason, d, runs, title, content_text)
+        if batch is None and fallback is not None:
+            return RoutedAnalysis(d, fallback, tuple(runs))
+        return RoutedAnalysis(d, batch, tuple(runs), err)
+
+    def _run(
+        self,
+        analyzer: OpenAIAnalyzer,
+        tier: Tier,
+        reason: str,
+        d: RouteDecision,
+        runs: list[TierRun],
+        title: str | None,
+        content_text: str,
+    ) -> tuple[Optional[InsightBatch], Optional[LlmError]]:
+        started = time.monotonic()
+        batch: Optional[InsightBatch] = None
+        err: Optional[LlmError] = None
+        try:
+            batch = analyzer.analyze(title=title, content_text=content_text)
+        except LlmError as e:
+            err = e
+        usage = analyzer.last_usage
+        runs.append(
+            TierRun(
+                tier=tier,
+                model=analyzer.config.model,
+                reason=reason,
+                ai_hits=d.ai_hits,
+                complexity=d.complexity,
+                ok=batch is not None,
+                latency_ms=int((time.monotonic() - started) * 1000),
+                prompt_tokens=usage["prompt_tokens"],
+                cached_tokens=usage["cached_tokens"],
+                completion_tokens=usage["completion_tokens"],
+                cost_usd=estimate_cost(
+                    self.prices,
+                    analyzer.config.model,
+                    usage["prompt_tokens"],
+                    usage["completion_tokens"],
+                    usage["cached_tokens"],
+                ),
+            )
+        )
+        return batch, err
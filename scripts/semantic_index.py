@@ -0,0 +1,207 @@
+"""
+可选的本地语义索引（CPU、查询时不联网）：
+
+- 向量：tech_node + summary 的 embedding，L2 归一化后以 float16 BLOB 存在 insight_embeddings
+- 增量：阶段 3 之后只为尚无向量（或模型不同）的洞察计算 embedding
+- 检索：一次性读出候选向量拼成矩阵，NumPy 点积暴力 top-k（余弦相似度）
+
+embedding 后端：
+- 默认 "hashing"：基于 dedup.shingles 的特征哈希（无需下载模型，仅依赖 numpy）。这是词面（lexical）兜底：
+  只有字词片段重合才相似，同义改写 / 中英互译查不到；要真正的语义检索请配置 sentence-transformers 模型
+- 其他取值视为 sentence-transformers 模型名或本地路径（需 pip install sentence-transformers；
+  查询时 local_files_only=True，只读本地缓存）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from typing import Any, Optional, Sequence
+
+import dedup
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError as e:  # pragma: no cover - 依赖缺失时给出明确提示
+    raise ImportError("语义索引需要 numpy，请先执行 `pip install numpy`") from e
+
+
+HASHING_MODEL = "hashing"
+HASHING_DIM = 512
+
+
+class HashingEmbedder:
+    """特征哈希 embedding：每个 shingle 哈希到 (下标, 正负号)，次线性词频加权。"""
+
+    name = HASHING_MODEL
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in dedup.shingles(text):
+                h = int.from_bytes(
+                    hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little"
+                )
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return _l2_normalize(out)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str, *, local_files_only: bool = False):
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore[import-not-found]
+        except ImportError as e:
+            raise ImportError(
+                "未安装 `sentence-transformers`，请先执行 `pip install sentence-transformers`，"
+                "或将 SEMANTIC_MODEL 设为 hashing"
+            ) from e
+        self.name = model_name
+        self._model = SentenceTransformer(
+            model_name, device="cpu", local_files_only=local_files_only
+        )
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vecs = self._model.encode(list(texts), batch_size=32, convert_to_numpy=True)
+        return _l2_normalize(vecs.astype(np.float32))
+
+
+def get_embedder(model: Optional[str] = None, *, offline: bool = False):
+    if not model or model == HASHING_MODEL:
+        return HashingEmbedder()
+    return SentenceTransformerEmbedder(model, local_files_only=offline)
+
+
+def _l2_normalize(m: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _insight_text(tech_node: Optional[str], summary: Optional[str]) -> str:
+    return f"{tech_node or ''}\n{summary or ''}".strip()
+
+
+def index_new_insights(
+    conn: sqlite3.Connection,
+    embedder,
+    *,
+    batch_size: int = 256,
+) -> int:
+    """为尚无当前模型向量的洞察计算 embedding（按批提交），返回新增条数。"""
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT i.insight_id, i.tech_node, i.summary
+            FROM tech_insights i
+            LEFT JOIN insight_embeddings e
+              ON e.insight_id = i.insight_id AND e.model = ?
+            WHERE i.insight_id > ? AND e.insight_id IS NULL
+            ORDER BY i.insight_id
+            LIMIT ?
+            """,
+            (embedder.name, last_id, int(batch_size)),
+        ).fetchall()
+        if not rows:
+            break
+        vecs = embedder.embed([_insight_text(r["tech_node"], r["summary"]) for r in rows])
+        vecs16 = vecs.astype(np.float16)
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO insight_embeddings (insight_id, model, dim, vector)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (r["insight_id"], embedder.name, int(vecs16.shape[1]), vecs16[k].tobytes())
+                for k, r in enumerate(rows)
+            ],
+        )
+        conn.commit()
+        total += len(rows)
+        last_id = rows[-1]["insight_id"]
+    return total
+
+
+def search(
+    conn: sqlite3.Connection,
+    embedder,
+    query: str,
+    *,
+    top_k: int = 10,
+    dimension: Optional[str] = None,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    include_duplicates: bool = False,
+) -> list[dict[str, Any]]:
+    """余弦相似度 top-k；维度/时间过滤在 SQL 中完成，只把候选向量读入内存。top_k <= 0 返回空列表。"""
+    if top_k <= 0:
+        return []
+    sql = """
+    SELECT e.insight_id, e.vector
+    FROM insight_embeddings e
+    JOIN tech_insights i ON i.insight_id = e.insight_id
+    JOIN raw_sources s ON s.source_id = i.source_id
+    WHERE e.model = ?
+    """
+    params: list[Any] = [embedder.name]
+    if dimension is not None:
+        sql += " AND i.dimension = ?"
+        params.append(dimension)
+    if not include_duplicates:
+        sql += " AND i.duplicate_of IS NULL"
+    if since_ts is not None:
+        sql += " AND s.publish_time >= ?"
+        params.append(since_ts)
+    if until_ts is not None:
+        sql += " AND s.publish_time <= ?"
+        params.append(until_ts)
+    rows = conn.execute(sql, params).fetchall()
+    if not rows:
+        return []
+
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float16).reshape(len(rows), -1)
+    q = embedder.embed([query])[0].astype(np.float32)
+    if q.shape[0] != matrix.shape[1]:
+        raise ValueError(f"向量维度不一致：query={q.shape[0]} index={matrix.shape[1]}")
+
+    scores = matrix.astype(np.float32) @ q
+    k = min(int(top_k), len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+
+    score_by_id = {int(ids[t]): float(scores[t]) for t in top}
+    placeholders = ",".join(["?"] * len(score_by_id))
+    details = {
+        r["insight_id"]: dict(r)
+        for r in conn.execute(
+            f"""
+            SELECT
+                i.insight_id,
+                s.publish_time,
+                s.source_url,
+                i.dimension,
+                i.project_name,
+                i.tech_node,
+                i.evolution_tag,
+                i.impact_score,
+                i.summary
+            FROM tech_insights i
+            JOIN raw_sources s ON s.source_id = i.source_id
+            WHERE i.insight_id IN ({placeholders})
+            """,
+            list(score_by_id),
+        )
+    }
+    out: list[dict[str, Any]] = []
+    for insight_id, score in score_by_id.items():
+        item = details.get(insight_id)
+        if item is not None:
+            item["score"] = score
+            out.append(item)
+    return out
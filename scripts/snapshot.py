@@ -0,0 +1,266 @@
+"""
+数据集快照导出 / 导入：
+
+- 一致性：先用 SQLite backup API 把库复制为快照（流水线同时写入也不影响），再从快照导出
+- --format sqlite：直接输出快照 .db 文件（无额外依赖）
+- --format parquet（需 pip install pyarrow）：每张表一份 Parquet；tech_insights 按
+  dimension / month 做 hive 分区（附带 publish_time），pandas / duckdb 可直接读取：
+      duckdb.sql("SELECT * FROM read_parquet('snap/tech_insights/**/*.parquet', hive_partitioning=1)")
+- 导入：建新库并执行迁移 → 暂时删除二级索引 → 关闭日志批量写入 → 重建索引 → 原子改名
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import database as db
+
+MANIFEST = "manifest.json"
+PARTITIONED_TABLE = "tech_insights"
+BATCH_ROWS = 50_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa  # type: ignore[import-not-found]
+        import pyarrow.dataset as ds  # type: ignore[import-not-found]
+        import pyarrow.parquet as pq  # type: ignore[import-not-found]
+    except ImportError as e:
+        raise ImportError("Parquet 快照需要 pyarrow，请先执行 `pip install pyarrow`，或改用 --format sqlite") from e
+    return pa, ds, pq
+
+
+def backup_to(db_path: str | Path, dest: str | Path) -> None:
+    """SQLite backup API：得到某一时刻的一致副本（源库可同时被写入）。"""
+    src = sqlite3.connect(str(db_path))
+    dst = sqlite3.connect(str(dest))
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _data_tables(conn: sqlite3.Connection) -> list[str]:
+    return [
+        r[0]
+        for r in conn.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY rowid
+            """
+        )
+    ]
+
+
+def _arrow_type(pa, decl: str):
+    decl = (decl or "").upper()
+    if "INT" in decl:
+        return pa.int64()
+    if "BLOB" in decl:
+        return pa.binary()
+    if "REAL" in decl or "FLOA" in decl or "DOUB" in decl:
+        return pa.float64()
+    return pa.string()
+
+
+def _table_schema(pa, conn: sqlite3.Connection, table: str):
+    return pa.schema(
+        [(r["name"], _arrow_type(pa, r["type"])) for r in conn.execute(f"PRAGMA table_info({table})")]
+    )
+
+
+def _iter_batches(pa, cur: sqlite3.Cursor, schema) -> Iterator[Any]:
+    names = schema.names
+    while True:
+        rows = cur.fetchmany(BATCH_ROWS)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        yield pa.record_batch(
+            [pa.array(columns[k], type=schema.field(k).type) for k in range(len(names))],
+            schema=schema,
+        )
+
+
+def _partitioning(pa, ds):
+    return ds.partitioning(
+        pa.schema([("dimension", pa.string()), ("month", pa.string())]), flavor="hive"
+    )
+
+
+def export_parquet(snapshot_db: Path, out_dir: Path) -> dict[str, int]:
+    """从快照库导出 Parquet，返回 表名 -> 行数。"""
+    pa, ds, pq = _require_pyarrow()
+    # write_dataset 在后台线程消费批次迭代器；快照库只读且同一时刻只有一个线程在读
+    conn = sqlite3.connect(str(snapshot_db), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    counts: dict[str, int] = {}
+    for table in _data_tables(conn):
+        schema = _table_schema(pa, conn, table)
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if table == PARTITIONED_TABLE:
+            schema = schema.append(pa.field("publish_time", pa.int64())).append(
+                pa.field("month", pa.string())
+            )
+            cols = ", ".join(f"i.{name}" for name in schema.names[:-2])
+            cur = conn.execute(
+                f"""
+                SELECT {cols}, s.publish_time,
+                       COALESCE(strftime('%Y-%m', s.publish_time, 'unixepoch', 'localtime'), 'unknown')
+                FROM tech_insights i
+                LEFT JOIN raw_sources s ON s.source_id = i.source_id
+                ORDER BY i.insight_id
+                """
+            )
+            ds.write_dataset(
+                _iter_batches(pa, cur, schema),
+                out_dir / table,
+                schema=schema,
+                format="parquet",
+                partitioning=_partitioning(pa, ds),
+                existing_data_behavior="error",
+            )
+        else:
+            cur = conn.execute(f"SELECT * FROM {table}")
+            with pq.ParquetWriter(out_dir / f"{table}.parquet", schema) as writer:
+                for batch in _iter_batches(pa, cur, schema):
+                    writer.write_batch(batch)
+    conn.close()
+    return counts
+
+
+def export_snapshot(db_path: str | Path, out: str | Path, *, fmt: str = "parquet") -> dict[str, Any]:
+    out = Path(out)
+    if out.exists():
+        raise FileExistsError(f"输出路径已存在：{out}")
+    if fmt == "sqlite":
+        backup_to(db_path, out)
+        return {"format": "sqlite", "path": str(out)}
+
+    _require_pyarrow()
+    out.mkdir(parents=True)
+    try:
+        with tempfile.TemporaryDirectory(dir=out.parent) as tmp:
+            snapshot_db = Path(tmp) / "snapshot.db"
+            backup_to(db_path, snapshot_db)
+            snap = db.connect(snapshot_db)
+            db.init_db(snap)  # 快照统一到当前 schema 版本
+            version = snap.execute("PRAGMA user_version").fetchone()[0]
+            snap.close()
+            counts = export_parquet(snapshot_db, out)
+    except BaseException:
+        shutil.rmtree(out, ignore_errors=True)
+        raise
+    manifest = {
+        "format": "parquet",
+        "schema_version": version,
+        "created_at": _dt.datetime.now().isoformat(timespec="seconds"),
+        "partitioned": {PARTITIONED_TABLE: ["dimension", "month"]},
+        "tables": counts,
+    }
+    (out / MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+def import_snapshot(snapshot_dir: str | Path, db_path: str | Path) -> dict[str, int]:
+    """
+    把 Parquet 快照批量导入到一个新库（db_path 不能已存在），返回 表名 -> 导入行数。
+    二级索引在数据写完后统一重建；写入期间关闭日志与同步，完成后再原子改名为 db_path。
+    """
+    pa, ds, pq = _require_pyarrow()
+    snapshot_dir = Path(snapshot_dir)
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"目标库已存在：{db_path}（导入只写入新库）")
+    manifest = json.loads((snapshot_dir / MANIFEST).read_text(encoding="utf-8"))
+    if manifest.get("schema_version") != db.SCHEMA_VERSION:
+        raise ValueError(
+            f"快照 schema 版本 {manifest.get('schema_version')} 与当前代码 {db.SCHEMA_VERSION} 不一致"
+        )
+
+    tmp_path = db_path.with_name(db_path.name + ".import-tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = db.connect(tmp_path)
+    db.init_db(conn)
+
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    ).fetchall()
+    for idx in indexes:
+        conn.execute(f"DROP INDEX {idx['name']}")
+    conn.execute("PRAGMA foreign_keys = OFF")
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")  # 256MB，加快重建索引时的排序
+
+    counts: dict[str, int] = {}
+    for table in manifest["tables"]:
+        table_cols = [r["name"] for r in conn.execute(f"PRAGMA table_info({table})")]
+        if table == PARTITIONED_TABLE:
+            source = ds.dataset(
+                snapshot_dir / table, format="parquet", partitioning=_partitioning(pa, ds)
+            )
+        else:
+            source = ds.dataset(snapshot_dir / f"{table}.parquet", format="parquet")
+        cols = [c for c in table_cols if c in source.schema.names]
+        sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        n = 0
+        for batch in source.to_batches(columns=cols, batch_size=BATCH_ROWS):
+            conn.executemany(sql, zip(*(batch.column(k).to_pylist() for k in range(len(cols)))))
+            n += batch.num_rows
+        counts[table] = n
+    conn.commit()
+
+    for idx in indexes:
+        conn.execute(idx["sql"])
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = WAL")  # 与迁移 v11 一致：新库同样是 WAL
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="数据集快照：导出 Parquet / SQLite，或从 Parquet 快照导入新库")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="导出一致性快照")
+    p_export.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    p_export.add_argument("--out", required=True, help="输出目录（parquet）或文件（sqlite），不能已存在")
+    p_export.add_argument("--format", choices=("parquet", "sqlite"), default="parquet")
+
+    p_import = sub.add_parser("import", help="把 Parquet 快照导入到新库")
+    p_import.add_argument("snapshot", help="export 生成的快照目录")
+    p_import.add_argument("--db", dest="db_path", required=True, help="新库路径（不能已存在）")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        res = export_snapshot(args.db_path, args.out, fmt=args.format)
+        tables: Optional[dict[str, int]] = res.get("tables")
+        print(f"[snapshot] exported format={res['format']} -> {args.out}")
+        for name, n in (tables or {}).items():
+            print(f"    {name}: {n}")
+    else:
+        counts = import_snapshot(args.snapshot, args.db_path)
+        print(f"[snapshot] imported -> {args.db_path}")
+        for name, n in counts.items():
+            print(f"    {name}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Optional
 
 import database as db
-from coze_client import CozeClient
+from coze_client import CozeClient, CozeVideoItem, VideoListPage
+
+# 增量同步状态（存 pipeline_state，仅在变化时写入；多账号时按 feed_id 分键）
+_STATE_PINNED = "sync.pinned_ids"
+_STATE_BOUNDARY = "sync.newest_unpinned_ts"
 
 
 @dataclass(frozen=True)
@@ -14,19 +23,19 @@ class SyncResult:
     inserted_incremental_ids: list[str]
     inserted_backfill_ids: list[str]
     updated_existing_count: int
+    probe_only: bool = False
 
 
 class SyncEngine:
     """
     阶段 1：增量数据获取 (Data Ingestion)
 
-    - 调用 Coze GetVideoList 获取列表
-    - 置顶与重复过滤：
-      - 已存在：只更新 is_top，跳过增量处理
-      - 不存在：写入 videos；并根据 max_time_before 判断增量/补录
-    - 置顶规则：
-      - 当前列表前 3 个视为 top3（is_top=1）
-      - 同时清理历史置顶：除 top3 外的 is_top 统一置 0
+    - 调用 Coze GetVideoList 获取列表；列表前 top_n 个视为置顶（is_top=1）
+    - 初次抓取（库为空）：持续翻页直到 has_more=false
+    - 增量抓取：记住上次的置顶集合与“最新非置顶视频时间”（边界）
+      - 先取一个小页（top_n + 1 条）：置顶集合不变且第一个非置顶视频不新于边界
+        => 无新视频，整次同步不写库
+      - 否则只插入边界之后的新视频；置顶变化按集合差逐条更新（置顶老视频不参与边界判断）
     """
 
     def __init__(
@@ -37,140 +46,277 @@ class SyncEngine:
         top_n: int = 3,
         window_size: int = 20,
         max_pages: Optional[int] = None,
+        feed_id: Optional[int] = None,
     ):
         self.conn = conn
         self.client = client
         self.top_n = top_n
         self.window_size = window_size
         self.max_pages = max_pages
+        # None：单账号模式（不区分 feed）；否则所有读写都限定在该账号
+        self.feed_id = feed_id
+        prefix = "sync." if feed_id is None else f"sync.{feed_id}."
+        self._state_pinned = _STATE_PINNED.replace("sync.", prefix, 1)
+        self._state_boundary = _STATE_BOUNDARY.replace("sync.", prefix, 1)
 
     def sync_video_list(self) -> SyncResult:
         # 新版以 raw_sources.publish_time 为准
-        max_time_before = db.get_max_publish_time(self.conn)
+        max_time_before = db.get_max_publish_time(self.conn, self.feed_id)
+        if max_time_before is not None:
+            return self._sync_incremental(max_time_before)
+
         inserted_incremental: list[str] = []
-        inserted_backfill: list[str] = []
         updated_existing = 0
         top_ids: list[str] = []
+        newest_unpinned: Optional[int] = None
 
+        # 初次抓取（库为空）：持续翻页直到 has_more=false
         # 翻页游标：utils.get_video_list 初次传 0；后续用返回的 max_cursor
         cursor = 0
         seen_cursors: set[int] = set()
         first_page = True
         pages_fetched = 0
+        while True:
+            page = self.client.get_video_list_page(max_cursor=cursor, count=self.window_size)
+            pages_fetched += 1
+            if first_page:
+                top_ids = [it.aweme_id for it in page.items[: self.top_n]]
+                first_page = False
 
-        # 初次抓取（库为空）：持续翻页直到 has_more=false
-        if max_time_before is None:
-            while True:
-                page = self.client.get_video_list_page(max_cursor=cursor, count=self.window_size)
-                pages_fetched += 1
-                if first_page:
-                    top_ids = [it.aweme_id for it in page.items[: self.top_n]]
-                    first_page = False
-
-                for it in page.items:
-                    desired_is_top = 1 if it.aweme_id in top_ids else 0
-
-                    if db.source_exists(self.conn, it.aweme_id):
-                        db.update_source_is_top(self.conn, it.aweme_id, desired_is_top)
-                        updated_existing += 1
-                        continue
-
-                    meta = db.RawSourceMeta(
-                        source_id=it.aweme_id,
-                        title=it.title,
-                        publish_time=it.create_time,
-                        source_url=it.url,
-                        content_text=None,
-                        process_status="pending",
-                        is_top=desired_is_top,
-                    )
-                    db.upsert_raw_source_meta(self.conn, meta)
-                    inserted_incremental.append(it.aweme_id)
-
-                if self.max_pages is not None and pages_fetched >= self.max_pages:
-                    break
-                if not page.has_more:
-                    break
-                if page.next_cursor is None:
-                    break
-                if page.next_cursor == cursor:
-                    break
-                if page.next_cursor in seen_cursors:
-                    break
-                seen_cursors.add(cursor)
-                cursor = page.next_cursor
-
-        # 增量抓取（库非空）：窗口默认 20；若窗口内全是老视频则认为无新视频
-        else:
-            while True:
-                page = self.client.get_video_list_page(max_cursor=cursor, count=self.window_size)
-                pages_fetched += 1
-                if first_page:
-                    top_ids = [it.aweme_id for it in page.items[: self.top_n]]
-                    first_page = False
-
-                # 由于列表按时间倒序，遇到老视频后即可视为到达边界
-                any_new = False
-                hit_old_boundary = False
-
-                for it in page.items:
-                    desired_is_top = 1 if it.aweme_id in top_ids else 0
-
-                    if it.create_time <= max_time_before:
-                        hit_old_boundary = True
-                        # 窗口内的老视频：不插入，只做置顶标记更新（若该视频已存在）
-                        if db.source_exists(self.conn, it.aweme_id):
-                            db.update_source_is_top(self.conn, it.aweme_id, desired_is_top)
-                            updated_existing += 1
-                        continue
-
-                    any_new = True
-
-                    # 新视频：插入/更新
-                    if db.source_exists(self.conn, it.aweme_id):
-                        db.update_source_is_top(self.conn, it.aweme_id, desired_is_top)
+            for it in page.items:
+                desired_is_top = 1 if it.aweme_id in top_ids else 0
+                if not desired_is_top:
+                    newest_unpinned = max(newest_unpinned or 0, it.create_time)
+
+                if db.source_exists(self.conn, it.aweme_id):
+                    changed = db.update_source_is_top(self.conn, it.aweme_id, desired_is_top)
+                    if self.feed_id is not None:
+                        changed = db.claim_source_for_feed(self.conn, it.aweme_id, self.feed_id) or changed
+                    if changed:
                         updated_existing += 1
-                        continue
-
-                    meta = db.RawSourceMeta(
-                        source_id=it.aweme_id,
-                        title=it.title,
-                        publish_time=it.create_time,
-                        source_url=it.url,
-                        content_text=None,
-                        process_status="pending",
-                        is_top=desired_is_top,
-                    )
-                    db.upsert_raw_source_meta(self.conn, meta)
-                    inserted_incremental.append(it.aweme_id)
-
-                # 窗口内全是老视频：认为没有新视频，结束（无需继续翻页）
-                if cursor == 0 and not any_new:
-                    break
+                    continue
 
-                # 当前页已触达老视频边界：说明新视频已抓完，结束
-                if hit_old_boundary:
-                    break
+                self._insert(it, desired_is_top)
+                inserted_incremental.append(it.aweme_id)
 
-                if self.max_pages is not None and pages_fetched >= self.max_pages:
-                    break
-                # 当前页全是新视频：可能新视频超过窗口，继续翻页直到遇到老视频
-                if not page.has_more or page.next_cursor is None:
-                    break
-                if page.next_cursor == cursor or page.next_cursor in seen_cursors:
-                    break
-                seen_cursors.add(cursor)
-                cursor = page.next_cursor
+            if self.max_pages is not None and pages_fetched >= self.max_pages:
+                break
+            if not page.has_more or page.next_cursor is None:
+                break
+            if page.next_cursor == cursor or page.next_cursor in seen_cursors:
+                break
+            seen_cursors.add(cursor)
+            cursor = page.next_cursor
 
-        # 清理历史置顶残留：除 top_ids 外都设为 0
         if top_ids:
-            db.clear_is_top_except_sources(self.conn, top_ids)
+            db.clear_is_top_except_sources(self.conn, top_ids, self.feed_id)
+        self._save_state(None, None, top_ids, newest_unpinned)
+
+        return SyncResult(
+            max_time_before=max_time_before,
+            top_ids=top_ids,
+            inserted_incremental_ids=inserted_incremental,
+            inserted_backfill_ids=[],
+            updated_existing_count=updated_existing,
+        )
+
+    def _sync_incremental(self, max_time_before: int) -> SyncResult:
+        known_pinned, boundary = self._load_state()
+        if known_pinned is None:
+            # 旧库首次走新逻辑：从 is_top 标记与非置顶视频的最大发布时间推导状态
+            known_pinned = db.list_top_source_ids(self.conn, self.feed_id)
+        if boundary is None:
+            boundary = db.get_max_unpinned_publish_time(self.conn, self.feed_id)
+            if boundary is None:
+                boundary = max_time_before
+
+        # 探测：top_n + 1 条足以判断置顶集合是否变化、是否有新视频
+        probe = self.client.get_video_list_page(max_cursor=0, count=self.top_n + 1)
+        top_ids = [it.aweme_id for it in probe.items[: self.top_n]]
+        unpinned_head = probe.items[self.top_n : self.top_n + 1]
+        if sorted(top_ids) == sorted(known_pinned) and (
+            not unpinned_head or unpinned_head[0].create_time <= boundary
+        ):
+            return SyncResult(
+                max_time_before=max_time_before,
+                top_ids=top_ids,
+                inserted_incremental_ids=[],
+                inserted_backfill_ids=[],
+                updated_existing_count=0,
+                probe_only=True,
+            )
+
+        inserted_incremental: list[str] = []
+        updated_existing = 0
+        top_set = set(top_ids)
 
+        # 置顶集合变化：只更新进出集合的视频
+        for sid in set(known_pinned) - top_set:
+            if db.update_source_is_top(self.conn, sid, 0):
+                updated_existing += 1
+        for it in probe.items[: self.top_n]:
+            if it.aweme_id in known_pinned:
+                continue
+            if db.source_exists(self.conn, it.aweme_id):
+                if db.update_source_is_top(self.conn, it.aweme_id, 1):
+                    updated_existing += 1
+            else:
+                self._insert(it, 1)
+                inserted_incremental.append(it.aweme_id)
+
+        # 非置顶的新视频：按时间倒序翻页，遇到边界即停止（接口若忽略 count，直接复用探测页）
+        new_boundary = boundary
+        page = probe
+        if probe.has_more and len(probe.items) < self.window_size:
+            page = self.client.get_video_list_page(max_cursor=0, count=self.window_size)
+        cursor = 0
+        seen_cursors: set[int] = set()
+        pages_fetched = 1
+        skip = self.top_n
+        while True:
+            hit_old_boundary = False
+            for it in page.items[skip:]:
+                if it.aweme_id in top_set:
+                    continue
+                if it.create_time <= boundary:
+                    hit_old_boundary = True
+                    break
+                new_boundary = max(new_boundary, it.create_time)
+                if db.source_exists(self.conn, it.aweme_id):
+                    # 例如刚取消置顶的新视频
+                    if db.update_source_is_top(self.conn, it.aweme_id, 0):
+                        updated_existing += 1
+                    continue
+                self._insert(it, 0)
+                inserted_incremental.append(it.aweme_id)
+            skip = 0
+
+            if hit_old_boundary:
+                break
+            if self.max_pages is not None and pages_fetched >= self.max_pages:
+                break
+            # 当前页全是新视频：可能新视频超过窗口，继续翻页直到遇到边界
+            if not page.has_more or page.next_cursor is None:
+                break
+            if page.next_cursor == cursor or page.next_cursor in seen_cursors:
+                break
+            seen_cursors.add(cursor)
+            cursor = page.next_cursor
+            page = self.client.get_video_list_page(max_cursor=cursor, count=self.window_size)
+            pages_fetched += 1
+
+        self._save_state(known_pinned, boundary, top_ids, new_boundary)
         return SyncResult(
             max_time_before=max_time_before,
             top_ids=top_ids,
             inserted_incremental_ids=inserted_incremental,
-            inserted_backfill_ids=inserted_backfill,
+            inserted_backfill_ids=[],
             updated_existing_count=updated_existing,
         )
 
+    def _insert(self, it: CozeVideoItem, is_top: int) -> None:
+        meta = db.RawSourceRecord(
+            source_id=it.aweme_id,
+            title=it.title,
+            publish_time=it.create_time,
+            source_url=it.url,
+            content_text=None,
+            process_status="pending",
+            is_top=is_top,
+            feed_id=self.feed_id,
+        )
+        db.upsert_raw_source_meta(self.conn, meta)
+
+    def _load_state(self) -> tuple[Optional[list[str]], Optional[int]]:
+        pinned = db.get_state(self.conn, self._state_pinned)
+        boundary = db.get_state(self.conn, self._state_boundary)
+        return (
+            json.loads(pinned) if pinned is not None else None,
+            int(boundary) if boundary is not None else None,
+        )
+
+    def _save_state(
+        self,
+        old_pinned: Optional[list[str]],
+        old_boundary: Optional[int],
+        pinned: list[str],
+        boundary: Optional[int],
+    ) -> None:
+        changed = False
+        if old_pinned is None or sorted(old_pinned) != sorted(pinned):
+            db.set_state(self.conn, self._state_pinned, json.dumps(sorted(pinned)))
+            changed = True
+        if boundary is not None and boundary != old_boundary:
+            db.set_state(self.conn, self._state_boundary, str(boundary))
+            changed = True
+        if changed:
+            self.conn.commit()
+
+
+class FeedClient:
+    """把 CozeClient 绑定到某个账号入口，并按该账号的 rate_limit_per_min 限速（各账号互不影响）。"""
+
+    def __init__(self, client: CozeClient, input_url: str, rate_limit_per_min: float):
+        self._client = client
+        self._input_url = input_url
+        self._min_interval_s = 60.0 / rate_limit_per_min if rate_limit_per_min > 0 else 0.0
+        self._next_at = 0.0
+
+    def get_video_list_page(self, *, max_cursor: int = 0, count: int = 20) -> VideoListPage:
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = time.monotonic() + self._min_interval_s
+        return self._client.get_video_list_page(
+            max_cursor=max_cursor, count=count, input_url=self._input_url
+        )
+
+
+def sync_feeds(
+    db_path: str | Path,
+    client: CozeClient,
+    *,
+    workers: int = 4,
+    window_size: int = 20,
+    max_pages: Optional[int] = None,
+    now_ts: Optional[int] = None,
+) -> dict[str, SyncResult | BaseException]:
+    """
+    并发同步 sources 中到期（超过 poll_interval_s）的账号，返回 name -> SyncResult（失败为异常）。
+    每个 worker 使用独立连接；抓取在各自线程中并行，SQLite 写入由 busy_timeout（db.BUSY_TIMEOUT_S）排队。
+    """
+    conn = db.connect(db_path)
+    db.init_db(conn)
+    feeds = db.list_due_feeds(conn, int(now_ts if now_ts is not None else time.time()))
+    conn.close()
+    if not feeds:
+        return {}
+
+    results: dict[str, SyncResult | BaseException] = {}
+    lock = threading.Lock()
+
+    def run(feed: db.FeedSource) -> None:
+        feed_conn = db.connect(db_path)
+        started = int(time.time())
+        try:
+            engine = SyncEngine(
+                feed_conn,
+                FeedClient(client, feed.input_url, feed.rate_limit_per_min),
+                top_n=feed.top_n,
+                window_size=window_size,
+                max_pages=max_pages,
+                feed_id=feed.feed_id,
+            )
+            res: SyncResult | BaseException = engine.sync_video_list()
+            db.mark_feed_polled(feed_conn, feed.feed_id, started)
+        except Exception as e:  # noqa: BLE001
+            res = e
+            db.mark_feed_polled(feed_conn, feed.feed_id, started, error=f"{type(e).__name__}: {e}")
+        finally:
+            feed_conn.close()
+        with lock:
+            results[feed.name] = res
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(feeds)))) as ex:
+        list(ex.map(run, feeds))
+    return results
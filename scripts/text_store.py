@@ -0,0 +1,107 @@
+"""
+原始文案（转写稿）的压缩存储：
+
+- 文案不再内联在 raw_sources.content_text，而是压缩后存入 source_texts（只有分析阶段按需读取）
+- 编码：安装了 `zstandard` 时用 zstd（可选共享字典，按语料训练后存 compression_dicts），否则用标准库 zlib
+- 每行记录自己的 codec / dict_id，读取时按行解码，因此可以随时切换编码或重新训练字典
+
+本文件的 main() 用于训练字典并按新字典重压缩已有文案。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import zlib
+from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # zstd 为可选依赖，缺失时回退 zlib
+    zstandard = None
+
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+DICT_SIZE = 64 * 1024
+
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+def compress_text(
+    text: str,
+    *,
+    dict_id: Optional[int] = None,
+    dict_data: Optional[bytes] = None,
+) -> tuple[str, Optional[int], bytes]:
+    """返回 (codec, dict_id, blob)。无 zstd 时忽略字典，使用 zlib。"""
+    raw = text.encode("utf-8")
+    if zstandard is None:
+        return CODEC_ZLIB, None, zlib.compress(raw, ZLIB_LEVEL)
+    if dict_data is not None:
+        cctx = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=zstandard.ZstdCompressionDict(dict_data)
+        )
+        return CODEC_ZSTD, dict_id, cctx.compress(raw)
+    return CODEC_ZSTD, None, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+
+def decompress_text(codec: str, blob: bytes, dict_data: Optional[bytes] = None) -> str:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("该文案以 zstd 压缩，请先执行 `pip install zstandard`")
+        if dict_data is not None:
+            dctx = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dict_data))
+        else:
+            dctx = zstandard.ZstdDecompressor()
+        return dctx.decompress(blob).decode("utf-8")
+    raise ValueError(f"未知的文案编码：{codec!r}")
+
+
+def train_dictionary(samples: list[str], *, dict_size: int = DICT_SIZE) -> bytes:
+    """用已有文案训练 zstd 共享字典（短文案多时压缩率提升明显）。"""
+    if zstandard is None:
+        raise RuntimeError("训练字典需要 `pip install zstandard`")
+    return zstandard.train_dictionary(dict_size, [s.encode("utf-8") for s in samples]).as_bytes()
+
+
+def main() -> None:
+    import database as db
+
+    parser = argparse.ArgumentParser(description="训练 zstd 字典 / 重压缩 source_texts 中的文案")
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        default=os.getenv("DB_PATH", str(Path(__file__).resolve().parent.parent / "assets" / "data.db")),
+        help="SQLite 文件路径（默认读取 DB_PATH，否则使用 assets/data.db）",
+    )
+    parser.add_argument("--train-dict", action="store_true", help="用已有文案训练新的共享字典")
+    parser.add_argument("--recompress", action="store_true", help="按当前编码/最新字典重压缩全部文案")
+    args = parser.parse_args()
+
+    conn = db.connect(args.db_path)
+    db.init_db(conn)
+    if args.train_dict:
+        dict_id = db.train_text_dictionary(conn)
+        print(f"[text] trained dict_id={dict_id}")
+    if args.recompress:
+        n = db.recompress_source_texts(conn)
+        print(f"[text] recompressed={n}")
+    stats = db.source_text_stats(conn)
+    conn.close()
+    print(
+        f"[text] rows={stats['rows']} raw_bytes={stats['raw_bytes']} "
+        f"stored_bytes={stats['stored_bytes']} codecs={stats['codecs']}"
+    )
+
+
+if __name__ == "__main__":
+    main()